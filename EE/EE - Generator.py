@@ -2,9 +2,9 @@ import os
 import json
 import random
 import argparse
+import asyncio
+import glob
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from openai import OpenAI
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
@@ -15,7 +15,18 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.graphics.shapes import Drawing, Rect
 from reportlab.platypus import Flowable
 
-pdfmetrics.registerFont(TTFont('DejaVuSans', 'DejaVuSans.ttf'))
+_fonts_registered = False
+
+def register_fonts():
+    """Registriert DejaVuSans beim ersten PDF (nicht beim Import); fehlt die Datei, bleibt es bei den Standard-Schriften."""
+    global _fonts_registered
+    if _fonts_registered:
+        return
+    _fonts_registered = True
+    try:
+        pdfmetrics.registerFont(TTFont('DejaVuSans', 'DejaVuSans.ttf'))
+    except Exception as e:
+        print(f"⚠️  Schrift 'DejaVuSans.ttf' konnte nicht registriert werden ({e}). Verwende Standard-Schriften.")
 
 class CheckBox(Flowable):
     """Eine anpassbare Checkbox für ReportLab"""
@@ -33,11 +44,21 @@ def create_checkbox():
     return CheckBox(12)
 
 # --- SICHERHEIT: API-Schlüssel laden ---
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OpenAI API-Schlüssel nicht gefunden. Bitte setzen Sie die Umgebungsvariable OPENAI_API_KEY.")
-
-client = OpenAI(api_key=api_key)
+# Der Client (und damit das openai-Paket samt Netzwerk-Stack) wird erst beim Start der Generierung erzeugt,
+# damit reine PDF-Rebuilds (Subcommand `render`) und Importe der Hilfsfunktionen offline und ohne Schlüssel funktionieren.
+
+def require_api_key():
+    """Liefert den API-Schlüssel oder bricht mit einer verständlichen Meldung ab."""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OpenAI API-Schlüssel nicht gefunden. Bitte setzen Sie die Umgebungsvariable OPENAI_API_KEY.")
+    return api_key
+
+def create_async_client():
+    """Erzeugt einen AsyncOpenAI-Client für eine Event-Loop (je Pipeline-Lauf, da an die Loop gebunden)."""
+    api_key = require_api_key()
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=api_key)
 
 # --- MODELL-DEFINITION (Wie von Ihnen gewünscht) ---
 MODELL_AUFGABENSTELLER = "gpt-5-nano-2025-08-07"
@@ -235,10 +256,10 @@ WICHTIG:
 - Verwende KEINE Platzhalter wie [Name] - nutze den konkreten Namen aus dem Szenario.
 """
 
-def call_openai_api(prompt, model, temperature=1):
-    """Ruft die OpenAI Chat API auf, mit höherer Temperatur für mehr Kreativität."""
+async def call_openai_api_async(client, prompt, model, temperature=1):
+    """Ruft die OpenAI Chat API asynchron auf (ein Request belegt keinen Thread), mit höherer Temperatur für mehr Kreativität."""
     try:
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=model,
             response_format={"type": "json_object"},
             messages=[
@@ -247,109 +268,112 @@ def call_openai_api(prompt, model, temperature=1):
             temperature=temperature,
         )
         return response.choices[0].message.content.strip()
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
         print(f"Ein Fehler ist bei der API-Anfrage aufgetreten: {e}")
         return None
 
-def generate_single_task(szenario, task_number, total_tasks, max_retries=3):
-    """Generiert eine einzelne Aufgabe - für parallele Verarbeitung, mit Validierung und Retry.
-    Verwendet das Szenario direkt (inkl. der darin enthaltenen Namen)."""
-    
-    for attempt in range(max_retries):
-        print(f"-> Generiere Aufgabe {task_number}/{total_tasks} (Versuch {attempt+1})...")
-        print(f"   Szenario: '{szenario[:55]}...'")
-        
-        dynamischer_prompt = PROMPT_AUFGABENSTELLER.format(szenario=szenario)
-        aufgabe_json_str = call_openai_api(dynamischer_prompt, MODELL_AUFGABENSTELLER)
-        
-        if not aufgabe_json_str:
-            print(f"   ❌ FEHLER: API-Aufruf fehlgeschlagen. Retry...")
-            continue
-        
-        try:
-            aufgabe_dict = json.loads(aufgabe_json_str)
-            
-            # --- VALIDIERUNG ---
-            geschichte = aufgabe_dict.get('geschichte', '')
-            frage = aufgabe_dict.get('frage', '')
-            
-            # Prüfe auf Platzhalter wie [Name], [Hauptfigur], etc.
-            if '[' in geschichte or '[' in frage:
-                print(f"   ⚠️  Platzhalter gefunden in Text. Retry...")
-                continue
-            
-            # Prüfe ob die Frage "Wie fühlt sich" enthält
-            if "Wie fühlt sich" not in frage:
-                print(f"   ⚠️  Frage hat falsches Format. Retry...")
-                continue
-            
-            # Prüfe ob verbotene Emotionswörter in der Geschichte vorkommen
-            found_emotions = contains_emotion_words(geschichte)
-            if found_emotions:
-                print(f"   ⚠️  Emotionswörter in Geschichte gefunden: {found_emotions[:3]}... Retry...")
-                continue
-            
-            print(f"   ✓ Aufgabe {task_number} erfolgreich generiert und validiert.")
-            return aufgabe_dict
-            
-        except json.JSONDecodeError:
-            print(f"   ❌ FEHLER: Kein valides JSON. Retry...")
-            continue
-    
-    print(f"   ❌ FEHLER: Aufgabe {task_number} nach {max_retries} Versuchen fehlgeschlagen. Überspringe.")
-    return None
-
-def generate_tasks_parallel(scenarios, num_tasks, max_workers=5):
-    """Generiert Aufgaben parallel mit ThreadPoolExecutor.
-    Stellt sicher, dass exakt num_tasks Aufgaben generiert werden,
-    indem bei Fehlschlägen weitere Versuche gemacht werden."""
-    print(f"🚀 Starte parallele Generierung von {num_tasks} Aufgaben mit {max_workers} Workers...")
-    
-    finale_aufgaben = []
+def validate_task(aufgabe_json_str, task_number):
+    """Parst und validiert eine API-Antwort; liefert das Aufgaben-Dict oder None (Grund wird ausgegeben)."""
+    if not aufgabe_json_str:
+        print(f"   ❌ FEHLER: API-Aufruf für Aufgabe {task_number} fehlgeschlagen.")
+        return None
+    try:
+        aufgabe_dict = json.loads(aufgabe_json_str)
+    except json.JSONDecodeError:
+        print(f"   ❌ FEHLER: Aufgabe {task_number} ist kein valides JSON.")
+        return None
+
+    # --- VALIDIERUNG ---
+    geschichte = aufgabe_dict.get('geschichte', '')
+    frage = aufgabe_dict.get('frage', '')
+
+    # Prüfe auf Platzhalter wie [Name], [Hauptfigur], etc.
+    if '[' in geschichte or '[' in frage:
+        print(f"   ⚠️  Platzhalter gefunden in Aufgabe {task_number}.")
+        return None
+
+    # Prüfe ob die Frage "Wie fühlt sich" enthält
+    if "Wie fühlt sich" not in frage:
+        print(f"   ⚠️  Frage von Aufgabe {task_number} hat falsches Format.")
+        return None
+
+    # Prüfe ob verbotene Emotionswörter in der Geschichte vorkommen
+    found_emotions = contains_emotion_words(geschichte)
+    if found_emotions:
+        print(f"   ⚠️  Emotionswörter in Aufgabe {task_number} gefunden: {found_emotions[:3]}...")
+        return None
+
+    print(f"   ✓ Aufgabe {task_number} erfolgreich generiert und validiert.")
+    return aufgabe_dict
+
+async def generate_attempt(client, szenario, task_number, total_tasks, temperature=1.0):
+    """Ein einzelner Versuch (ein API-Aufruf + Validierung). Fehlversuche werden nicht hier wiederholt,
+    sondern geben ihren Slot sofort an einen neuen Versuch der Pipeline ab."""
+    print(f"-> Generiere Aufgabe {task_number} (Ziel: {total_tasks})...")
+    print(f"   Szenario: '{szenario[:55]}...'")
+    dynamischer_prompt = PROMPT_AUFGABENSTELLER.format(szenario=szenario)
+    return validate_task(await call_openai_api_async(client, dynamischer_prompt, MODELL_AUFGABENSTELLER, temperature), task_number)
+
+async def generate_tasks_async(scenarios, num_tasks, max_workers=5, temperature=1.0, client=None):
+    """Asynchrone Pipeline mit kontinuierlichem Nachfüllen:
+    Es laufen immer bis zu `max_workers` Versuche gleichzeitig (begrenzte Menge laufender Tasks). Sobald ein Versuch
+    fertig ist oder an der Validierung scheitert, wird sein Slot sofort neu belegt – ohne auf langsame Requests einer
+    „Runde“ zu warten. Sind `num_tasks` gültige Aufgaben da, werden alle noch laufenden (überzähligen) Versuche abgebrochen."""
+    print(f"🚀 Starte Pipeline für {num_tasks} Aufgaben mit bis zu {max_workers} gleichzeitigen Anfragen...")
     max_total_attempts = num_tasks * 3  # Maximal 3x so viele Versuche wie benötigte Aufgaben
+    own_client = client is None
+    if own_client:
+        client = create_async_client()
+
+    szenario_pool = []
+    finale_aufgaben = []
+    in_flight = set()
     total_attempts = 0
-    task_counter = 0  # Zähler für Aufgabennummern
-    
-    while len(finale_aufgaben) < num_tasks and total_attempts < max_total_attempts:
-        # Wie viele Aufgaben fehlen noch?
-        noch_benoetigt = num_tasks - len(finale_aufgaben)
-        
-        # Bereite die Szenarien vor
-        szenario_pool = scenarios[:]
-        selected_scenarios = []
-        
-        for i in range(noch_benoetigt):
-            if not szenario_pool:
-                szenario_pool = scenarios[:]
-            
-            gewaehltes_szenario = random.choice(szenario_pool)
-            szenario_pool.remove(gewaehltes_szenario)
-            task_counter += 1
-            selected_scenarios.append((gewaehltes_szenario, task_counter, num_tasks))
-        
-        # Parallele Verarbeitung
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_task = {
-                executor.submit(generate_single_task, szenario, task_num, num_tasks): task_num 
-                for szenario, task_num, num_tasks in selected_scenarios
-            }
-            
-            for future in as_completed(future_to_task):
-                result = future.result()
-                if result:
+
+    def start_attempt():
+        nonlocal szenario_pool, total_attempts
+        # Szenarien ohne Zurücklegen ziehen; ist der Pool leer, wird er wieder aufgefüllt
+        if not szenario_pool:
+            szenario_pool = scenarios[:]
+        szenario = szenario_pool.pop(random.randrange(len(szenario_pool)))
+        total_attempts += 1
+        in_flight.add(asyncio.create_task(generate_attempt(client, szenario, total_attempts, num_tasks, temperature)))
+
+    try:
+        while len(finale_aufgaben) < num_tasks:
+            # Freie Slots sofort neu belegen (im Rahmen des Versuchsbudgets)
+            while len(in_flight) < max_workers and total_attempts < max_total_attempts:
+                start_attempt()
+            if not in_flight:
+                break
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                in_flight.discard(task)
+                result = task.result()
+                if result and len(finale_aufgaben) < num_tasks:
                     finale_aufgaben.append(result)
-                total_attempts += 1
-        
-        if len(finale_aufgaben) < num_tasks:
-            print(f"   ⚠ {len(finale_aufgaben)}/{num_tasks} Aufgaben erfolgreich. Generiere {num_tasks - len(finale_aufgaben)} weitere...")
-    
+    finally:
+        # Überzählige, noch laufende Versuche abbrechen
+        for task in in_flight:
+            task.cancel()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        if own_client:
+            await client.close()
+
     if len(finale_aufgaben) < num_tasks:
         print(f"   ❌ WARNUNG: Nur {len(finale_aufgaben)} von {num_tasks} Aufgaben nach {total_attempts} Versuchen generiert!")
     else:
-        print(f"✓ Exakt {len(finale_aufgaben)} von {num_tasks} Aufgaben erfolgreich generiert!")
-    
+        print(f"✓ Exakt {len(finale_aufgaben)} von {num_tasks} Aufgaben erfolgreich generiert ({total_attempts} Versuche)!")
     return finale_aufgaben
 
+def generate_tasks_parallel(scenarios, num_tasks, max_workers=5, temperature=1.0):
+    """Generiert Aufgaben parallel (synchroner Einstieg in die asyncio-Pipeline generate_tasks_async).
+    Stellt sicher, dass exakt num_tasks Aufgaben generiert werden, solange das Versuchsbudget reicht."""
+    return asyncio.run(generate_tasks_async(scenarios, num_tasks, max_workers, temperature))
+
 def save_tasks_as_json(aufgaben, filename_base):
     """Speichert Aufgaben als JSON-Datei"""
     json_filename = os.path.join("Jsons-Output", f"{filename_base}.json")
@@ -362,9 +386,10 @@ def save_tasks_as_json(aufgaben, filename_base):
         print(f"❌ Fehler beim Speichern der JSON-Datei: {e}")
         return None
 
-def speichere_aufgaben_als_pdf(aufgaben, filename_base):
+def speichere_aufgaben_als_pdf(aufgaben, filename_base, output_dir="PDF-Output"):
     """Speichert Aufgaben und Lösungen getrennt, mit ankreuzbarer Antwort-Tabelle."""
-    pdf_filename = os.path.join("PDF-Output", f"{filename_base}.pdf")
+    register_fonts()
+    pdf_filename = os.path.join(output_dir, f"{filename_base}.pdf")
     
     doc = SimpleDocTemplate(pdf_filename,
                           rightMargin=2*cm, leftMargin=2*cm,
@@ -445,15 +470,44 @@ def generate_batch_filename(batch_num=None, num_tasks=None):
     else:
         return f"EE_Set_{timestamp}_{num_tasks}tasks"
 
+def render_json_files(json_paths, output_dir="PDF-Output"):
+    """Baut PDFs aus gespeicherten JSON-Sets neu (ohne API-Aufrufe); der PDF-Name entspricht dem JSON-Namen."""
+    os.makedirs(output_dir, exist_ok=True)
+    erstellt = 0
+    for json_path in json_paths:
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                aufgaben = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"❌ Fehler beim Lesen von '{json_path}': {e}")
+            continue
+        filename_base = os.path.splitext(os.path.basename(json_path))[0]
+        if speichere_aufgaben_als_pdf(aufgaben, filename_base, output_dir):
+            erstellt += 1
+    print(f"✓ {erstellt} von {len(json_paths)} PDFs neu erstellt.")
+    return erstellt
+
 def main():
     """Hauptfunktion mit Batch-Unterstützung und Command-Line-Argumenten."""
     parser = argparse.ArgumentParser(description='EE (Emotionserkennung) Generator mit Batch-Funktionalität')
     parser.add_argument('--tasks', type=int, default=14, help='Anzahl der Aufgaben pro Set (Standard: 14)')
     parser.add_argument('--batches', type=int, default=1, help='Anzahl der Batches zu generieren (Standard: 1)')
-    parser.add_argument('--workers', type=int, default=5, help='Anzahl der parallelen Workers (Standard: 5)')
+    parser.add_argument('--workers', type=int, default=5, help='Maximal gleichzeitige API-Anfragen (Standard: 5)')
     parser.add_argument('--temp', type=float, default=1.0, help='Temperatur für API-Aufrufe (Standard: 1.0)')
+    subparsers = parser.add_subparsers(dest='command')
+    render_parser = subparsers.add_parser('render', help='Nur PDFs aus gespeicherten JSON-Dateien erstellen (ohne API)')
+    render_parser.add_argument('json_files', nargs='*', help='JSON-Dateien (Standard: alle in Jsons-Output/)')
+    render_parser.add_argument('--output-dir', default='PDF-Output', help='Zielordner für PDFs (Standard: PDF-Output)')
     
     args = parser.parse_args()
+
+    if args.command == 'render':
+        json_files = args.json_files or sorted(glob.glob(os.path.join('Jsons-Output', '*.json')))
+        if not json_files:
+            print("❌ Keine JSON-Dateien gefunden.")
+            return
+        render_json_files(json_files, args.output_dir)
+        return
     
     print("=" * 60)
     print("🎯 EE GENERATOR - ERWEITERTE BATCH-VERSION")
@@ -465,6 +519,9 @@ def main():
     print(f"   • Temperatur: {args.temp}")
     print("=" * 60)
     
+    # Schlüssel früh prüfen (die Clients werden erst in der Pipeline erzeugt)
+    require_api_key()
+
     # Stelle sicher, dass Output-Ordner existieren
     ensure_output_folders()
     
@@ -482,7 +539,7 @@ def main():
         print("-" * 50)
         
         # Generiere Aufgaben parallel
-        finale_aufgaben = generate_tasks_parallel(scenarios, args.tasks, args.workers)
+        finale_aufgaben = generate_tasks_parallel(scenarios, args.tasks, args.workers, args.temp)
         
         if not finale_aufgaben:
             print(f"❌ Keine Aufgaben für Batch {batch_num} generiert. Überspringe.")
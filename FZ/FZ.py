@@ -11,13 +11,89 @@ from shapely.ops import split, unary_union
 import datetime
 import os
 import traceback
+import time
+import json
+import csv
+import cProfile
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+# --- 0. Optionale Instrumentierung (--profile) ---
+
+class StageProfiler:
+    """Zählt und misst die Pipeline-Stufen (Splitter, split, Shape, Rotation, Union, Zeichnen)
+    je Aufgabe und Schwierigkeitsgrad. Ohne --profile ist jede Stufe ein wiederverwendeter nullcontext.
+    """
+    STAGES = ("splitter", "split", "shape", "rotate", "union", "draw")
+
+    def __init__(self):
+        self.enabled = False
+        self.difficulty = None
+        self.task_seed = None
+        # (difficulty, task_seed, stage) -> [calls, total_s, self_s]
+        self.records = defaultdict(lambda: [0, 0.0, 0.0])
+        self._stack = []
+        self._null = nullcontext()
+
+    def set_task(self, difficulty, task_seed):
+        self.difficulty, self.task_seed = difficulty, task_seed
+
+    def stage(self, name):
+        return self._measure(name) if self.enabled else self._null
+
+    @contextmanager
+    def _measure(self, name):
+        frame = [0.0]  # Zeit, die in verschachtelten Stufen verbracht wurde
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            if self._stack: self._stack[-1][0] += elapsed
+            rec = self.records[(self.difficulty, self.task_seed, name)]
+            rec[0] += 1; rec[1] += elapsed; rec[2] += elapsed - frame[0]
+
+    def rows(self):
+        return [{"difficulty": d, "task_seed": t, "stage": st, "calls": r[0], "total_s": r[1], "self_s": r[2]}
+                for (d, t, st), r in sorted(self.records.items(), key=lambda kv: (str(kv[0][0]), kv[0][1], kv[0][2]))]
+
+    def summary_by_difficulty(self):
+        summary = defaultdict(lambda: defaultdict(lambda: {"calls": 0, "total_s": 0.0, "self_s": 0.0}))
+        tasks = defaultdict(set)
+        for (d, t, st), (calls, total, self_time) in self.records.items():
+            agg = summary[d][st]
+            agg["calls"] += calls; agg["total_s"] += total; agg["self_s"] += self_time
+            tasks[d].add(t)
+        return {d: {"tasks": len(tasks[d]), "stages": dict(stages)} for d, stages in summary.items()}
+
+    def write_report(self, base_path):
+        """Schreibt <base_path>.json (Aggregat + Einzelwerte) und <base_path>.csv (Einzelwerte)."""
+        rows = self.rows()
+        with open(base_path + ".json", "w", encoding="utf-8") as f:
+            json.dump({"by_difficulty": self.summary_by_difficulty(), "per_task": rows}, f, indent=2)
+        with open(base_path + ".csv", "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["difficulty", "task_seed", "stage", "calls", "total_s", "self_s"])
+            writer.writeheader(); writer.writerows(rows)
+        return base_path + ".json", base_path + ".csv"
+
+    def print_summary(self):
+        for d, info in self.summary_by_difficulty().items():
+            print(f"\nProfil '{d}' ({info['tasks']} Aufgaben):")
+            for st in self.STAGES:
+                agg = info["stages"].get(st)
+                if agg: print(f"  {st:<9} {agg['calls']:>7} Aufrufe  {agg['self_s']*1000:>10.1f} ms (exkl.)  {agg['total_s']*1000:>10.1f} ms (inkl.)")
+
+PROFILER = StageProfiler()
 
 # --- 1. Geometrische Formen und Operationen ---
 
 class Shape:
     def __init__(self, vertices):
-        self.vertices = np.array(vertices, dtype=float)
-        self.shapely_polygon = ShapelyPolygon(self.vertices) if len(self.vertices) > 2 else None
+        with PROFILER.stage("shape"):
+            self.vertices = np.array(vertices, dtype=float)
+            self.shapely_polygon = ShapelyPolygon(self.vertices) if len(self.vertices) > 2 else None
 
     def get_bounding_box(self):
         if len(self.vertices) == 0: return 0, 0, 0, 0
@@ -26,21 +102,23 @@ class Shape:
         return min_x, min_y, max_x, max_y
 
     def rotate(self, angle_degrees, center=None):
-        if center is None: center = np.mean(self.vertices, axis=0)
-        angle_radians = math.radians(angle_degrees)
-        rot_mat = np.array([[math.cos(angle_radians),-math.sin(angle_radians)],[math.sin(angle_radians),math.cos(angle_radians)]])
-        self.vertices = np.dot(self.vertices - center, rot_mat.T) + center
-        self.shapely_polygon = ShapelyPolygon(self.vertices) if len(self.vertices) > 2 else None
+        with PROFILER.stage("rotate"):
+            if center is None: center = np.mean(self.vertices, axis=0)
+            angle_radians = math.radians(angle_degrees)
+            rot_mat = np.array([[math.cos(angle_radians),-math.sin(angle_radians)],[math.sin(angle_radians),math.cos(angle_radians)]])
+            self.vertices = np.dot(self.vertices - center, rot_mat.T) + center
+            self.shapely_polygon = ShapelyPolygon(self.vertices) if len(self.vertices) > 2 else None
         return self
 
     def draw_on_canvas(self, canvas, x_offset, y_offset, scale=1.0, fill_color=black, stroke_color=black, stroke_width=0.1):
         if len(self.vertices) < 3: return
-        path = canvas.beginPath()
-        path.moveTo(x_offset+self.vertices[0][0]*scale, y_offset+self.vertices[0][1]*scale)
-        for v in self.vertices[1:]: path.lineTo(x_offset+v[0]*scale, y_offset+v[1]*scale)
-        path.close()
-        canvas.setFillColor(fill_color); canvas.setStrokeColor(stroke_color); canvas.setLineWidth(stroke_width)
-        canvas.drawPath(path, fill=1, stroke=1)
+        with PROFILER.stage("draw"):
+            path = canvas.beginPath()
+            path.moveTo(x_offset+self.vertices[0][0]*scale, y_offset+self.vertices[0][1]*scale)
+            for v in self.vertices[1:]: path.lineTo(x_offset+v[0]*scale, y_offset+v[1]*scale)
+            path.close()
+            canvas.setFillColor(fill_color); canvas.setStrokeColor(stroke_color); canvas.setLineWidth(stroke_width)
+            canvas.drawPath(path, fill=1, stroke=1)
 
     def __eq__(self, other):
         if not isinstance(other, Shape): return NotImplemented
@@ -152,10 +230,12 @@ def create_diverse_fragments(shape, num_fragments, use_complex_cuts=False, max_p
             break
         # Prefer splitting the largest eligible fragment (more deterministic control of max size)
         idx, frag = max(eligible, key=lambda t: t[1].area)
-        splitter = create_complex_splitter(frag.bounds) if use_complex_cuts else create_simple_splitter(frag.bounds)
+        with PROFILER.stage("splitter"):
+            splitter = create_complex_splitter(frag.bounds) if use_complex_cuts else create_simple_splitter(frag.bounds)
         if splitter is None: continue
         try:
-            res = split(frag, splitter)
+            with PROFILER.stage("split"):
+                res = split(frag, splitter)
             new = [f for f in res.geoms if isinstance(f, ShapelyPolygon) and f.area > MIN_FRAGMENT_AREA]
             if len(new) > 1:
                 fragments_shapely.pop(idx); fragments_shapely.extend(new)
@@ -165,6 +245,7 @@ def create_diverse_fragments(shape, num_fragments, use_complex_cuts=False, max_p
 # --- 3. Aufgabengenerierung mit Schwierigkeitsgraden ---
 def generate_task(seed, difficulty="mixed", max_piece_fraction=0.4):
     random.seed(seed)
+    PROFILER.set_task(difficulty, seed)
     use_complex_cuts = "-complex" in difficulty
     base_difficulty = difficulty.replace("-complex", "")
     if base_difficulty == "easy": num_fragments = random.randint(3, 4)
@@ -248,7 +329,8 @@ def draw_visual_solution(canvas, x, y, scale, fragments):
         return
     # Compute union for clean exterior outline
     try:
-        union_geom = unary_union(polys).buffer(0)
+        with PROFILER.stage("union"):
+            union_geom = unary_union(polys).buffer(0)
     except Exception:
         union_geom = polys[0]
 
@@ -323,6 +405,7 @@ def generate_pdf_perfect(tasks, output_dir, seed, n_items, difficulty):
         c.showPage()
 
         for i, task in enumerate(tasks):
+            PROFILER.set_task(difficulty, seed + i)
             if i > 0 and i % 2 == 0: c.showPage()
             y_offset = height/2 if i%2 == 0 else 0
             
@@ -367,12 +450,14 @@ def generate_pdf_perfect(tasks, output_dir, seed, n_items, difficulty):
         c.setFont("Helvetica-Bold", 16); c.setFillColor(black); c.drawCentredString(width/2, height-30*mm, "Lösungen")
         items_per_page = 5; row_height = 55*mm; start_y_sol = height-50*mm
         for i, task in enumerate(tasks):
+            PROFILER.set_task(difficulty, seed + i)
             if i > 0 and i%items_per_page == 0:
                 c.showPage(); c.setFont("Helvetica-Bold", 16); c.setFillColor(black); c.drawCentredString(width/2, height-30*mm, "Lösungen (Fortsetzung)")
             idx_on_page = i % items_per_page; y_pos = start_y_sol - idx_on_page*row_height
             c.setFont("Helvetica-Bold", 12); c.setFillColor(black); c.drawString(30*mm, y_pos, f"Aufgabe {i+1}:   {task['correct_option_label']}")
             if task["solution_fragments"]:
-                draw_visual_solution(c, 100*mm, y_pos-15*mm, 0.75, task["solution_fragments"])
+                with PROFILER.stage("draw"):
+                    draw_visual_solution(c, 100*mm, y_pos-15*mm, 0.75, task["solution_fragments"])
             c.line(20*mm, y_pos-row_height+15*mm, width-20*mm, y_pos-row_height+15*mm)
         c.showPage()
         
@@ -391,6 +476,8 @@ def main():
     parser.add_argument("--difficulty", type=str, default="mixed", choices=difficulty_choices, help="Schwierigkeitsgrad des Sets.")
     parser.add_argument("--max-piece-fraction", type=float, default=0.4, help="Maximaler Flächenanteil eines einzelnen Teilstücks an der Zielfigur (z.B. 0.4 = 40%).")
     parser.add_argument("--batch-count", type=int, default=1, help="Wie viele PDFs sollen erstellt werden?")
+    parser.add_argument("--profile", action="store_true", help="Stufen je Aufgabe/Schwierigkeit zählen und messen; schreibt JSON- und CSV-Bericht ins Ausgabeverzeichnis.")
+    parser.add_argument("--cprofile", action="store_true", help="Zusätzlich einen cProfile-Dump (.prof) schreiben (nur mit --profile).")
     args = parser.parse_args()
 
     # Validierung der max-piece-fraction
@@ -407,6 +494,10 @@ def main():
             print(f"!!! FEHLER: Konnte Verzeichnis nicht erstellen: {e} !!!")
             return
 
+    PROFILER.enabled = args.profile
+    profiler = cProfile.Profile() if args.profile and args.cprofile else None
+    if profiler: profiler.enable()
+
     # Batch-Erstellung
     for batch_idx in range(args.batch_count):
         batch_seed = args.seed + batch_idx * args.n_items
@@ -414,5 +505,14 @@ def main():
         tasks = [generate_task(batch_seed + i, args.difficulty, max_piece_fraction=args.max_piece_fraction) for i in range(args.n_items)]
         generate_pdf_perfect(tasks, args.out_dir, batch_seed, args.n_items, args.difficulty)
 
+    if args.profile:
+        base = os.path.join(args.out_dir, f"FZ_Profil_{args.difficulty.upper()}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{args.seed}")
+        if profiler:
+            profiler.disable(); profiler.dump_stats(base + ".prof")
+            print(f"cProfile-Dump: {base}.prof")
+        PROFILER.print_summary()
+        json_path, csv_path = PROFILER.write_report(base)
+        print(f"Profil-Bericht: {json_path}, {csv_path}")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,12 @@
 import random
 import json
 import os
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle, KeepTogether
+import hashlib
+import itertools
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle, KeepTogether, Flowable
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm, mm
 from reportlab.lib import colors
@@ -27,6 +32,97 @@ def load_words_from_file(filename="words.txt"):
         print(f"Ein unerwarteter Fehler ist beim Lesen der Datei aufgetreten: {e}")
         return []
 
+# --- Venn-Modell der drei Terme S, P, M (Entailment-Tabelle, einmalig beim Import berechnet) ---
+# Die 7 Regionen des Venn-Diagramms sind die nicht-leeren Teilmengen von {S, P, M} (Bit 1 = S, 2 = P, 4 = M).
+# Ein Modell legt fest, welche Regionen bewohnt sind (2^7 = 128 Modelle); wie in der klassischen Syllogistik
+# muss jeder Term mindestens ein Element haben (existenzielle Voraussetzung, nötig für z. B. Darapti oder Barbari).
+TERM_BITS = {'S': 1, 'P': 2, 'M': 4}
+STATEMENT_TYPES = ('A', 'E', 'I', 'O')
+ROLE_TEMPLATES = [(s_type, t1, t2) for s_type in STATEMENT_TYPES for t1 in 'SPM' for t2 in 'SPM' if t1 != t2]
+VENN_MODELS = [m for m in range(128) if all(any(m >> (r - 1) & 1 for r in range(1, 8) if r & bit) for bit in TERM_BITS.values())]
+
+def statement_models(s_type, subj, pred):
+    """Bitmaske aller Modelle (Bit k = k-tes Element von VENN_MODELS), in denen die Aussage wahr ist."""
+    x, y = TERM_BITS[subj], TERM_BITS[pred]
+    mask = 0
+    for k, model in enumerate(VENN_MODELS):
+        inhabited = [r for r in range(1, 8) if model >> (r - 1) & 1]
+        true = {'A': not any(r & x and not r & y for r in inhabited), 'E': not any(r & x and r & y for r in inhabited),
+                'I': any(r & x and r & y for r in inhabited), 'O': any(r & x and not r & y for r in inhabited)}[s_type]
+        if true: mask |= 1 << k
+    return mask
+
+TEMPLATE_MODELS = {template: statement_models(*template) for template in ROLE_TEMPLATES}
+
+def build_entailment_table(forms):
+    """
+    Je Prämissenpaar die Menge der Aussage-Schablonen (Typ, Subjekt-Rolle, Prädikat-Rolle), die logisch folgen:
+    eine Schablone folgt, wenn sie in jedem Modell wahr ist, in dem beide Prämissen wahr sind.
+    """
+    table = {}
+    for form in forms.values():
+        premises = TEMPLATE_MODELS[form['major']] & TEMPLATE_MODELS[form['minor']]
+        table[(form['major'], form['minor'])] = frozenset(t for t, models in TEMPLATE_MODELS.items() if premises & ~models == 0)
+    return table
+
+STATEMENT_PATTERNS = {'A': "Alle {} sind {}.", 'E': "Keine {} sind {}.", 'I': "Einige {} sind {}.", 'O': "Einige {} sind nicht {}."}
+
+def role_text(template):
+    """Satzschablone auf Rollen, z. B. ('A', 'S', 'P') -> "Alle {S} sind {P}." (Begriffe per str.format einsetzen)."""
+    s_type, subj, pred = template
+    return STATEMENT_PATTERNS[s_type].format('{' + subj + '}', '{' + pred + '}')
+
+def role_canonical(template):
+    """Kanonische Form auf Rollen: E und I sind symmetrisch (Subjekt und Prädikat vertauschbar)."""
+    s_type, subj, pred = template
+    return (s_type, tuple(sorted((subj, pred)))) if s_type in ('E', 'I') else template
+
+def build_form_plans(forms, entailed):
+    """
+    Je Form vorbereitete Satzschablonen: Prämissen, Konklusion und die zulässigen Distraktoren, gruppiert nach kanonischer Form
+    (Prämissen und folgerbare Aussagen sind bereits ausgeschlossen). Pro Frage bleiben nur Auswahl und Einsetzen der Begriffe.
+    """
+    plans = {}
+    for name, form in forms.items():
+        groups = {}
+        for template in ROLE_TEMPLATES:
+            if template not in entailed[(form['major'], form['minor'])]:
+                groups.setdefault(role_canonical(template), []).append(role_text(template))
+        plans[name] = {"major": role_text(form['major']), "minor": role_text(form['minor']), "conclusion": role_text(form['conclusion']),
+                       "distractor_groups": [tuple(group) for group in groups.values()]}
+    return plans
+
+def build_bulk_tables(forms, entailed):
+    """
+    Index-Tabellen für den Bulk-Modus (gleiche Distraktor-Gruppen wie build_form_plans, aber als NumPy-Arrays):
+    `group_templates` (Form × Gruppe × 2) Schablonen-IDs aus ROLE_TEMPLATES (-1 = leer), `group_sizes` (Form × Gruppe),
+    `subsets` (Form × Teilmenge × 3) alle 3er-Kombinationen von Gruppen je Form und `subset_counts` (Form).
+    """
+    template_ids = {template: k for k, template in enumerate(ROLE_TEMPLATES)}
+    groups_per_form = []
+    for form in forms.values():
+        groups = {}
+        for template in ROLE_TEMPLATES:
+            if template not in entailed[(form['major'], form['minor'])]:
+                groups.setdefault(role_canonical(template), []).append(template_ids[template])
+        groups_per_form.append(list(groups.values()))
+    max_groups = max(len(groups) for groups in groups_per_form)
+    group_templates = np.full((len(forms), max_groups, 2), -1, dtype=np.int16)
+    group_sizes = np.zeros((len(forms), max_groups), dtype=np.int16)
+    subsets_per_form = [list(itertools.combinations(range(len(groups)), 3)) for groups in groups_per_form]
+    subsets = np.zeros((len(forms), max(len(c) for c in subsets_per_form), 3), dtype=np.int16)
+    for f, groups in enumerate(groups_per_form):
+        for g, members in enumerate(groups):
+            group_templates[f, g, :len(members)] = members
+            group_sizes[f, g] = len(members)
+        subsets[f, :len(subsets_per_form[f])] = subsets_per_form[f]
+    subset_counts = np.array([len(c) for c in subsets_per_form], dtype=np.int64)
+    return {"group_templates": group_templates, "group_sizes": group_sizes, "subsets": subsets, "subset_counts": subset_counts}
+
+# Alle 24 Anordnungen der 4 Optionen (Slot 0 = richtige Konklusion, 1–3 = Distraktoren) und die Position der richtigen Antwort
+OPTION_LAYOUTS = np.array(list(itertools.permutations(range(4))), dtype=np.int8)
+CORRECT_POSITION = np.argmax(OPTION_LAYOUTS == 0, axis=1).astype(np.int8)
+
 class SyllogismGenerator:
     """
     Generiert Multiple-Choice-Fragen für den MedAT-Untertest "Implikationen erkennen".
@@ -36,83 +132,294 @@ class SyllogismGenerator:
     VALID_FORMS = {
         "AAA-1 (Barbara)": {"major": ('A', 'M', 'P'), "minor": ('A', 'S', 'M'), "conclusion": ('A', 'S', 'P')}, "EAE-1 (Celarent)": {"major": ('E', 'M', 'P'), "minor": ('A', 'S', 'M'), "conclusion": ('E', 'S', 'P')}, "AII-1 (Darii)": {"major": ('A', 'M', 'P'), "minor": ('I', 'S', 'M'), "conclusion": ('I', 'S', 'P')}, "EIO-1 (Ferio)": {"major": ('E', 'M', 'P'), "minor": ('I', 'S', 'M'), "conclusion": ('O', 'S', 'P')}, "EAE-2 (Cesare)": {"major": ('E', 'P', 'M'), "minor": ('A', 'S', 'M'), "conclusion": ('E', 'S', 'P')}, "AEE-2 (Camestres)": {"major": ('A', 'P', 'M'), "minor": ('E', 'S', 'M'), "conclusion": ('E', 'S', 'P')}, "EIO-2 (Festino)": {"major": ('E', 'P', 'M'), "minor": ('I', 'S', 'M'), "conclusion": ('O', 'S', 'P')}, "AOO-2 (Baroco)": {"major": ('A', 'P', 'M'), "minor": ('O', 'S', 'M'), "conclusion": ('O', 'S', 'P')}, "AAI-3 (Darapti)": {"major": ('A', 'M', 'P'), "minor": ('A', 'M', 'S'), "conclusion": ('I', 'S', 'P')}, "IAI-3 (Disamis)": {"major": ('I', 'M', 'P'), "minor": ('A', 'M', 'S'), "conclusion": ('I', 'S', 'P')}, "AII-3 (Datisi)": {"major": ('A', 'M', 'P'), "minor": ('I', 'M', 'S'), "conclusion": ('I', 'S', 'P')}, "EAO-3 (Felapton)": {"major": ('E', 'M', 'P'), "minor": ('A', 'M', 'S'), "conclusion": ('O', 'S', 'P')}, "OAO-3 (Bocardo)": {"major": ('O', 'M', 'P'), "minor": ('A', 'M', 'S'), "conclusion": ('O', 'S', 'P')}, "EIO-3 (Ferison)": {"major": ('E', 'M', 'P'), "minor": ('I', 'M', 'S'), "conclusion": ('O', 'S', 'P')}, "AAI-4 (Bamalip)": {"major": ('A', 'P', 'M'), "minor": ('A', 'M', 'S'), "conclusion": ('I', 'S', 'P')}, "AEE-4 (Calemes)": {"major": ('A', 'P', 'M'), "minor": ('E', 'M', 'S'), "conclusion": ('E', 'S', 'P')}, "IAI-4 (Dimatis)": {"major": ('I', 'P', 'M'), "minor": ('A', 'M', 'S'), "conclusion": ('I', 'S', 'P')}, "EAO-4 (Fesapo)": {"major": ('E', 'P', 'M'), "minor": ('A', 'M', 'S'), "conclusion": ('O', 'S', 'P')}, "EIO-4 (Fresison)": {"major": ('E', 'P', 'M'), "minor": ('I', 'M', 'S'), "conclusion": ('O', 'S', 'P')}, "AAI-1 (Barbari)": {"major": ('A', 'M', 'P'), "minor": ('A', 'S', 'M'), "conclusion": ('I', 'S', 'P')}, "EAO-1 (Celaront)": {"major": ('E', 'M', 'P'), "minor": ('A', 'S', 'M'), "conclusion": ('O', 'S', 'P')}, "AEO-2 (Cesaro)": {"major": ('E', 'P', 'M'), "minor": ('A', 'S', 'M'), "conclusion": ('O', 'S', 'P')}, "AEO-2 (Camestrop)": {"major": ('A', 'P', 'M'), "minor": ('E', 'S', 'M'), "conclusion": ('O', 'S', 'P')}, "EAO-4 (Calemop)": {"major": ('A', 'P', 'M'), "minor": ('E', 'M', 'S'), "conclusion": ('O', 'S', 'P')}
     }
+    # Folgerbare Schablonen je Prämissenpaar: solche Distraktoren wären ebenfalls richtige Antworten
+    ENTAILED = build_entailment_table(VALID_FORMS)
+    FORM_PLANS = build_form_plans(VALID_FORMS, ENTAILED)
+    FORM_NAMES = list(VALID_FORMS)
+    BULK_TABLES = build_bulk_tables(VALID_FORMS, ENTAILED)
     def __init__(self, noun_pool=None):
-        self.noun_pool = noun_pool if noun_pool else self.DEFAULT_NOUN_POOL
+        self.noun_pool = list(dict.fromkeys(noun_pool)) if noun_pool else self.DEFAULT_NOUN_POOL  # Duplikate entfernen (eindeutige Tripel)
         if len(self.noun_pool) < 3: raise ValueError("Wort-Pool muss mind. 3 Begriffe enthalten.")
     def _format_statement(self, s_type, subj, pred):
-        return {'A': f"Alle {subj} sind {pred}.", 'E': f"Keine {subj} sind {pred}.", 'I': f"Einige {subj} sind {pred}.", 'O': f"Einige {subj} sind nicht {pred}."}[s_type]
-    def _get_canonical_form(self, s_type, subj, pred):
-        if s_type in ['E', 'I']: return (s_type, tuple(sorted((subj, pred))))
-        return (s_type, (subj, pred))
-    def _generate_distractors(self, form, terms):
-        distractors, generated_forms, S, P, M = [], set(), terms['S'], terms['P'], terms['M']
-        correct_conclusion = form['conclusion']
-        generated_forms.add(self._get_canonical_form(correct_conclusion[0], terms[correct_conclusion[1]], terms[correct_conclusion[2]]))
-        premise1_str = self._format_statement(form['major'][0], terms[form['major'][1]], terms[form['major'][2]])
-        premise2_str = self._format_statement(form['minor'][0], terms[form['minor'][1]], terms[form['minor'][2]])
-        potential_distractor_templates = []
-        for s_type in ['A', 'E', 'I', 'O']:
-            for t1 in [S, P, M]:
-                for t2 in [S, P, M]:
-                    if t1 != t2: potential_distractor_templates.append((s_type, t1, t2))
-        random.shuffle(potential_distractor_templates)
-        while len(distractors) < 3 and potential_distractor_templates:
-            s_type, subj, pred = potential_distractor_templates.pop()
-            distractor_str = self._format_statement(s_type, subj, pred)
-            if distractor_str in [premise1_str, premise2_str]: continue
-            if self._get_canonical_form(s_type, subj, pred) in generated_forms: continue
-            distractors.append(distractor_str)
-            generated_forms.add(self._get_canonical_form(s_type, subj, pred))
-        return distractors
-    def generate_question(self, question_id=1):
-        form_name, form_structure = random.choice(list(self.VALID_FORMS.items()))
-        s_term, p_term, m_term = random.sample(self.noun_pool, 3)
+        return STATEMENT_PATTERNS[s_type].format(subj, pred)
+    def _generate_distractors(self, form_name, terms):
+        """Drei Distraktoren mit unterschiedlicher kanonischer Form aus den vorbereiteten Schablonen der Form."""
+        return [random.choice(group).format(**terms) for group in random.sample(self.FORM_PLANS[form_name]["distractor_groups"], 3)]
+    def generate_question(self, question_id=1, pick=None):
+        """Zufällige Frage oder – mit `pick` = (Formindex, (i, j, k)) aus QuestionSpace.decode – genau diese Form und Begriffe."""
+        form_name = random.choice(self.FORM_NAMES) if pick is None else self.FORM_NAMES[pick[0]]
+        plan = self.FORM_PLANS[form_name]
+        s_term, p_term, m_term = random.sample(self.noun_pool, 3) if pick is None else [self.noun_pool[k] for k in pick[1]]
         term_map = {"S": s_term, "P": p_term, "M": m_term}
-        major_premise = self._format_statement(form_structure['major'][0], term_map[form_structure['major'][1]], term_map[form_structure['major'][2]])
-        minor_premise = self._format_statement(form_structure['minor'][0], term_map[form_structure['minor'][1]], term_map[form_structure['minor'][2]])
-        correct_conclusion = self._format_statement(form_structure['conclusion'][0], term_map[form_structure['conclusion'][1]], term_map[form_structure['conclusion'][2]])
-        distractors = self._generate_distractors(form_structure, term_map)
+        major_premise = plan["major"].format(**term_map)
+        minor_premise = plan["minor"].format(**term_map)
+        correct_conclusion = plan["conclusion"].format(**term_map)
+        distractors = self._generate_distractors(form_name, term_map)
         options = [correct_conclusion] + distractors
         random.shuffle(options)
         answer_choices = {chr(65 + i): option for i, option in enumerate(options)}
         answer_choices['E'] = "Keine der Schlussfolgerungen ist richtig."
-        correct_key = [key for key, value in answer_choices.items() if value == correct_conclusion][0]
+        correct_key = chr(65 + options.index(correct_conclusion))
         return {"frage_id": question_id, "praemissen": [major_premise, minor_premise], "antwortmoeglichkeiten": answer_choices, "korrekte_antwort": correct_key}
+    def generate_bulk(self, count, seed=None, space=None):
+        """
+        Erzeugt `count` Fragen auf einmal als QuestionBank (nur Index-Spalten, keine Strings):
+        Formen und Begriffstripel als NumPy-Arrays (mit `space` ohne Wiederholung aus dem Fragenraum),
+        Distraktoren über die vorberechneten Gruppen-Tabellen, Antwortreihenfolge als Index in OPTION_LAYOUTS.
+        """
+        rng = np.random.default_rng(seed)
+        n_terms, tables = len(self.noun_pool), self.BULK_TABLES
+        if space is not None:
+            forms, terms = space.draw_many(count)
+            count = len(forms)
+        else:
+            forms = rng.integers(len(self.FORM_NAMES), size=count)
+            i, j, k = rng.integers(n_terms, size=count), rng.integers(n_terms - 1, size=count), rng.integers(n_terms - 2, size=count)
+            j = j + (j >= i)
+            low, high = np.minimum(i, j), np.maximum(i, j)
+            k = k + (k >= low)
+            k = k + (k >= high)
+            terms = np.stack([i, j, k], axis=1)
+        subset = (rng.random(count) * tables["subset_counts"][forms]).astype(np.int64)
+        groups = tables["subsets"][forms, subset]
+        member = (rng.random((count, 3)) * tables["group_sizes"][forms[:, None], groups]).astype(np.int64)
+        distractors = tables["group_templates"][forms[:, None], groups, member]
+        layouts = rng.integers(len(OPTION_LAYOUTS), size=count)
+        return QuestionBank(self.noun_pool, forms.astype(np.int16), terms.astype(np.int32), distractors.astype(np.int16), layouts.astype(np.int8))
+
+class QuestionSpace:
+    """
+    Der vollständige Fragenraum (Form, geordnetes Begriffstripel S/P/M) als Ganzzahlen 0 … size-1
+    (24 Formen × n·(n-1)·(n-2) Tripel, bei 887 Begriffen ca. 1,7·10^10).
+    Gezogen wird ohne Zurücklegen entlang einer pseudozufälligen Permutation des Raums (Feistel-Netz mit Cycle-Walking):
+    Der Zustand ist nur (Schlüssel, Cursor), jede Ziehung und jede Prüfung „schon ausgegeben?“ kostet O(1).
+    Der Zustand wird im Ledger (JSON) gespeichert, sodass auch spätere Läufe keine Frage wiederholen.
+    """
+    ROUNDS = 4
+    def __init__(self, n_forms, n_terms, key=None, cursor=0, fingerprint="", path=None):
+        self.n_forms, self.n_terms = n_forms, n_terms
+        self.triples = n_terms * (n_terms - 1) * (n_terms - 2)
+        self.size = n_forms * self.triples
+        self.half_bits = max(1, ((self.size - 1).bit_length() + 1) // 2)
+        self.half_mask = (1 << self.half_bits) - 1
+        self.key = random.getrandbits(64) if key is None else key
+        self.round_keys = [(self.key * (2 * r + 1) + 0x9E3779B97F4A7C15 * (r + 1)) & 0xFFFFFFFFFFFFFFFF for r in range(self.ROUNDS)]
+        self.cursor, self.fingerprint, self.path = cursor, fingerprint, path
+
+    @staticmethod
+    def fingerprint_of(form_names, nouns):
+        return hashlib.sha1("\n".join(list(form_names) + ["--"] + list(nouns)).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def open(cls, path, form_names, nouns, reset=False, seed=None):
+        """Lädt den Fragenraum-Zustand aus `path` (None = ohne Ledger) oder legt ihn neu an; passt er nicht zu Formen/Begriffen, wird neu begonnen."""
+        fingerprint = cls.fingerprint_of(form_names, nouns)
+        key = random.Random(seed).getrandbits(64) if seed is not None else None
+        if path and not reset and os.path.isfile(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                if state.get("fingerprint") == fingerprint:
+                    return cls(len(form_names), len(nouns), state["key"], state["cursor"], fingerprint, path)
+                print(f"WARNUNG: Ledger '{path}' gehört zu einer anderen Wortliste – es wird neu begonnen.")
+            except (ValueError, KeyError) as e:
+                print(f"WARNUNG: Ledger '{path}' ist unlesbar ({e}) – es wird neu begonnen.")
+        return cls(len(form_names), len(nouns), key, 0, fingerprint, path)
+
+    def save(self):
+        """Schreibt Schlüssel und Cursor atomar (Temp-Datei + os.replace)."""
+        if not self.path: return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"fingerprint": self.fingerprint, "key": self.key, "cursor": self.cursor, "size": self.size}, f)
+        os.replace(tmp_path, self.path)
+
+    def _round(self, r, x):
+        x = (x ^ self.round_keys[r]) * 0xBF58476D1CE4E5B9 & 0xFFFFFFFFFFFFFFFF
+        return (x ^ (x >> 31)) & self.half_mask
+
+    def _feistel(self, x, inverse=False):
+        left, right = x >> self.half_bits, x & self.half_mask
+        for r in (reversed(range(self.ROUNDS)) if inverse else range(self.ROUNDS)):
+            if inverse: left, right = right ^ self._round(r, left), left
+            else: left, right = right, left ^ self._round(r, right)
+        return (left << self.half_bits) | right
+
+    def permute(self, position, inverse=False):
+        """Bijektion auf 0 … size-1 (Cycle-Walking: Werte außerhalb des Raums werden erneut verschlüsselt)."""
+        x = self._feistel(position, inverse)
+        while x >= self.size:
+            x = self._feistel(x, inverse)
+        return x
+
+    def encode(self, form_index, i, j, k):
+        """(Form, Begriffsindizes S, P, M – paarweise verschieden) -> Fragenindex."""
+        jj = j - (j > i)
+        kk = k - (k > i) - (k > j)
+        return form_index * self.triples + (i * (self.n_terms - 1) + jj) * (self.n_terms - 2) + kk
+
+    def decode(self, index):
+        """Fragenindex -> (Formindex, (i, j, k))."""
+        form_index, rest = divmod(index, self.triples)
+        rest, kk = divmod(rest, self.n_terms - 2)
+        i, jj = divmod(rest, self.n_terms - 1)
+        j = jj + (jj >= i)
+        low, high = min(i, j), max(i, j)
+        k = kk + (kk >= low)
+        k += (k >= high)
+        return form_index, (i, j, k)
+
+    def remaining(self):
+        return self.size - self.cursor
+
+    def draw(self):
+        """Nächste noch nie ausgegebene Frage als (Formindex, (i, j, k)) oder None, wenn der Raum erschöpft ist."""
+        if self.cursor >= self.size: return None
+        index = self.permute(self.cursor)
+        self.cursor += 1
+        return self.decode(index)
+
+    def draw_many(self, count):
+        """Vektorisiert: die nächsten `count` Fragen als (Formindizes, Begriffsindizes n × 3)."""
+        positions = np.arange(self.cursor, min(self.cursor + count, self.size), dtype=np.uint64)
+        self.cursor += len(positions)
+        x = self._feistel(positions)
+        outside = x >= self.size
+        while outside.any():
+            x[outside] = self._feistel(x[outside])
+            outside = x >= self.size
+        index = x.astype(np.int64)
+        form_index, rest = np.divmod(index, self.triples)
+        rest, kk = np.divmod(rest, self.n_terms - 2)
+        i, jj = np.divmod(rest, self.n_terms - 1)
+        j = jj + (jj >= i)
+        low, high = np.minimum(i, j), np.maximum(i, j)
+        k = kk + (kk >= low)
+        k = k + (k >= high)
+        return form_index, np.stack([i, j, k], axis=1)
+
+    def __contains__(self, pick):
+        """Wurde die Frage (Formindex, (i, j, k)) bereits ausgegeben?"""
+        return self.permute(self.encode(pick[0], *pick[1]), inverse=True) < self.cursor
+
+class QuestionBank:
+    """
+    Spaltenorientierte Fragen-Bank aus SyllogismGenerator.generate_bulk: je Frage nur Ganzzahlen
+    (Form, Begriffe S/P/M, drei Distraktor-Schablonen, Antwortreihenfolge). Strings entstehen erst beim Export.
+    """
+    COLUMNS = ("forms", "terms", "distractors", "layouts")
+    def __init__(self, nouns, forms, terms, distractors, layouts):
+        self.nouns = list(nouns)
+        self.forms, self.terms, self.distractors, self.layouts = forms, terms, distractors, layouts
+
+    def __len__(self):
+        return len(self.forms)
 
-def generate_questions(num_questions=1, noun_pool=None):
+    def correct_keys(self):
+        """Buchstabe der richtigen Antwort je Frage (vektorisiert)."""
+        return (CORRECT_POSITION[self.layouts] + 65).astype(np.uint8).view('S1').astype(str)
+
+    def question(self, index, question_id=None):
+        """Formatiert eine Frage im Format von generate_question."""
+        plan = SyllogismGenerator.FORM_PLANS[SyllogismGenerator.FORM_NAMES[self.forms[index]]]
+        term_map = dict(zip("SPM", (self.nouns[k] for k in self.terms[index])))
+        slots = [plan["conclusion"]] + [role_text(ROLE_TEMPLATES[t]) for t in self.distractors[index]]
+        layout = OPTION_LAYOUTS[self.layouts[index]]
+        answer_choices = {chr(65 + p): slots[slot].format(**term_map) for p, slot in enumerate(layout)}
+        answer_choices['E'] = "Keine der Schlussfolgerungen ist richtig."
+        return {"frage_id": index + 1 if question_id is None else question_id,
+                "praemissen": [plan["major"].format(**term_map), plan["minor"].format(**term_map)],
+                "antwortmoeglichkeiten": answer_choices, "korrekte_antwort": chr(65 + int(CORRECT_POSITION[self.layouts[index]]))}
+
+    def questions(self, indices=None):
+        return [self.question(i) for i in (range(len(self)) if indices is None else indices)]
+
+    def to_npz(self, path):
+        """Speichert die Index-Spalten plus Begriffe, Formnamen und Schablonen (komprimiertes NPZ)."""
+        np.savez_compressed(path, forms=self.forms, terms=self.terms, distractors=self.distractors, layouts=self.layouts,
+                            nouns=np.array(self.nouns), form_names=np.array(SyllogismGenerator.FORM_NAMES),
+                            templates=np.array([''.join(t) for t in ROLE_TEMPLATES]))
+
+    @classmethod
+    def from_npz(cls, path):
+        with np.load(path) as data:
+            if list(data["form_names"]) != SyllogismGenerator.FORM_NAMES or list(data["templates"]) != [''.join(t) for t in ROLE_TEMPLATES]:
+                raise ValueError(f"Fragen-Bank '{path}' passt nicht zu den Formen/Schablonen dieser Version.")
+            return cls(data["nouns"].tolist(), *(data[name] for name in cls.COLUMNS))
+
+    def to_sqlite(self, path, chunk_size=100000):
+        """Schreibt die Bank als Ganzzahl-Zeilen in SQLite (Tabellen items, nouns, forms, templates)."""
+        with sqlite3.connect(path) as con:
+            con.executescript("""
+                DROP TABLE IF EXISTS items; DROP TABLE IF EXISTS nouns; DROP TABLE IF EXISTS forms; DROP TABLE IF EXISTS templates;
+                CREATE TABLE nouns (id INTEGER PRIMARY KEY, text TEXT NOT NULL);
+                CREATE TABLE forms (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+                CREATE TABLE templates (id INTEGER PRIMARY KEY, type TEXT, subj TEXT, pred TEXT);
+                CREATE TABLE items (id INTEGER PRIMARY KEY, form INTEGER, s INTEGER, p INTEGER, m INTEGER,
+                                    d1 INTEGER, d2 INTEGER, d3 INTEGER, layout INTEGER, correct TEXT);
+            """)
+            con.executemany("INSERT INTO nouns VALUES (?, ?)", enumerate(self.nouns))
+            con.executemany("INSERT INTO forms VALUES (?, ?)", enumerate(SyllogismGenerator.FORM_NAMES))
+            con.executemany("INSERT INTO templates VALUES (?, ?, ?, ?)", ((k, *t) for k, t in enumerate(ROLE_TEMPLATES)))
+            keys = self.correct_keys()
+            for start in range(0, len(self), chunk_size):
+                stop = min(start + chunk_size, len(self))
+                rows = np.column_stack([np.arange(start, stop) + 1, self.forms[start:stop], self.terms[start:stop],
+                                        self.distractors[start:stop], self.layouts[start:stop]]).tolist()
+                con.executemany("INSERT INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                (row + [key] for row, key in zip(rows, keys[start:stop].tolist())))
+
+def generate_questions(num_questions=1, noun_pool=None, space=None):
+    """Erzeugt `num_questions` Fragen; mit `space` (QuestionSpace) ohne Wiederholung über Batch und Läufe hinweg."""
     generator = SyllogismGenerator(noun_pool=noun_pool)
-    return [generator.generate_question(i + 1) for i in range(num_questions)]
+    if space is None:
+        return [generator.generate_question(i + 1) for i in range(num_questions)]
+    questions = []
+    for i in range(num_questions):
+        pick = space.draw()
+        if pick is None:
+            print("WARNUNG: Der Fragenraum ist erschöpft – es werden keine weiteren Fragen erzeugt.")
+            break
+        questions.append(generator.generate_question(i + 1, pick))
+    return questions
 
-def create_pdf_from_questions(questions, filename="medat_aufgaben.pdf"):
+_FONT_NAME = None
+_STYLES = None
+
+def setup_fonts():
     """
-    Erstellt eine PDF-Datei und stellt sicher, dass eine moderne Schriftart
-    verwendet wird, die alle Symbole (wie ☐) korrekt darstellt.
+    Registriert die Schriftart einmal pro Prozess (TTF-Dateien werden nur beim ersten Aufruf geparst)
+    und liefert ihren Namen: DejaVuSans (gute Unicode-Abdeckung, z. B. ☐), sonst Verdana, sonst Helvetica.
     """
-    # Prefer DejaVuSans if available in repo (good unicode support), fallback to Verdana or Helvetica
-    FONT_NAME = 'Helvetica'
+    global _FONT_NAME
+    if _FONT_NAME is not None: return _FONT_NAME
     try:
         pdfmetrics.registerFont(TTFont('DejaVuSans', 'EE/DejaVuSans.ttf'))
         pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', 'EE/DejaVuSans.ttf'))
         pdfmetrics.registerFontFamily('DejaVuSans', normal='DejaVuSans', bold='DejaVuSans-Bold')
-        FONT_NAME = 'DejaVuSans'
+        _FONT_NAME = 'DejaVuSans'
     except Exception:
         try:
             pdfmetrics.registerFont(TTFont('Verdana', 'Verdana.ttf'))
             pdfmetrics.registerFont(TTFont('Verdana-Bold', 'Verdanab.ttf'))
             pdfmetrics.registerFontFamily('Verdana', normal='Verdana', bold='Verdana-Bold')
-            FONT_NAME = 'Verdana'
+            _FONT_NAME = 'Verdana'
         except Exception:
             print("WARNUNG: Keine der bevorzugten Schriftarten gefunden. Verwende 'Helvetica' als Fallback.")
-            FONT_NAME = 'Helvetica'
-    
-    # Reduce margins for a more compact layout
-    doc = SimpleDocTemplate(filename, topMargin=1.2*cm, bottomMargin=1.2*cm, leftMargin=1.6*cm, rightMargin=1.6*cm)
+            _FONT_NAME = 'Helvetica'
+    return _FONT_NAME
+
+def get_styles():
+    """Baut das Style-Sheet einmal pro Prozess (alle PDFs eines Prozesses teilen es)."""
+    global _STYLES
+    if _STYLES is not None: return _STYLES
+    font_name = setup_fonts()
     styles = getSampleStyleSheet()
 
     # Set consistent font and sizes/leading to better match the reference PDF
     for key in ['Normal', 'h1', 'h2', 'h3']:
         if key in styles:
-            styles[key].fontName = FONT_NAME
+            styles[key].fontName = font_name
 
     # Adjust sizes and leading (line spacing) to be slightly smaller for denser layout
     styles['h1'].fontSize = 16
@@ -129,7 +436,52 @@ def create_pdf_from_questions(questions, filename="medat_aufgaben.pdf"):
     styles.add(styles['Normal'].clone('QuestionStyle', leftIndent=0.6*cm, spaceAfter=4, leading=13))
     # Premises will be placed inline (no bullet) to save vertical space
     styles.add(styles['Normal'].clone('PremiseStyle', leftIndent=0.6*cm, spaceBefore=2, spaceAfter=2, leading=13))
-    
+    # Larger font for solution key (we have space)
+    styles.add(ParagraphStyle('SolutionStyle', parent=styles['Normal'], fontSize=12, leading=16))
+    _STYLES = styles
+    return styles
+
+class AnswerSheet(Flowable):
+    """Draw an answer sheet like the FZ generator: centered title and one column with each question and five small boxes A-E."""
+    def __init__(self, num_questions, left_margin, font_name):
+        super().__init__()
+        self.num_questions = num_questions
+        self.left_margin = left_margin
+        self.font_name = font_name
+
+    def wrap(self, availWidth, availHeight):
+        return (availWidth, availHeight)
+
+    def draw(self):
+        c = self.canv
+        width, height = c._pagesize
+        # Title (centered)
+        c.setFont(self.font_name, 16)
+        c.drawCentredString(width/2, height-40*mm, 'Antwortbogen')
+        c.setFont(self.font_name, 12)
+        start_y_ans = height-60*mm
+        x_label = self.left_margin
+        x_boxes_start = x_label + 30*mm
+        box_spacing = 20*mm
+        for i in range(self.num_questions):
+            y = start_y_ans - (i*10*mm)
+            c.drawString(x_label, y, f"Aufgabe {i + 1}:")
+            for j, opt in enumerate(['A','B','C','D','E']):
+                bx = x_boxes_start + j*box_spacing
+                c.rect(bx, y-1, 4*mm, 4*mm, fill=0, stroke=1)
+                c.drawString(bx + 6*mm, y, opt)
+
+def create_pdf_from_questions(questions, filename="medat_aufgaben.pdf"):
+    """
+    Erstellt eine PDF-Datei und stellt sicher, dass eine moderne Schriftart
+    verwendet wird, die alle Symbole (wie ☐) korrekt darstellt.
+    Schriftarten und Styles werden pro Prozess nur einmal eingerichtet (setup_fonts, get_styles).
+    """
+    font_name = setup_fonts()
+    styles = get_styles()
+    # Reduce margins for a more compact layout
+    doc = SimpleDocTemplate(filename, topMargin=1.2*cm, bottomMargin=1.2*cm, leftMargin=1.6*cm, rightMargin=1.6*cm)
+
     story = []
     story.append(Paragraph("MedAT - KFF", styles['h1']))
     story.append(Paragraph("Untertest: Implikationen erkennen - 10 min", styles['h2']))
@@ -148,51 +500,30 @@ def create_pdf_from_questions(questions, filename="medat_aufgaben.pdf"):
         story.append(Spacer(1, 0.4*cm))
 
     story.append(PageBreak())
-
-    # Replace table-based Antwortbogen with a drawing-based AnswerSheet matching FZ layout
-    from reportlab.platypus import Flowable
-
-    class AnswerSheet(Flowable):
-        """Draw an answer sheet like the FZ generator: centered title and one column with each question and five small boxes A-E."""
-        def __init__(self, num_questions, left_margin=doc.leftMargin):
-            super().__init__()
-            self.num_questions = num_questions
-            self.left_margin = left_margin
-
-        def wrap(self, availWidth, availHeight):
-            return (availWidth, availHeight)
-
-        def draw(self):
-            c = self.canv
-            width, height = c._pagesize
-            # Title (centered)
-            c.setFont(FONT_NAME, 16)
-            c.drawCentredString(width/2, height-40*mm, 'Antwortbogen')
-            c.setFont(FONT_NAME, 12)
-            start_y_ans = height-60*mm
-            x_label = self.left_margin
-            x_boxes_start = x_label + 30*mm
-            box_spacing = 20*mm
-            for i in range(self.num_questions):
-                y = start_y_ans - (i*10*mm)
-                c.drawString(x_label, y, f"Aufgabe {i + 1}:")
-                for j, opt in enumerate(['A','B','C','D','E']):
-                    bx = x_boxes_start + j*box_spacing
-                    c.rect(bx, y-1, 4*mm, 4*mm, fill=0, stroke=1)
-                    c.drawString(bx + 6*mm, y, opt)
-
-    story.append(AnswerSheet(len(questions)))
+    # Drawing-based AnswerSheet matching FZ layout
+    story.append(AnswerSheet(len(questions), doc.leftMargin, font_name))
 
     story.append(PageBreak())
     story.append(Paragraph("Lösungsschlüssel", styles['h1']))
     story.append(Spacer(1, 1*cm))
-    # Larger font for solution key (we have space)
-    solution_style = ParagraphStyle('SolutionStyle', parent=styles['Normal'], fontSize=12, leading=16)
     for q in questions:
-        story.append(Paragraph(f"<b>Aufgabe {q['frage_id']}:</b> {q['korrekte_antwort']}", solution_style))
+        story.append(Paragraph(f"<b>Aufgabe {q['frage_id']}:</b> {q['korrekte_antwort']}", styles['SolutionStyle']))
 
     doc.build(story)
 
+def init_worker():
+    """Initialisierung je Pool-Prozess: Schriftarten und Styles einmal einrichten."""
+    setup_fonts()
+    get_styles()
+
+def render_pdf_job(questions, filename):
+    """Worker: rendert eine PDF und liefert (Dateiname, Fehlermeldung oder None)."""
+    try:
+        create_pdf_from_questions(questions, filename=filename)
+        return filename, None
+    except Exception as e:
+        return filename, str(e)
+
 # --- Hauptprogramm ---
 if __name__ == "__main__":
     import argparse
@@ -208,6 +539,13 @@ if __name__ == "__main__":
     parser.add_argument("--questions", "-q", type=int, default=DEFAULT_FRAGEN_PRO_PDF, help="Anzahl Fragen pro PDF (Standard: 10)")
     parser.add_argument("--words", type=str, default=DEFAULT_WORT_DATEI, help="Wortdatei (Standard: words.txt)")
     parser.add_argument("--output-dir", type=str, default=DEFAULT_OUTPUT_DIR, help="Ausgabeverzeichnis (Standard: output)")
+    parser.add_argument("--ledger", type=str, default=None, help="Ledger der ausgegebenen Fragen (Standard: <Wortdatei>.ledger.json)")
+    parser.add_argument("--no-ledger", action="store_true", help="Kein Ledger: nur innerhalb dieses Laufs ohne Wiederholung")
+    parser.add_argument("--reset-ledger", action="store_true", help="Ledger vor dem Lauf zurücksetzen")
+    parser.add_argument("--workers", "-w", type=int, default=1, help="Anzahl paralleler Prozesse für das Rendern (Standard: 1)")
+    parser.add_argument("--bulk", type=int, default=0, help="Statt PDFs N Fragen für eine Fragen-Bank erzeugen (NumPy-Bulk-Modus)")
+    parser.add_argument("--bank", type=str, default="fragenbank.npz", help="Ziel der Fragen-Bank: .npz oder .sqlite/.db (Standard: fragenbank.npz)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed für die Reihenfolge des Fragenraums (nur bei neuem Ledger)")
 
     args = parser.parse_args()
 
@@ -215,11 +553,24 @@ if __name__ == "__main__":
     FRAGEN_PRO_PDF = max(1, int(args.questions))
     WORT_DATEI = args.words
     OUTPUT_DIR = args.output_dir
+    WORKERS = max(1, int(args.workers))
 
     print("--- Schritt 1: Lade Wörter ---")
     wortliste = load_words_from_file(filename=WORT_DATEI)
 
     if wortliste and len(wortliste) >= 3:
+        # Fragenraum ohne Zurücklegen: keine Wiederholung innerhalb des Batches und (mit Ledger) über Läufe hinweg
+        ledger_path = None if args.no_ledger else (args.ledger or os.path.splitext(WORT_DATEI)[0] + ".ledger.json")
+        space = QuestionSpace.open(ledger_path, SyllogismGenerator.FORM_NAMES, list(dict.fromkeys(wortliste)), args.reset_ledger, args.seed)
+        print(f"Fragenraum: {space.size} Fragen, davon {space.cursor} bereits ausgegeben.")
+        if args.bulk > 0:
+            print(f"\n--- Bulk-Modus: erzeuge {args.bulk} Fragen für '{args.bank}' ---")
+            bank = SyllogismGenerator(noun_pool=wortliste).generate_bulk(args.bulk, seed=args.seed, space=space)
+            if args.bank.lower().endswith((".sqlite", ".db")): bank.to_sqlite(args.bank)
+            else: bank.to_npz(args.bank)
+            space.save()
+            print(f"{len(bank)} Fragen in '{args.bank}' gespeichert.")
+            raise SystemExit(0)
         print(f"\n--- Schritt 2: Starte Batch-Erstellung für {BATCH_ANZAHL} PDFs ---")
         # Sicherstellen, dass der Ausgabeordner existiert
         try:
@@ -227,16 +578,28 @@ if __name__ == "__main__":
         except Exception as e:
             print(f"FEHLER: Konnte Ausgabeverzeichnis '{OUTPUT_DIR}' nicht erstellen: {e}")
             raise
+        # Fragen werden im Hauptprozess gezogen (Ledger bleibt konsistent), gerendert wird seriell oder im Prozess-Pool
+        jobs = []
         for i in range(1, BATCH_ANZAHL + 1):
-            pdf_name = f"IM_Simulation_{i}.pdf"
-            output_path = os.path.join(OUTPUT_DIR, pdf_name)
-            print(f"\nErstelle PDF {i}/{BATCH_ANZAHL}: '{output_path}'")
-            questions = generate_questions(num_questions=FRAGEN_PRO_PDF, noun_pool=wortliste)
-            try:
-                create_pdf_from_questions(questions, filename=output_path)
-                print(f"'{output_path}' wurde erfolgreich erstellt.")
-            except Exception as e:
-                print(f"FEHLER bei der Erstellung von '{output_path}': {e}")
-        print(f"\nBatch-Prozess abgeschlossen. {BATCH_ANZAHL} Übungsblätter wurden in '{OUTPUT_DIR}' erstellt.")
+            questions = generate_questions(num_questions=FRAGEN_PRO_PDF, noun_pool=wortliste, space=space)
+            if not questions: break
+            jobs.append((questions, os.path.join(OUTPUT_DIR, f"IM_Simulation_{i}.pdf")))
+        space.save()
+
+        def report(result):
+            output_path, error = result
+            if error: print(f"FEHLER bei der Erstellung von '{output_path}': {error}")
+            else: print(f"'{output_path}' wurde erfolgreich erstellt.")
+
+        if WORKERS > 1 and len(jobs) > 1:
+            print(f"Rendere {len(jobs)} PDFs mit {WORKERS} Prozessen...")
+            with ProcessPoolExecutor(max_workers=WORKERS, initializer=init_worker) as pool:
+                for result in pool.map(render_pdf_job, *zip(*jobs)):
+                    report(result)
+        else:
+            for i, (questions, output_path) in enumerate(jobs, 1):
+                print(f"\nErstelle PDF {i}/{BATCH_ANZAHL}: '{output_path}'")
+                report(render_pdf_job(questions, output_path))
+        print(f"\nBatch-Prozess abgeschlossen. {len(jobs)} Übungsblätter wurden in '{OUTPUT_DIR}' erstellt.")
     else:
         print("\nPROGRAMM BEENDET. Stelle sicher, dass 'words.txt' existiert und mind. 3 Wörter enthält.")
\ No newline at end of file
@@ -1,74 +1,189 @@
 import random
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import defaultdict
+import numpy as np
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import cm, mm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from wortmerkmale import (WordTable, AnagramLexicon, UsedWordLedger, hardest_scramble, hardest_scrambles,
+                          load_difficulty, difficulty_bands, band_range)
+
+class WordIndex:
+    """
+    Vorab gebauter Index über die Wortliste: Buckets nach (Länge, Anzahl unterschiedlicher Buchstaben, Schwierigkeitsband).
+    Jeder Bucket enthält Zeilenindizes der Merkmalstabelle, wird einmal gemischt und über einen Cursor
+    abgearbeitet, sodass das nächste unbenutzte Wort eines Längenbereichs ohne Scan über die ganze Liste gezogen wird.
+    """
+    def __init__(self, lengths, unique_counts, rng=random, eligible=None, bands=None):
+        self.buckets = defaultdict(list)
+        keys = np.asarray(lengths, dtype=np.int64) * 1024 + np.asarray(unique_counts, dtype=np.int64)
+        keys = keys * 64 + (0 if bands is None else np.asarray(bands, dtype=np.int64))
+        order = np.argsort(keys, kind='stable')
+        if eligible is not None:
+            order = order[np.asarray(eligible, dtype=bool)[order]]
+        bounds = np.flatnonzero(np.diff(keys[order])) + 1
+        for group in np.split(order, bounds) if len(order) else []:
+            key = int(keys[group[0]])
+            self.buckets[(key // 65536, key // 64 % 1024, key % 64)] = group.tolist()
+        for bucket in self.buckets.values():
+            rng.shuffle(bucket)
+        self.cursors = dict.fromkeys(self.buckets, 0)
+        self._key_cache = {}
+
+    def _keys(self, min_len, max_len, min_unique, bands=None):
+        """Bucket-Schlüssel eines Längen- und Bandbereichs (gecacht, unabhängig von der Wortanzahl)."""
+        cache_key = (min_len, max_len, min_unique, bands)
+        if cache_key not in self._key_cache:
+            low, high = bands or (0, 63)
+            self._key_cache[cache_key] = sorted(k for k in self.buckets if min_len <= k[0] <= max_len and k[1] >= min_unique and low <= k[2] <= high)
+        return self._key_cache[cache_key]
+
+    def remaining(self, min_len, max_len, min_unique=4, bands=None):
+        """Anzahl noch nicht gezogener Wörter im Bereich."""
+        return sum(len(self.buckets[k]) - self.cursors[k] for k in self._keys(min_len, max_len, min_unique, bands))
+
+    def draw(self, min_len, max_len, min_unique=4, used=(), rng=random, bands=None):
+        """
+        Zieht den Zeilenindex des nächsten unbenutzten Worts. Der Bucket wird proportional zu seinem Restbestand gewählt,
+        damit jedes verbleibende Wort des Bereichs gleich wahrscheinlich ist (wie bei random.choice über alle Kandidaten).
+        """
+        keys = self._keys(min_len, max_len, min_unique, bands)
+        while True:
+            weights = [len(self.buckets[k]) - self.cursors[k] for k in keys]
+            total = sum(weights)
+            if not total: return None
+            r = rng.randrange(total)
+            for key, weight in zip(keys, weights):
+                if r < weight: break
+                r -= weight
+            index = self.buckets[key][self.cursors[key]]
+            self.cursors[key] += 1
+            if index not in used: return index
+
+    def partition(self, min_len, max_len, sizes, min_unique=4, used=(), rng=random, bands=None):
+        """
+        Teilt den Längen- und Bandbereich vorab in disjunkte Scheiben der Größen `sizes` auf (eine je PDF).
+        Reicht der Vorrat nicht, ist die letzte Scheibe kürzer und die restlichen bleiben leer.
+        """
+        slices = []
+        for size in sizes:
+            chunk = []
+            while len(chunk) < size:
+                index = self.draw(min_len, max_len, min_unique, used, rng, bands)
+                if index is None: break
+                chunk.append(index)
+            slices.append(chunk)
+        return slices
+
 
 class PuzzleGenerator:
     """
     Erstellt Wortflüssigkeits-Rätsel als PDF, jetzt mit Titelseite und Batch-Funktion.
     """
+    # Schwierigkeit = Wortlänge wie bisher und zusätzlich ein Quantilbereich des Schwierigkeitswerts (siehe wortmerkmale.compute_difficulty).
+    # Die Quantilbereiche liegen auf Dezilgrenzen und überschneiden sich nicht (jedes Dezil gehört zu genau einem Grad).
     DIFFICULTY_LEVELS = {
-        "easy":   {"min_len": 5, "max_len": 9},
-        "medium": {"min_len": 7, "max_len": 12},
-        "hard":   {"min_len": 10, "max_len": 15},
-        "full":   {"min_len": 5, "max_len": 15},
+        "easy":   {"min_len": 5, "max_len": 9, "min_q": 0.0, "max_q": 0.4},
+        "medium": {"min_len": 7, "max_len": 12, "min_q": 0.4, "max_q": 0.7},
+        "hard":   {"min_len": 10, "max_len": 15, "min_q": 0.7, "max_q": 1.0},
+        "full":   {"min_len": 5, "max_len": 15, "min_q": 0.0, "max_q": 1.0},
     }
     ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    # Lexikon für die Mehrdeutigkeitsprüfung (zusätzlich zur eigenen Wortliste); möglichst groß wählen.
+    LEXICON_FILES = ("finale_uebereinstimmungen100x40.txt",)
+    # Frequenzkorpus (ID<TAB>Wort<TAB>Anzahl) für das Häufigkeitsmerkmal; optional.
+    FREQUENCY_FILE = "Wortfrequenz.txt"
 
-    def __init__(self, word_list_path="finale_uebereinstimmungen30x40.txt"):
+    def __init__(self, word_list_path="finale_uebereinstimmungen30x40.txt", lexicon_paths=None,
+                 ledger_path="auto", reuse_horizon=None, reset_ledger=False, seed=None, frequency_path=None):
         """
-        Initialisiert den Generator und lädt die Wortliste.
+        Initialisiert den Generator und lädt die Wortliste (über die gecachte Merkmalstabelle, siehe wortmerkmale.py).
+        Wörter, deren Buchstaben laut Lexikon auch ein Wort mit anderem Anfangsbuchstaben ergeben, werden nicht verwendet.
+        Das Wort-Register (`ledger_path`; "auto" = `<Wortliste>.ledger.npz`, None = aus) sperrt Wörter früherer Läufe: für immer (`reuse_horizon=None`)
+        oder nur für die letzten `reuse_horizon` Läufe; `reset_ledger=True` leert es.
+        Mit `seed` sind Wortauswahl und Rätsel reproduzierbar (sonst globales `random`).
+        Der Schwierigkeitswert je Wort wird einmalig berechnet und neben der Merkmalstabelle gecacht (`frequency_path`, Standard FREQUENCY_FILE).
         """
+        self.seed = seed
+        self.rng = random.Random(seed) if seed is not None else random
         # Stelle sicher, dass relative Pfade relativ zur Skriptdatei aufgelöst werden,
         # damit das Skript unabhängig vom aktuellen Arbeitsverzeichnis funktioniert.
+        base_dir = os.path.dirname(os.path.abspath(__file__))
         if not os.path.isabs(word_list_path):
-            base_dir = os.path.dirname(os.path.abspath(__file__))
             word_list_path = os.path.join(base_dir, word_list_path)
+        lexicon_paths = [p if os.path.isabs(p) else os.path.join(base_dir, p) for p in (self.LEXICON_FILES if lexicon_paths is None else lexicon_paths)]
         try:
-            with open(word_list_path, 'r', encoding='utf-8') as f:
-                self.master_word_list = [word.strip() for word in f if word.strip()]
+            self.table = WordTable.load(word_list_path)
+            self.master_word_list = self.table.words()
             print(f"{len(self.master_word_list)} Wörter erfolgreich aus '{word_list_path}' geladen.")
         except FileNotFoundError:
             print(f"FEHLER: Die Wortliste '{word_list_path}' wurde nicht gefunden.")
+            self.table = WordTable.from_words([])
             self.master_word_list = []
         
-        self.used_words = set()
+        self.lexicon = AnagramLexicon.from_files([p for p in lexicon_paths if os.path.abspath(p) != os.path.abspath(word_list_path)])
+        self.lexicon.add_table(self.table)
+        self.ambiguous = self.lexicon.ambiguous_rows(self.table)
+        if self.ambiguous.any():
+            print(f"{int(self.ambiguous.sum())} Wörter wegen mehrdeutiger Anagramme (anderer Anfangsbuchstabe möglich) ausgeschlossen.")
 
-    def _select_word(self, min_len, max_len):
-        """Wählt ein passendes, unbenutztes Wort aus."""
+        self.ledger = None
+        if ledger_path is not None:
+            if ledger_path == "auto":
+                ledger_path = os.path.splitext(word_list_path)[0] + ".ledger.npz"
+            elif not os.path.isabs(ledger_path):
+                ledger_path = os.path.join(base_dir, ledger_path)
+            self.ledger = UsedWordLedger.open(ledger_path, self.table, reuse_horizon, reset_ledger)
+            print(f"Wort-Register: {self.ledger.issued_count()} Wörter aus früheren Läufen gesperrt.")
+
+        frequency_path = frequency_path or self.FREQUENCY_FILE
+        if not os.path.isabs(frequency_path):
+            frequency_path = os.path.join(base_dir, frequency_path)
+        self.difficulty = load_difficulty(self.table, frequency_path, verbose=False)
+
+        self.used_words = set()   # Zeilenindizes der Merkmalstabelle
+        eligible = ~self.ambiguous if self.ledger is None else ~self.ambiguous & ~self.ledger.blocked
+        self.word_index = WordIndex(self.table.length, self.table.unique_count, rng=self.rng, eligible=eligible,
+                                    bands=difficulty_bands(self.difficulty))
+
+    @staticmethod
+    def _bands(level):
+        return band_range(level["min_q"], level["max_q"])
+
+    def _select_word(self, min_len, max_len, bands=None):
+        """Wählt ein passendes, unbenutztes Wort aus (optional nur aus den Schwierigkeitsbändern `bands`)."""
         # Nur Wörter mit ausreichend vielen unterschiedlichen Buchstaben zulassen,
         # damit wir 4 Antwortoptionen (eine richtige + drei falsche) aus dem Wort bilden können.
-        candidate_words = [
-            word for word in self.master_word_list
-            if (
-                min_len <= len(word) <= max_len
-                and word not in self.used_words
-                and len(set(word.upper())) >= 4
-            )
-        ]
-        if not candidate_words: return None
-        chosen_word = random.choice(candidate_words)
-        self.used_words.add(chosen_word)
-        return chosen_word
-
-    def _create_single_puzzle(self, word):
-        """Erstellt ein einzelnes Rätsel basierend auf dem Anfangsbuchstaben."""
+        index = self.word_index.draw(min_len, max_len, min_unique=4, used=self.used_words, rng=self.rng, bands=bands)
+        if index is None: return None
+        self.used_words.add(index)
+        if self.ledger is not None: self.ledger.mark(index)
+        return self.master_word_list[index]
+
+    @staticmethod
+    def _create_single_puzzle(word, rng=random, anagram=None):
+        """
+        Erstellt ein einzelnes Rätsel basierend auf dem Anfangsbuchstaben.
+        Das Anagramm ist die schwerste von mehreren Kandidaten-Permutationen (siehe wortmerkmale.hardest_scrambles);
+        Batch-Aufrufer reichen es vorberechnet herein.
+        """
         word_upper = word.upper()
         correct_answer = word_upper[0]
-        
-        word_list = list(word_upper)
-        random.shuffle(word_list)
-        anagram = "".join(word_list)
+        if anagram is None:
+            anagram = hardest_scramble(word_upper, rng)
 
         # Falsche Antworten ausschließlich aus Buchstaben des Lösungsworts wählen (ohne den korrekten Anfangsbuchstaben).
         # Durch die Filterung in _select_word haben wir garantiert mindestens 3 andere Buchstaben zur Auswahl.
         unique_letters = set(word_upper)
-        wrong_pool = list(unique_letters - {correct_answer})
-        wrong_answers = random.sample(wrong_pool, 3)
+        wrong_pool = sorted(unique_letters - {correct_answer})  # sortiert: unabhängig von der Hash-Reihenfolge des Prozesses
+        wrong_answers = rng.sample(wrong_pool, 3)
 
         options = [correct_answer] + wrong_answers
-        random.shuffle(options)
+        rng.shuffle(options)
         
         correct_option_index = options.index(correct_answer)
         
@@ -81,7 +196,7 @@ class PuzzleGenerator:
         }
 
     def generate_puzzle_data(self, difficulty, num_puzzles=15):
-        """Generiert die Daten für eine komplette Serie von Rätseln."""
+        """Generiert die Daten für eine komplette Serie von Rätseln; die gezogenen Wörter werden im Wort-Register gespeichert."""
         if difficulty not in self.DIFFICULTY_LEVELS:
             print(f"FEHLER: Schwierigkeitsgrad '{difficulty}' ist ungültig.")
             return [], []
@@ -91,23 +206,32 @@ class PuzzleGenerator:
         solutions_data = []
 
         for i in range(num_puzzles):
-            word = self._select_word(level["min_len"], level["max_len"])
+            word = self._select_word(level["min_len"], level["max_len"], self._bands(level))
             if word is None:
                 print(f"WARNUNG: Nicht genügend Wörter für {num_puzzles} Aufgaben. Es wurden nur {i} erstellt.")
                 break
             
-            puzzle = self._create_single_puzzle(word)
+            puzzle = self._create_single_puzzle(word, self.rng)
             puzzles_data.append(puzzle)
+            solutions_data.append(self._solution_text(i, puzzle))
             
-            option_letter = chr(97 + puzzle['correct_option_index'])
-            solution_text = f"{i+1}. {option_letter}) {puzzle['correct_answer_char']} (Lösungswort: {puzzle['solution_word']})"
-            solutions_data.append(solution_text)
-            
+        # _select_word markiert nur im laufenden Lauf; erst commit() sperrt die Wörter auch für spätere Läufe
+        if self.ledger is not None and puzzles_data:
+            self.ledger.commit()
         return puzzles_data, solutions_data
 
-    def create_pdf(self, puzzles_data, solutions_data, filename, difficulty_str):
-        """Erstellt die PDF-Datei mit Titelseite, Aufgaben, Antwort- und Lösungsbogen."""
-        c = canvas.Canvas(filename, pagesize=A4)
+    @staticmethod
+    def _solution_text(i, puzzle):
+        option_letter = chr(97 + puzzle['correct_option_index'])
+        return f"{i+1}. {option_letter}) {puzzle['correct_answer_char']} (Lösungswort: {puzzle['solution_word']})"
+
+    @staticmethod
+    def create_pdf(puzzles_data, solutions_data, filename, difficulty_str, invariant=False):
+        """
+        Erstellt die PDF-Datei mit Titelseite, Aufgaben, Antwort- und Lösungsbogen.
+        `invariant=True` lässt Zeitstempel/Dokument-ID weg (bytegleiche Ausgabe bei gleichem Inhalt).
+        """
+        c = canvas.Canvas(filename, pagesize=A4, invariant=int(invariant))
         width, height = A4
         margin_x, margin_y = 2*cm, 2*cm
         
@@ -119,88 +243,155 @@ class PuzzleGenerator:
         c.showPage()
 
         # --- SEITEN 2 (ff): AUFGABEN ---
-        y_pos = height - margin_y
-        for i, puzzle in enumerate(puzzles_data):
-            if i > 0 and i % 4 == 0:
+        # Je Seite ein einziges Textobjekt, Elemente nach Schrift gruppiert (nur drei Schriftwechsel pro Seite).
+        # Jedes Anagramm ist ein Textlauf mit Zeichenabstand statt eines drawString-Aufrufs pro Buchstabe.
+        letter_spacing = 3 * cm / 4 # Entspricht ca. 3 Leerzeichen (Raster je Buchstabe)
+        puzzle_height = 1.2*cm + 1.2*cm + 5*0.7*cm + 1*cm
+        for page_start in range(0, len(puzzles_data), 4):
+            if page_start > 0:
                 c.showPage()
-                y_pos = height - margin_y
+            page = puzzles_data[page_start:page_start + 4]
+            tops = [height - margin_y - k * puzzle_height for k in range(len(page))]
+            text = c.beginText()
 
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(margin_x, y_pos, f"Übungsaufgabe {i + 1}")
-            y_pos -= 1.2 * cm
-            
-            c.setFont("Helvetica-Bold", 16)
-            # Passen Sie diesen Wert an, um den Buchstabenabstand zu ändern
-            letter_spacing = 3 * cm / 4 # Entspricht ca. 3 Leerzeichen
-            x_pos = margin_x + 1*cm
-            for char in puzzle['anagram']:
-                c.drawString(x_pos, y_pos, char)
-                x_pos += letter_spacing
-            y_pos -= 1.2 * cm
-            
-            c.setFont("Helvetica", 11)
-            options_list = [f"{chr(97+j)}) {opt}" for j, opt in enumerate(puzzle['options'])]
-            options_list.append("e) Keine Antwort ist richtig")
-            
-            for line in options_list:
-                c.drawString(margin_x + 1*cm, y_pos, line)
-                y_pos -= 0.7 * cm
-            y_pos -= 1 * cm
+            text.setFont("Helvetica-Bold", 12)
+            for k, y in enumerate(tops):
+                text.setTextOrigin(margin_x, y)
+                text.textOut(f"Übungsaufgabe {page_start + k + 1}")
+
+            text.setFont("Helvetica-Bold", 16)
+            for puzzle, y in zip(page, tops):
+                anagram = puzzle['anagram']
+                # Zeichenabstand so, dass die Gesamtbreite dem bisherigen Raster (letter_spacing je Buchstabe) entspricht
+                text.setCharSpace(letter_spacing - stringWidth(anagram, "Helvetica-Bold", 16) / len(anagram))
+                text.setTextOrigin(margin_x + 1*cm, y - 1.2*cm)
+                text.textOut(anagram)
+            text.setCharSpace(0)
+
+            text.setFont("Helvetica", 11, leading=0.7*cm)
+            for puzzle, y in zip(page, tops):
+                options_list = [f"{chr(97+j)}) {opt}" for j, opt in enumerate(puzzle['options'])]
+                options_list.append("e) Keine Antwort ist richtig")
+                text.setTextOrigin(margin_x + 1*cm, y - 2.4*cm)
+                text.textLines(options_list)
+            c.drawText(text)
 
         # --- ANTWORTBOGEN (FZ-style) ---
+        # Eine Zeile (Kästchen A–E) wird einmal als Form-XObject definiert und je Aufgabe nur referenziert.
         c.showPage()
         c.setFont("Helvetica-Bold", 16); c.drawCentredString(width/2, height-40*mm, "Antwortbogen")
-        c.setFont("Helvetica", 12); start_y_ans = height-60*mm
-        for i in range(len(puzzles_data)):
-            y = start_y_ans - (i*10*mm)
-            c.drawString(40*mm, y, f"Aufgabe {i + 1}:")
+        start_y_ans = height-60*mm
+        if puzzles_data:
+            c.beginForm("wf_answer_row")
+            c.setFont("Helvetica", 12)
             for j, opt in enumerate(["A","B","C","D","E"]):
-                c.rect(80*mm+j*20*mm, y-1, 4*mm, 4*mm, fill=0, stroke=1)
-                c.drawString(80*mm+j*20*mm+6*mm, y, opt)
+                c.rect(80*mm+j*20*mm, -1, 4*mm, 4*mm, fill=0, stroke=1)
+                c.drawString(80*mm+j*20*mm+6*mm, 0, opt)
+            c.endForm()
+        labels = c.beginText()
+        labels.setFont("Helvetica", 12, leading=10*mm)
+        labels.setTextOrigin(40*mm, start_y_ans)
+        labels.textLines([f"Aufgabe {i + 1}:" for i in range(len(puzzles_data))])
+        c.drawText(labels)
+        for i in range(len(puzzles_data)):
+            c.saveState()
+            c.translate(0, start_y_ans - (i*10*mm))
+            c.doForm("wf_answer_row")
+            c.restoreState()
         c.showPage()
         y_pos = height - margin_y
         c.setFont("Helvetica-Bold", 16)
         c.drawString(margin_x, y_pos, "Lösungsbogen")
         y_pos -= 1.5 * cm
-        
-        c.setFont("Helvetica", 12)
-        for solution in solutions_data:
-            c.drawString(margin_x, y_pos, solution)
-            y_pos -= 0.8 * cm
+
+        text = c.beginText()
+        text.setFont("Helvetica", 12, leading=0.8*cm)
+        text.setTextOrigin(margin_x, y_pos)
+        text.textLines(solutions_data)
+        c.drawText(text)
 
         c.save()
 
-    def batch_create_pdfs(self, difficulty, num_puzzles, num_batches, output_dir="Batch_PDFs"):
-        """Erstellt eine große Anzahl einzigartiger PDF-Tests auf einmal."""
-        
+    def batch_create_pdfs(self, difficulty, num_puzzles, num_batches, output_dir="Batch_PDFs", workers=1):
+        """
+        Erstellt eine große Anzahl einzigartiger PDF-Tests auf einmal.
+        Der Wortindex wird vorab in disjunkte Scheiben je PDF aufgeteilt; jede PDF ist danach ein unabhängiger Job
+        (eigener Seed, kein geteilter Zustand) und kann in einem Prozess-Pool (`workers` > 1) gebaut werden.
+        Bei gesetztem Seed ist die Ausgabe unabhängig von der Anzahl der Worker identisch.
+        """
+        if difficulty not in self.DIFFICULTY_LEVELS:
+            print(f"FEHLER: Schwierigkeitsgrad '{difficulty}' ist ungültig.")
+            return
+
+        level = self.DIFFICULTY_LEVELS[difficulty]
         required_words = num_puzzles * num_batches
-        if required_words > len(self.master_word_list):
-            print(f"WARNUNG: Sie möchten {required_words} einzigartige Wörter verwenden, aber die Liste enthält nur {len(self.master_word_list)}.")
+        available_words = self.word_index.remaining(level["min_len"], level["max_len"], bands=self._bands(level))
+        if required_words > available_words:
+            print(f"WARNUNG: Sie möchten {required_words} einzigartige Wörter verwenden, aber für '{difficulty}' sind nur noch {available_words} verfügbar.")
             print("Der Prozess wird gestoppt, wenn keine Wörter mehr verfügbar sind.")
         
         os.makedirs(output_dir, exist_ok=True)
         print(f"\nBeginne Batch-Erstellung von {num_batches} PDFs im Ordner '{output_dir}'...")
 
-        for i in range(num_batches):
-            print(f"--- Erstelle PDF {i+1}/{num_batches} ---")
-            
-            puzzles, solutions = self.generate_puzzle_data(difficulty, num_puzzles)
-            
-            if not puzzles:
+        # Wortscheiben und Job-Seeds werden vollständig im Elternprozess festgelegt (deterministisch bei gesetztem Seed).
+        slices = self.word_index.partition(level["min_len"], level["max_len"], [num_puzzles] * num_batches,
+                                           used=self.used_words, rng=self.rng, bands=self._bands(level))
+        jobs = []
+        for i, chunk in enumerate(slices):
+            if not chunk:
                 print("Keine weiteren Wörter verfügbar. Batch-Prozess wird vorzeitig beendet.")
                 break
-            
+            if len(chunk) < num_puzzles:
+                print(f"WARNUNG: Nicht genügend Wörter für {num_puzzles} Aufgaben. Es wurden nur {len(chunk)} erstellt.")
+            self.used_words.update(chunk)
             filename = os.path.join(output_dir, f"Wortflüssigkeit_{difficulty}_{i+1:03d}.pdf")
-            
-            self.create_pdf(puzzles, solutions, filename, difficulty)
+            jobs.append((filename, chunk, [self.master_word_list[k] for k in chunk], difficulty,
+                         self.rng.getrandbits(64), self.seed is not None))
+
+        def finished(job, elapsed):
+            print(f"--- PDF {os.path.basename(job[0])} erstellt ({len(job[1])} Aufgaben, {elapsed:.2f} s) ---")
+            # Register nach jeder fertigen PDF atomar fortschreiben (bei Abbruch bleiben die ausgegebenen Wörter gesperrt)
+            if self.ledger is not None:
+                for index in job[1]: self.ledger.mark(index)
+                self.ledger.commit()
+
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(render_pdf_job, job[0], job[2], job[3], job[4], job[5]): job for job in jobs}
+                for future in as_completed(futures):
+                    finished(futures[future], future.result())
+        else:
+            for job in jobs:
+                finished(job, render_pdf_job(job[0], job[2], job[3], job[4], job[5]))
         
         print("\nBatch-Erstellung abgeschlossen.")
 
+
+def render_pdf_job(filename, words, difficulty, job_seed, invariant=False):
+    """
+    Worker: baut eine komplette PDF aus einer fest zugeteilten Wortscheibe mit eigenem Zufallsgenerator.
+    Schreibt atomar (Temp-Datei + os.replace) und liefert die Laufzeit in Sekunden.
+    """
+    started = time.perf_counter()
+    rng = random.Random(job_seed)
+    anagrams = hardest_scrambles([word.upper() for word in words], rng)  # alle Anagramme der PDF in einem Rutsch
+    puzzles = [PuzzleGenerator._create_single_puzzle(word, rng, anagram) for word, anagram in zip(words, anagrams)]
+    solutions = [PuzzleGenerator._solution_text(i, puzzle) for i, puzzle in enumerate(puzzles)]
+    tmp_filename = f"{filename}.{os.getpid()}.tmp"
+    PuzzleGenerator.create_pdf(puzzles, solutions, tmp_filename, difficulty, invariant)
+    os.replace(tmp_filename, filename)
+    return time.perf_counter() - started
+
 # --- HAUPTPROGRAMM (Hier konfigurieren Sie alles) ---
 if __name__ == "__main__":
     
     # 1. Den Generator instanziieren
-    generator = PuzzleGenerator(word_list_path="finale_uebereinstimmungen30x40.txt")
+    # Wort-Register: REUSE_HORIZON = None -> Wörter nie wieder verwenden, z. B. 10 -> nach 10 Läufen wieder frei
+    REUSE_HORIZON = None
+    RESET_LEDGER = False      # True: Register vor dem Lauf leeren
+    SEED = None               # z. B. 42 für reproduzierbare Batches (identisch für jede Worker-Anzahl)
+    generator = PuzzleGenerator(word_list_path="finale_uebereinstimmungen30x40.txt",
+                                reuse_horizon=REUSE_HORIZON, reset_ledger=RESET_LEDGER, seed=SEED)
 
     if generator.master_word_list:
         
@@ -208,10 +399,12 @@ if __name__ == "__main__":
         DIFFICULTY = "hard"       # Wählen Sie: "easy", "medium", "hard", "full"
         PUZZLES_PER_PDF = 15      # Anzahl der Aufgaben pro einzelner PDF
         NUMBER_OF_PDFS = 15       # Wie viele einzigartige PDFs sollen erstellt werden? (erhöht auf 15 auf Benutzeranforderung)
+        WORKERS = 1               # Anzahl paralleler Prozesse für das Rendern (z. B. os.cpu_count())
         
         # 3. Batch-Prozess starten
         generator.batch_create_pdfs(
             difficulty=DIFFICULTY,
             num_puzzles=PUZZLES_PER_PDF,
-            num_batches=NUMBER_OF_PDFS
+            num_batches=NUMBER_OF_PDFS,
+            workers=WORKERS
         )
\ No newline at end of file
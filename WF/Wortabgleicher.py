@@ -1,4 +1,22 @@
+import argparse
+import heapq
+import os
 import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import chain
+
+try:
+    import resource  # nur Unix; unter Windows wird tracemalloc verwendet
+except ImportError:
+    resource = None
+
+# --- Streaming-Abgleich (begrenzter Speicher) ---
+DEFAULT_CHUNK_SIZE = 200_000   # Wörter je sortiertem Lauf, bevor auf die Platte ausgelagert wird
+MAX_MERGE_FANIN = 64           # maximal gleichzeitig geöffnete Lauf-Dateien beim Mergen
+
 
 def parse_word_token(token):
     """
@@ -33,10 +51,179 @@ def parse_word_token(token):
     return [token]
 
 
-def compare_final_lists(base_list_path, pos_list_path):
+class StreamStats:
+    """Zählt gelesene Zeilen/Bytes/Wörter und ausgelagerte Läufe; misst Laufzeit und Spitzen-Speicher."""
+    def __init__(self):
+        self.lines = 0
+        self.bytes = 0
+        self.words = 0
+        self.runs = 0
+        self.common = 0
+        self.started = time.perf_counter()
+        self._trace = resource is None
+        if self._trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def peak_memory_mb(self):
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+
+    def report(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        print(f"Gelesen: {self.lines} Zeilen ({self.bytes / 1e6:.1f} MB), {self.words} Wortformen, {self.runs} ausgelagerte Läufe")
+        print(f"Durchsatz: {self.lines / elapsed:,.0f} Zeilen/s, {self.bytes / 1e6 / elapsed:.1f} MB/s in {elapsed:.2f} s")
+        print(f"Spitzen-Speicher: {self.peak_memory_mb():.1f} MB" + (" (tracemalloc, nur Python-Objekte)" if self._trace else ""))
+
+
+def _read_lines(path, encoding, stats):
+    # newline='' lässt Zeilenenden unübersetzt, damit die Byte-Zählung der Datei entspricht
+    with open(path, 'r', encoding=encoding, newline='') as f:
+        for line in f:
+            if stats is not None:
+                stats.lines += 1
+                stats.bytes += len(line.encode(encoding))
+            yield line
+
+
+def iter_plain_words(path, encoding='utf-8', stats=None, lower=True):
+    """Einfache Wortliste: ein Wort pro Zeile (gestrippt), mit `lower=True` auf Kleinbuchstaben normalisiert."""
+    for line in _read_lines(path, encoding, stats):
+        word = line.strip()
+        if lower:
+            word = word.lower()
+        if word:
+            yield word
+
+
+def iter_pos_words(path, encoding='latin-1', stats=None):
+    """Wortart-Liste: erstes Token je Zeile, über parse_word_token zu allen Wortformen aufgeschlüsselt."""
+    for line in _read_lines(path, encoding, stats):
+        parts = line.split()
+        if not parts:
+            continue
+        for word in parse_word_token(parts[0]):
+            word = word.strip().lower()
+            if word:
+                yield word
+
+
+def iter_freq_words(path, encoding='utf-8', stats=None):
+    """Frequenzdatei (ID\tWort\tAnzahl): nur alphabetische Wörter aus Spalte 2."""
+    for line in _read_lines(path, encoding, stats):
+        parts = line.strip().split('\t')
+        if len(parts) >= 2 and parts[1].isalpha():
+            yield parts[1].lower()
+
+
+def _write_run(words, tmp_dir):
+    fd, path = tempfile.mkstemp(suffix=".run", dir=tmp_dir)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.writelines(w + "\n" for w in sorted(words))
+    return path
+
+
+def _iter_run(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield line[:-1]
+
+
+def _unique(sorted_words):
+    last = None
+    for word in sorted_words:
+        if word != last:
+            yield word
+            last = word
+
+
+def external_sort_unique(words, tmp_dir, chunk_size=DEFAULT_CHUNK_SIZE, stats=None):
+    """
+    Externe Sortierung mit Duplikat-Entfernung: Es werden höchstens `chunk_size` verschiedene Wörter im
+    Speicher gehalten; volle Puffer werden sortiert als Lauf-Datei ausgelagert und am Ende per k-Wege-Merge
+    (heapq.merge, in Stufen zu je MAX_MERGE_FANIN Dateien) zusammengeführt. Liefert sortierte, eindeutige Wörter.
+    """
+    buffer, runs = set(), []
+    for word in words:
+        if stats is not None:
+            stats.words += 1
+        buffer.add(word)
+        if len(buffer) >= chunk_size:
+            runs.append(_write_run(buffer, tmp_dir))
+            buffer = set()
+    if not runs:
+        yield from sorted(buffer)
+        return
+    if buffer:
+        runs.append(_write_run(buffer, tmp_dir))
+        buffer = None
+    if stats is not None:
+        stats.runs += len(runs)
+    while len(runs) > MAX_MERGE_FANIN:
+        group, runs = runs[:MAX_MERGE_FANIN], runs[MAX_MERGE_FANIN:]
+        fd, merged = tempfile.mkstemp(suffix=".run", dir=tmp_dir)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.writelines(w + "\n" for w in _unique(heapq.merge(*map(_iter_run, group))))
+        for path in group:
+            os.remove(path)
+        runs.append(merged)
+    yield from _unique(heapq.merge(*map(_iter_run, runs)))
+
+
+def merge_intersect(left_sorted, right_sorted):
+    """Schnittmenge zweier sortierter, eindeutiger Wortströme (Merge-Join, O(1) Speicher)."""
+    left, right = iter(left_sorted), iter(right_sorted)
+    a, b = next(left, None), next(right, None)
+    while a is not None and b is not None:
+        if a == b:
+            yield a
+            a, b = next(left, None), next(right, None)
+        elif a < b:
+            a = next(left, None)
+        else:
+            b = next(right, None)
+
+
+def intersect_streams(left_words, right_words, chunk_size=DEFAULT_CHUNK_SIZE, tmp_dir=None, stats=None):
+    """
+    Schneidet zwei (beliebig großen) Wortströme mit begrenztem Speicher: Beide Seiten werden extern sortiert,
+    dann per Merge-Join verglichen. Liefert die gemeinsamen Wörter alphabetisch sortiert (als Generator).
+    """
+    with tempfile.TemporaryDirectory(prefix="wortabgleich_", dir=tmp_dir) as work_dir:
+        # Die linke Seite wird vollständig in Läufe zerlegt, bevor die rechte gelesen wird (nur eine Seite im Speicher).
+        left_runs = tempfile.mkdtemp(dir=work_dir)
+        right_runs = tempfile.mkdtemp(dir=work_dir)
+        left_sorted = external_sort_unique(left_words, left_runs, chunk_size, stats)
+        first = next(left_sorted, None)
+        right_sorted = external_sort_unique(right_words, right_runs, chunk_size, stats)
+        left_all = chain([first] if first is not None else [], left_sorted)
+        for word in merge_intersect(left_all, right_sorted):
+            if stats is not None:
+                stats.common += 1
+            yield word
+
+
+def write_stream(words, output_path, preview=100):
+    """Schreibt den Ergebnisstrom zeilenweise (atomar über eine Temp-Datei) und zeigt die ersten Wörter an."""
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8") as f_out:
+        for word in words:
+            if count < preview:
+                print(word)
+            f_out.write(word + "\n")
+            count += 1
+    os.replace(tmp_path, output_path)
+    if count > preview:
+        print(f"... und {count - preview} weitere.")
+    return count
+
+
+def compare_final_lists(base_list_path, pos_list_path, chunk_size=DEFAULT_CHUNK_SIZE, tmp_dir=None):
     """
     Vergleicht eine einfache Wortliste mit einer formatierten Wortart-Liste
-    und findet die gemeinsamen Wörter.
+    und findet die gemeinsamen Wörter (Streaming + externe Sortierung, siehe intersect_streams).
 
     Args:
         base_list_path (str): Pfad zur sauberen Wortliste (ein Wort pro Zeile).
@@ -46,70 +233,38 @@ def compare_final_lists(base_list_path, pos_list_path):
         list or str: Eine alphabetisch sortierte Liste der gemeinsamen Wörter oder eine Fehlermeldung.
     """
     try:
-        # --- 1. Die bereits bereinigte Wortliste laden ---
-        with open(base_list_path, 'r', encoding='latin-1') as f1:
-            # Annahme: Diese Liste ist bereits sauber und in Kleinbuchstaben
-            base_words = set(f1.read().splitlines())
-
-        # --- 2. Die neue, komplex formatierte Liste verarbeiten ---
-        pos_words = set()
-        with open(pos_list_path, 'r', encoding='latin-1') as f2:
-            for line in f2:
-                if not line.strip():  # Leere Zeilen überspringen
-                    continue
-                
-                # Den ersten Teil der Zeile (das Wort-Token) extrahieren
-                word_token = line.split()[0]
-                
-                # Das Token in einzelne Wörter aufschlüsseln
-                extracted_words = parse_word_token(word_token)
-                
-                # Jedes extrahierte Wort in Kleinbuchstaben zum Set hinzufügen
-                for word in extracted_words:
-                    pos_words.add(word.lower())
-
-        # --- 3. Die Schnittmenge der beiden Wort-Sets finden ---
-        final_common_words = list(base_words.intersection(pos_words))
-        final_common_words.sort()  # Ergebnis alphabetisch sortieren
-        
-        return final_common_words
-
+        # Die Basisliste gilt als bereits bereinigt und wird wie bisher nicht in Kleinbuchstaben umgewandelt
+        return list(intersect_streams(iter_plain_words(base_list_path, 'latin-1', lower=False), iter_pos_words(pos_list_path, 'latin-1'), chunk_size, tmp_dir))
     except FileNotFoundError as e:
         return f"FEHLER: Datei nicht gefunden - {e.filename}. Bitte überprüfen Sie den Dateinamen und den Speicherort."
     except Exception as e:
         return f"Ein unerwarteter Fehler ist aufgetreten: {e}"
 
-# --- Hauptprogramm ---
-
-# Annahme: Die erste Liste ist das Ergebnis aus dem vorherigen Schritt.
-# Die zweite Liste ist die neu von Ihnen bereitgestellte Datei.
-file_base_list = "gemeinsame_woerter30k.txt" 
-file_pos_list = "Base40.1" # Speichern Sie die neue Liste unter diesem Namen
-
-# Erstellen Sie eine Dummy-Datei 'Wortart.txt' mit dem von Ihnen bereitgestellten Inhalt,
-# damit das Skript ausgeführt werden kann.
-
-final_list = compare_final_lists(file_base_list, file_pos_list)
 
-if isinstance(final_list, list):
-    if final_list:
-        print(f"Abgleich erfolgreich! Es wurden {len(final_list)} übereinstimmende Wörter gefunden:")
-        
-        # Vorschau der ersten 100 Wörter
-        for i, word in enumerate(final_list[:100]):
-            print(word)
-        if len(final_list) > 100:
-            print(f"... und {len(final_list) - 100} weitere.")
-
-        # Optional: Das Endergebnis in einer neuen Datei speichern
-        output_filename = "finale_uebereinstimmungen.txt"
-        with open(output_filename, "w", encoding="utf-8") as f_out:
-            for word in final_list:
-                f_out.write(word + "\n")
-        print(f"\nAlle übereinstimmenden Wörter wurden in '{output_filename}' gespeichert.")
+def main():
+    parser = argparse.ArgumentParser(description="Gleicht eine einfache Wortliste mit einer Wortart-Liste ab (Streaming, begrenzter Speicher).")
+    parser.add_argument("basis", nargs="?", default="gemeinsame_woerter30k.txt", help="Bereinigte Wortliste, ein Wort pro Zeile")
+    parser.add_argument("wortarten", nargs="?", default="Base40.1", help="Wortart-Liste; erstes Token je Zeile, Formen wie 'jed(e,r,s)' werden aufgeschlüsselt")
+    parser.add_argument("-o", "--output", default="finale_uebereinstimmungen.txt", help="Ausgabedatei")
+    parser.add_argument("--encoding", default="latin-1", help="Zeichenkodierung beider Eingaben (Standard: latin-1)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Wörter je Lauf im Speicher, bevor ausgelagert wird")
+    parser.add_argument("--tmp-dir", default=None, help="Ordner für ausgelagerte Läufe (Standard: System-Temp)")
+    parser.add_argument("--preview", type=int, default=100, help="Anzahl der angezeigten Wörter")
+    args = parser.parse_args()
 
+    stats = StreamStats()
+    try:
+        common = intersect_streams(iter_plain_words(args.basis, args.encoding, stats, lower=False), iter_pos_words(args.wortarten, args.encoding, stats), args.chunk_size, args.tmp_dir, stats)
+        count = write_stream(common, args.output, args.preview)
+    except FileNotFoundError as e:
+        print(f"FEHLER: Datei nicht gefunden - {e.filename}. Bitte überprüfen Sie den Dateinamen und den Speicherort.")
+        return
+    if count:
+        print(f"\nAbgleich erfolgreich! Es wurden {count} übereinstimmende Wörter gefunden und in '{args.output}' gespeichert.")
     else:
         print("Es wurden keine übereinstimmenden Wörter in den beiden Listen gefunden.")
-else:
-    # Fehlermeldung ausgeben
-    print(final_list)
\ No newline at end of file
+    stats.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
-def find_common_words_from_structured_files(freq_file_path, new_list_file_path):
+import argparse
+
+from Wortabgleicher import DEFAULT_CHUNK_SIZE, StreamStats, intersect_streams, iter_freq_words, iter_plain_words, write_stream
+
+
+def find_common_words_from_structured_files(freq_file_path, new_list_file_path, chunk_size=DEFAULT_CHUNK_SIZE, tmp_dir=None):
     """
     Liest zwei unterschiedlich formatierte Dateien, extrahiert und normalisiert die Wörter
     und gibt eine alphabetisch sortierte Liste der gemeinsamen Wörter zurück.
+    Beide Dateien werden gestreamt und extern sortiert (siehe Wortabgleicher.intersect_streams),
+    sodass auch sehr große Frequenzkorpora mit begrenztem Speicher verarbeitet werden.
 
     Args:
         freq_file_path (str): Pfad zur Frequenzdatei (Format: ID\tWort\tAnzahl).
@@ -11,69 +18,37 @@ def find_common_words_from_structured_files(freq_file_path, new_list_file_path):
         list or str: Eine Liste der gemeinsamen Wörter oder eine Fehlermeldung.
     """
     try:
-        # --- Verarbeitung der Wortfrequenz-Datei ---
-        freq_words = set()
-        with open(freq_file_path, 'r', encoding='utf-8') as f1:
-            for line in f1:
-                # Zeile am Tabulator aufteilen
-                parts = line.strip().split('\t')
-                # Sicherstellen, dass die Zeile das erwartete Format hat (mindestens 2 Spalten)
-                if len(parts) >= 2:
-                    word = parts[1]
-                    # Nur Wörter hinzufügen, die aus Buchstaben bestehen (filtert ".", "!", "123" etc. aus)
-                    if word.isalpha():
-                        # Wort in Kleinbuchstaben umwandeln und zum Set hinzufügen
-                        freq_words.add(word.lower())
-
-        # --- Verarbeitung der neuen Wortliste ---
-        new_words = set()
-        with open(new_list_file_path, 'r', encoding='utf-8') as f2:
-            for line in f2:
-                # Zeile von überflüssigen Leerzeichen befreien und in Kleinbuchstaben umwandeln
-                word = line.strip().lower()
-                # Nur hinzufügen, wenn die Zeile nicht leer ist
-                if word:
-                    new_words.add(word)
-
-        # Die Schnittmenge der beiden Mengen finden, um die gemeinsamen Wörter zu erhalten. [9]
-        common_words = list(freq_words.intersection(new_words))
-        # Die Ergebnisliste alphabetisch sortieren für eine bessere Übersicht
-        common_words.sort()
-        return common_words
-
+        return list(intersect_streams(iter_freq_words(freq_file_path), iter_plain_words(new_list_file_path), chunk_size, tmp_dir))
     except FileNotFoundError as e:
         return f"FEHLER: Datei nicht gefunden - {e.filename}. Bitte überprüfen Sie den Dateinamen und den Speicherort."
     except Exception as e:
         return f"Ein unerwarteter Fehler ist aufgetreten: {e}"
 
-# --- Hauptprogramm ---
-# Den Dateinamen hier anpassen:
-file1 = "Wortfrequenz.txt"
-file2 = "New_list.txt"
 
-# Die Funktion aufrufen, um die gemeinsamen Wörter zu finden
-common_words_list = find_common_words_from_structured_files(file1, file2)
-
-# Überprüfen, ob das Ergebnis eine Liste (Erfolg) oder ein String (Fehler) ist
-if isinstance(common_words_list, list):
-    if common_words_list:
-        print(f"Es wurden {len(common_words_list)} gemeinsame Wörter in beiden Listen gefunden:")
-        # Nur die ersten 100 zur Vorschau ausgeben, falls die Liste sehr lang ist
-        preview_count = 100
-        for i, word in enumerate(common_words_list):
-            if i < preview_count:
-                print(word)
-        if len(common_words_list) > preview_count:
-            print(f"... und {len(common_words_list) - preview_count} weitere.")
-
-        # Optional: Die komplette Liste in eine neue Datei schreiben
-        with open("gemeinsame_woerter.txt", "w", encoding="utf-8") as f_out:
-            for word in common_words_list:
-                f_out.write(word + "\n")
-        print("\nAlle gemeinsamen Wörter wurden in die Datei 'gemeinsame_woerter.txt' gespeichert.")
+def main():
+    parser = argparse.ArgumentParser(description="Findet die gemeinsamen Wörter einer Frequenzdatei und einer Wortliste (Streaming, begrenzter Speicher).")
+    parser.add_argument("frequenzdatei", nargs="?", default="Wortfrequenz.txt", help="Frequenzdatei im Format ID<TAB>Wort<TAB>Anzahl")
+    parser.add_argument("wortliste", nargs="?", default="New_list.txt", help="Wortliste, ein Wort pro Zeile")
+    parser.add_argument("-o", "--output", default="gemeinsame_woerter.txt", help="Ausgabedatei")
+    parser.add_argument("--encoding", default="utf-8", help="Zeichenkodierung beider Eingaben (Standard: utf-8)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Wörter je Lauf im Speicher, bevor ausgelagert wird")
+    parser.add_argument("--tmp-dir", default=None, help="Ordner für ausgelagerte Läufe (Standard: System-Temp)")
+    parser.add_argument("--preview", type=int, default=100, help="Anzahl der angezeigten Wörter")
+    args = parser.parse_args()
 
+    stats = StreamStats()
+    try:
+        common = intersect_streams(iter_freq_words(args.frequenzdatei, args.encoding, stats), iter_plain_words(args.wortliste, args.encoding, stats), args.chunk_size, args.tmp_dir, stats)
+        count = write_stream(common, args.output, args.preview)
+    except FileNotFoundError as e:
+        print(f"FEHLER: Datei nicht gefunden - {e.filename}. Bitte überprüfen Sie den Dateinamen und den Speicherort.")
+        return
+    if count:
+        print(f"\nEs wurden {count} gemeinsame Wörter gefunden und in die Datei '{args.output}' gespeichert.")
     else:
         print("Es wurden keine gemeinsamen Wörter in den beiden Listen gefunden.")
-else:
-    # Hier wird die Fehlermeldung aus dem 'except'-Block ausgegeben
-    print(common_words_list)
\ No newline at end of file
+    stats.report()
+
+
+if __name__ == "__main__":
+    main()
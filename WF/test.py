@@ -1,10 +1,16 @@
 import random
 import csv
+import sys
+import time
+import io
+import contextlib
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
-from collections import defaultdict
 import string # Importiert für Buchstaben-Generierung
+import numpy as np
+from wortmerkmale import (WordTable, AnagramLexicon, hardest_scrambles, load_difficulty, read_word_lines,
+                          difficulty_bands, band_range)
 
 # --------------------------
 # Wortflüssigkeit Exercise Generator - Überarbeitet
@@ -15,13 +21,18 @@ DEFAULT_WORD_FILE = 'input.txt' # Deine große Wortliste hier eintragen
 NUM_EXERCISES_PER_SIM = 15 # Sicherstellen, dass es 15 ist
 MAX_EXERCISES_PER_PAGE = 6 # Neu: Maximal 6 Übungen pro Seite
 FORBIDDEN_CHARS = 'ÄÖÜäöüß' # Zeichen, die komplett ausgeschlossen werden
+# Zusätzliche Wortlisten für die Anagramm-Prüfung (je größer, desto zuverlässiger); fehlende Dateien werden übersprungen
+LEXICON_FILES = ['finale_uebereinstimmungen100x40.txt']
+# Frequenzkorpus (ID<TAB>Wort<TAB>Anzahl) für den Schwierigkeitswert; fehlt die Datei, entfällt nur das Häufigkeitsmerkmal
+FREQUENCY_FILE = 'Wortfrequenz.txt'
 
-# Schwierigkeitsgrade definieren die Wortlängen (nach Normalisierung)
+# Schwierigkeitsgrade: Wortlängen (nach Normalisierung) und Quantilbereich des Schwierigkeitswerts (siehe wortmerkmale.compute_difficulty);
+# die Quantilbereiche liegen auf Dezilgrenzen und überschneiden sich nicht (wie im WF-Generator)
 DIFFICULTY_SETTINGS = {
-    "easy":   {"min_len": 5, "max_len": 9},
-    "medium": {"min_len": 7, "max_len": 12},
-    "hard":   {"min_len": 10, "max_len": 15},
-    "full":   {"min_len": 5, "max_len": 15}, # Gesamter erlaubter Bereich
+    "easy":   {"min_len": 5, "max_len": 9, "min_q": 0.0, "max_q": 0.4},
+    "medium": {"min_len": 7, "max_len": 12, "min_q": 0.4, "max_q": 0.7},
+    "hard":   {"min_len": 10, "max_len": 15, "min_q": 0.7, "max_q": 1.0},
+    "full":   {"min_len": 5, "max_len": 15, "min_q": 0.0, "max_q": 1.0}, # Gesamter erlaubter Bereich
 }
 # --- Ende Konfiguration ---
 
@@ -36,17 +47,13 @@ def normalize_word(word: str) -> str:
 
 def load_word_list(source_file: str) -> list:
     """
-    Load words from a source file (one word per line).
+    Load words from a source file (one word per line; only the first field of a line counts,
+    the same rule as WordTable.load(..., first_token=True)).
     Returns a list of raw words.
     """
-    words = []
     print(f"Lade Wortliste aus '{source_file}'...")
     try:
-        with open(source_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                parts = line.split()
-                if parts:
-                    words.append(parts[0])
+        words = read_word_lines(source_file, first_token=True)
     except FileNotFoundError:
         print(f"FEHLER: Wortlistendatei '{source_file}' nicht gefunden.")
         return []
@@ -57,14 +64,18 @@ def load_word_list(source_file: str) -> list:
     return words
 
 
-def filter_words(raw_word_list: list, min_len: int = 5, max_len: int = 15) -> list:
+def filter_words_python(raw_word_list: list, min_len: int = 5, max_len: int = 15, lexicon: AnagramLexicon = None) -> list:
     """
+    Reference implementation (one Python pass per step), kept as test oracle for --benchmark;
+    generation uses the vectorized filter_table.
     Filter the raw word list based on multiple criteria:
     1. Initial filter on raw words: No spaces, no forbidden chars (ÄÖÜß), must be alphabetic.
     2. Normalize passing words (uppercase).
     3. Filter normalized words by length (min_len, max_len).
     4. Filter out potential plural forms heuristically.
-    5. Filter out *all* words that are part of an anagram group.
+    5. Filter out ambiguous anagrams: words whose letters also form a word with a different
+       first letter (lexicon = all alphabetic words of the list plus the optional `lexicon`).
+       Duplicate normalized words are kept only once.
     """
     print("Filtere Wörter...")
     # 1. Initial filter on raw words
@@ -103,24 +114,106 @@ def filter_words(raw_word_list: list, min_len: int = 5, max_len: int = 15) -> li
 
     print(f"{len(no_plurals)} Wörter nach Plural-Filter.")
 
-    # 5. Exclude *all* anagrams
-    anagram_map = defaultdict(list)
-    for w in no_plurals:
-        key = ''.join(sorted(w))
-        anagram_map[key].append(w)
+    # 5. Exclude ambiguous anagrams only (another word with a different first letter)
+    lexicon = lexicon.copy() if lexicon else AnagramLexicon()
+    for word in raw_word_list:
+        w = word.strip()
+        if w and w.isalpha():
+            lexicon.add(normalize_word(w))
 
     words_to_remove = set()
-    for key, group in anagram_map.items():
-        if len(group) > 1:
-            words_to_remove.update(group)
-
-    final_list = [w for w in no_plurals if w not in words_to_remove]
-
-    print(f"{len(words_to_remove)} Wörter wegen Anagrammen entfernt.")
+    final_list = []
+    seen = set()
+    for w in no_plurals:
+        if lexicon.is_ambiguous(w):
+            words_to_remove.add(w)
+        elif w not in seen:
+            seen.add(w)
+            final_list.append(w)
+    print(f"{len(words_to_remove)} Wörter wegen mehrdeutiger Anagramme entfernt.")
     print(f"{len(final_list)} Wörter final für die Übungsgenerierung verfügbar.")
     return final_list
 
 
+def filter_table(table: WordTable, min_len: int = 5, max_len: int = 15, lexicon: AnagramLexicon = None,
+                 scores: np.ndarray = None, min_q: float = 0.0, max_q: float = 1.0) -> list:
+    """
+    Filterpipeline als Array-Operationen auf der vorberechneten Merkmalstabelle (siehe wortmerkmale.py),
+    gleiche Kriterien und dieselben normalisierten Wörter in derselben Reihenfolge wie filter_words_python.
+    Mit `scores` (Schwierigkeitswert je Zeile, siehe load_difficulty) bleiben nur Wörter aus den Dezilen des Quantilbereichs
+    [min_q, max_q] (dieselbe Einteilung wie der Wortindex im WF-Generator, siehe band_range).
+    """
+    print("Filtere Wörter (Merkmalstabelle)...")
+    # 1. Roh-Filter
+    keep = table.alpha & ~table.forbidden & ~table.space
+    print(f"{int(keep.sum())} Wörter nach initialem Roh-Filter.")
+
+    # 2./3. Normalform ist vorberechnet -> nur Längenfilter
+    keep &= (table.length >= min_len) & (table.length <= max_len)
+    print(f"{int(keep.sum())} Wörter nach Normalisierung und Längenfilter ({min_len}-{max_len}).")
+
+    # 4. Plural-Heuristik: Singularform (norm_id je Suffix) unter den Kandidaten vorhanden?
+    present = np.zeros(table.norm_count + 1, dtype=bool)
+    present[table.norm_id[keep]] = True
+    plural_of = np.asarray(table.plural_of)
+    keep &= ~present[np.where(plural_of >= 0, plural_of, table.norm_count)].any(axis=1)
+    print(f"{int(keep.sum())} Wörter nach Plural-Filter.")
+    if scores is not None:
+        low, high = band_range(min_q, max_q)
+        bands = difficulty_bands(scores)
+        keep &= (bands >= low) & (bands <= high)
+        print(f"{int(keep.sum())} Wörter im Schwierigkeitsbereich (Quantil {min_q:.1f}-{max_q:.1f}).")
+
+    # 5. Nur mehrdeutige Anagramme entfernen (ein Lookup je Signatur der Kandidaten, die alphabetischen Zeilen der
+    #    Tabelle zählen zum Lexikon), doppelte Normalformen nur einmal behalten
+    lexicon = lexicon if lexicon else AnagramLexicon()
+    anagram = np.zeros(len(table), dtype=bool)
+    anagram[keep] = lexicon.ambiguous_rows(table, np.flatnonzero(keep), include_table=True)
+    candidates = np.flatnonzero(keep & ~anagram)
+    _, first = np.unique(table.norm_id[candidates], return_index=True)
+    final_indices = candidates[np.sort(first)]
+
+    print(f"{len(set(table.normalized_words(np.flatnonzero(anagram))))} Wörter wegen mehrdeutiger Anagramme entfernt.")
+    print(f"{len(final_indices)} Wörter final für die Übungsgenerierung verfügbar.")
+    return table.normalized_words(final_indices)
+
+
+def filter_words(raw_word_list: list, min_len: int = 5, max_len: int = 15, lexicon: AnagramLexicon = None) -> list:
+    """
+    Filters a raw word list (e.g. from load_word_list) through filter_table on an in-memory WordTable
+    (compiled as array operations on a code-point matrix, see wortmerkmale.compile_columns).
+    Same criteria and output as the reference filter_words_python.
+    """
+    return filter_table(WordTable.from_words([word.strip() for word in raw_word_list]), min_len, max_len, lexicon)
+
+
+def benchmark_filter(raw_word_list: list, table: WordTable, min_len: int = 5, max_len: int = 15, lexicon: AnagramLexicon = None,
+                     repeats: int = 3):
+    """
+    Times the reference filter_words_python on the raw list against the cold raw-list path filter_words
+    (compiling the in-memory WordTable on every call) and against filter_table on the same list loaded as cached
+    WordTable (best-of timings each), and checks that all three return identical words.
+    """
+    timings = {}
+    results = {}
+    for name, func, words in (("python", filter_words_python, raw_word_list), ("raw", filter_words, raw_word_list),
+                              ("table", filter_table, table)):
+        best = float('inf')
+        for _ in range(repeats):
+            with contextlib.redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                results[name] = func(words, min_len, max_len, lexicon)
+                best = min(best, time.perf_counter() - started)
+        timings[name] = best
+    identical = results["python"] == results["raw"] == results["table"]
+    print(f"Benchmark Filter ({len(raw_word_list)} Rohwörter, Merkmalstabelle mit {len(table)} Zeilen, Länge {min_len}-{max_len}, bestes von {repeats}):")
+    print(f"  {'Python-Referenz:':<45}{timings['python'] * 1000:.1f} ms")
+    for name, label in (("raw", "filter_words (Rohliste, inkl. Kompilieren):"), ("table", "filter_table (gecachte Merkmalstabelle):")):
+        print(f"  {label:<45}{timings[name] * 1000:.1f} ms  (Faktor {timings['python'] / max(timings[name], 1e-9):.1f}x)")
+    print(f"  Ergebnis identisch (Referenz, filter_words, filter_table): {'ja' if identical else 'NEIN'} ({len(results['table'])} Wörter)")
+    return identical
+
+
 def generate_exercises(word_list: list, count: int = 15) -> list:
     """
     Generate Wortflüssigkeit exercises:
@@ -137,11 +230,11 @@ def generate_exercises(word_list: list, count: int = 15) -> list:
 
     exercises = []
     selected_words = random.sample(word_list, count)
+    # Hardest fair scramble per word (no leading first letter, few kept bigrams/fixed points), scored in bulk.
+    scrambles = hardest_scrambles(selected_words, random)
 
-    for word in selected_words:
-        letters = list(word)
-        random.shuffle(letters)
-        scrambled = "   ".join(letters)
+    for word, scramble in zip(selected_words, scrambles):
+        scrambled = "   ".join(scramble)
         correct_first_letter = word[0]
         unique_letters_in_word = set(word)
 
@@ -398,6 +491,17 @@ def save_exercises_to_pdf(exercises: list, filename: str, title_suffix: str = ""
 
 # --- Hauptausführung ---
 if __name__ == '__main__':
+    # Benchmark: python test.py --benchmark [wortliste] vergleicht filter_words (Rohliste) und filter_table
+    # (über die gecachte Merkmalstabelle) mit der Python-Referenz auf der mit load_word_list gelesenen Liste
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        bench_file = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_WORD_FILE
+        bench_words = load_word_list(bench_file)
+        bench_table = WordTable.load(bench_file, first_token=True) if bench_words else WordTable.from_words([])
+        bench_settings = DIFFICULTY_SETTINGS["full"]
+        identical = benchmark_filter(bench_words, bench_table, bench_settings["min_len"], bench_settings["max_len"],
+                                     AnagramLexicon.from_files(LEXICON_FILES, first_token=True))
+        sys.exit(0 if identical else 1)
+
     # Wähle den Schwierigkeitsgrad: "easy", "medium", "hard", "full"
     difficulty_level = "medium"
 
@@ -408,15 +512,23 @@ if __name__ == '__main__':
     settings = DIFFICULTY_SETTINGS[difficulty_level]
     min_word_len = settings["min_len"]
     max_word_len = settings["max_len"]
-    print(f"--- Generiere Simulation: Schwierigkeit '{difficulty_level}' (Wortlänge {min_word_len}-{max_word_len}) ---")
+    print(f"--- Generiere Simulation: Schwierigkeit '{difficulty_level}' (Wortlänge {min_word_len}-{max_word_len}, Quantil {settings['min_q']}-{settings['max_q']}) ---")
 
-    raw_words = load_word_list(DEFAULT_WORD_FILE)
+    # Merkmalstabelle einmalig kompilieren bzw. aus dem Cache (Memory-Mapping) laden
+    try:
+        word_table = WordTable.load(DEFAULT_WORD_FILE, first_token=True)
+    except FileNotFoundError:
+        print(f"FEHLER: Wortlistendatei '{DEFAULT_WORD_FILE}' nicht gefunden.")
+        word_table = WordTable.from_words([])
+    print(f"{len(word_table)} Wörter geladen.")
 
-    if not raw_words:
+    if not len(word_table):
         print("Keine Wörter geladen. Skript wird beendet.")
         exit(1)
 
-    valid_words = filter_words(raw_words, min_word_len, max_word_len)
+    lexicon = AnagramLexicon.from_files(LEXICON_FILES, first_token=True)
+    scores = load_difficulty(word_table, FREQUENCY_FILE)
+    valid_words = filter_table(word_table, min_word_len, max_word_len, lexicon, scores, settings["min_q"], settings["max_q"])
 
     if not valid_words:
         print("Nach dem Filtern sind keine gültigen Wörter übrig. Skript wird beendet.")
@@ -0,0 +1,626 @@
+"""
+Wortmerkmale – vorberechnete, spaltenorientierte Merkmalstabelle für die WF-Generatoren.
+
+Eine Wortliste (ein Wort pro Zeile, UTF-8) wird einmalig in NumPy-Spalten plus einen
+String-Blob übersetzt und im Ordner `.wf_cache/<sha1 der Quelldatei>_v<Version>/` neben der
+Liste abgelegt (`..._v<Version>_t/`, wenn nur das erste Feld jeder Zeile zählt, siehe
+`read_word_lines`). Folgeläufe laden die Spalten per Memory-Mapping (`np.load(mmap_mode="r")`),
+statt die Liste erneut zu parsen. Ändert sich die Datei, ändert sich der Hash und die
+Tabelle wird automatisch neu kompiliert.
+
+Spalten (eine Zeile je nicht-leerer Listenzeile, Reihenfolge wie in der Datei):
+- `raw_blob`/`norm_blob`/`sig_blob`: Originalwort, Großschreibung und sortierte Buchstaben,
+  jeweils mit "\\n" verbunden (UTF-8); `raw_offsets`/`norm_offsets` (n+1) für O(1)-Zugriff
+  (`sig_blob` teilt sich die Offsets mit `norm_blob`)
+- `length`, `unique_count`, `letter_mask` (Bit je Buchstabe A–Z, Ä, Ö, Ü, ß; Bit 30 = sonstige)
+- `forbidden`, `space`, `alpha`: Rohfilter-Flags (vgl. `FORBIDDEN_CHARS` in test.py)
+- `norm_id`, `sig_id`: Gruppen-IDs gleicher Normalform bzw. gleicher Buchstabensignatur
+- `plural_of` (n × len(PLURAL_SUFFIXES)): `norm_id` der Singularform je Suffix oder -1
+
+Zusätzlich liegt im selben Ordner je Frequenzkorpus ein Schwierigkeitswert je Zeile
+(`difficulty_<Korpus-Schlüssel>_v<Version>.npy`, siehe `load_difficulty`).
+"""
+import hashlib
+import json
+import os
+import random
+import shutil
+
+import numpy as np
+
+FORMAT_VERSION = 1
+CACHE_DIRNAME = ".wf_cache"
+FORBIDDEN_CHARS = 'ÄÖÜäöüß'
+PLURAL_SUFFIXES = ('ER', 'EN', 'E', 'N', 'S')
+LETTER_BITS = {ch: i for i, ch in enumerate("ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÜß")}
+OTHER_BIT = 30
+SCRAMBLE_CANDIDATES = 64        # Kandidaten-Permutationen je Wort
+SCRAMBLE_WEIGHTS = (8, 2, 1)    # Strafpunkte: Anfangsbuchstabe vorn, erhaltenes Bigramm, Buchstabe an alter Stelle
+DIFFICULTY_VERSION = 1
+DIFFICULTY_BANDS = 10           # Quantil-Bänder des Schwierigkeitswerts im Wortindex (Dezile)
+PLAUSIBLE_START_SHARE = 0.02    # Buchstaben, mit denen mindestens 2 % der Wörter beginnen, gelten als plausibler Anfang
+
+
+def file_hash(path):
+    """SHA-1 der Quelldatei (Schlüssel des Caches)."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def read_word_lines(path, first_token=False):
+    """
+    Liest die Liste wie der WF-Generator: jede nicht-leere Zeile (gestrippt) ist ein Wort.
+    Mit `first_token=True` zählt wie in test.py nur das erste Feld jeder Zeile (z. B. `wort 123`, `wort<TAB>NN`).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if first_token:
+            return [parts[0] for parts in map(str.split, f) if parts]
+        return [line.strip() for line in f if line.strip()]
+
+
+def _code_matrix(strings):
+    """Strings als Code-Point-Matrix fester Breite (n × max. Länge, uint32, rechts mit 0 aufgefüllt)."""
+    arr = np.asarray(strings, dtype=str).reshape(-1)
+    width = max(arr.dtype.itemsize // 4, 1)
+    if not len(arr):
+        return np.zeros((0, width), dtype=np.uint32)
+    return np.ascontiguousarray(arr).view(np.uint32).reshape(len(arr), width)
+
+
+def _row_strings(codes):
+    """Umkehrung von _code_matrix: Zeilen einer Code-Point-Matrix als Liste von Strings."""
+    return np.ascontiguousarray(codes, dtype=np.uint32).view(f"U{codes.shape[1]}").ravel().tolist()
+
+
+def _blob(strings, lengths, codes, wide_rows):
+    """
+    Verbindet Strings zu einem UTF-8-Blob mit Offsets (Offset i = Start von Wort i). Die Byte-Längen sind die
+    Zeichenlängen plus die Mehrbytes der Zeilen `wide_rows` (nur dort enthält die Code-Point-Matrix Nicht-ASCII-Codes).
+    """
+    wide = codes[wide_rows]
+    utf8_bytes = np.asarray(lengths, dtype=np.int64) + 1
+    utf8_bytes[wide_rows] += (wide >= 0x80).sum(axis=1) + (wide >= 0x800).sum(axis=1) + (wide >= 0x10000).sum(axis=1)
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    np.cumsum(utf8_bytes, out=offsets[1:])
+    return np.frombuffer('\n'.join(strings).encode('utf-8'), dtype=np.uint8).copy(), offsets
+
+
+def _row_keys(codes):
+    """
+    Ein sortierbarer Schlüssel je Zeile einer Code-Point-Matrix (für np.argsort/np.searchsorted):
+    Bytes fester Breite bei uint8-Matrizen, sonst eine opake Zeilen-Sicht.
+    """
+    codes = np.ascontiguousarray(codes)
+    if codes.dtype == np.uint8:
+        return codes.view(f"S{codes.shape[1]}").ravel()
+    return codes.view(np.dtype((np.void, codes.shape[1] * codes.itemsize))).ravel()
+
+
+def _row_hashes(codes):
+    """64-Bit-Schlüssel je Zeile einer Code-Point-Matrix: die Zeilenbytes in 8-Byte-Blöcken gemischt."""
+    raw = np.ascontiguousarray(codes).view(np.uint8).reshape(len(codes), codes.shape[1] * codes.itemsize)
+    blocks = np.zeros((len(codes), -(-raw.shape[1] // 8) * 8), dtype=np.uint8)
+    blocks[:, :raw.shape[1]] = raw
+    h = np.zeros(len(codes), dtype=np.uint64)
+    for block in blocks.view('<u8').T:
+        h = (h ^ block) * np.uint64(0x9E3779B97F4A7C15)
+        h ^= h >> np.uint64(32)
+    return h
+
+
+def _group_rows(codes):
+    """
+    Gruppiert gleiche Zeilen einer Code-Point-Matrix; IDs in der Reihenfolge des ersten Auftretens (wie ein Dict
+    mit setdefault). Sortiert wird nach 64-Bit-Zeilenhashes, jede Zeile wird exakt mit der ersten Zeile ihrer
+    Gruppe verglichen; bei einer Hash-Kollision wird nach den Zeilenbytes selbst sortiert.
+    Rückgabe: IDs je Zeile, Schlüsselfunktion, sortierte eindeutige Schlüssel, deren IDs und erste Zeilen
+    (für Lookups per np.searchsorted).
+    """
+    for key in (_row_hashes, _row_keys):
+        keys = key(codes)
+        order = np.argsort(keys)
+        sorted_keys = keys[order]
+        new = np.ones(len(keys), dtype=bool)
+        new[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        starts = np.flatnonzero(new)
+        first_rows = np.minimum.reduceat(order, starts) if len(order) else order
+        rank = np.empty(len(starts), dtype=np.int32)
+        rank[np.argsort(first_rows)] = np.arange(len(starts), dtype=np.int32)
+        group = np.empty(len(keys), dtype=np.intp)
+        group[order] = np.cumsum(new) - 1
+        if key is _row_keys or (codes == codes[first_rows[group]]).all():
+            return rank[group], key, sorted_keys[starts], rank, first_rows
+
+
+def compile_columns(words):
+    """
+    Berechnet alle Merkmalsspalten für eine Liste von Rohwörtern als Array-Operationen auf einer
+    Code-Point-Matrix (n × max. Länge); nur Zeilen mit Nicht-ASCII-Zeichen werden per str.upper großgeschrieben
+    (z. B. ß -> SS, die Länge ändert sich). Plural-Singulare per Sorted-Merge-Join (np.searchsorted der Stämme
+    in den sortierten Normalformen), Signaturen aus den sortierten Zeilen.
+    """
+    n = len(words)
+    codes = _code_matrix(words)
+    # Passt jeder Code in ein Byte (Latin-1, der Normalfall), läuft alles Weitere auf einer uint8-Matrix
+    if not codes.size or int(codes.max()) < 256:
+        codes = codes.astype(np.uint8)
+
+    # Rohfilter-Flags über die ganze Matrix (leere Zeilen sind nicht alphabetisch)
+    forbidden = np.isin(codes, [ord(c) for c in FORBIDDEN_CHARS]).any(axis=1)
+    space = (codes == 32).any(axis=1)
+    alpha = np.char.isalpha(np.ascontiguousarray(codes, dtype=np.uint32).view(f"U{codes.shape[1]}").ravel())
+    raw_length = (codes != 0).sum(axis=1)
+
+    # Großschreibung: ASCII-Zeilen per Code-Arithmetik, übrige per str.upper
+    norm = np.where((codes >= 97) & (codes <= 122), codes - 32, codes).astype(codes.dtype)
+    other = np.flatnonzero((codes >= 128).any(axis=1))
+    if len(other):
+        upper_codes = _code_matrix([words[i].upper() for i in other])
+        if int(upper_codes.max(initial=0)) >= 256:
+            norm = norm.astype(np.uint32)
+        if upper_codes.shape[1] > norm.shape[1]:
+            norm = np.hstack([norm, np.zeros((n, upper_codes.shape[1] - norm.shape[1]), dtype=norm.dtype)])
+        norm[other] = 0
+        norm[other, :upper_codes.shape[1]] = upper_codes
+    length = (norm != 0).sum(axis=1)
+
+    # Signaturen: Zeilen sortiert, Füllnullen per Überlauf (0 - 1 = Maximalwert) ans Ende
+    one = norm.dtype.type(1)
+    sig = np.sort(norm - one, axis=1) + one
+    unique_count = (sig[:, :1] != 0).sum(axis=1) + ((sig[:, 1:] != sig[:, :-1]) & (sig[:, 1:] != 0)).sum(axis=1)
+    # Buchstabenmaske: Bitwert je Code per Lookup-Tabelle (Index 256 = sonstiges Zeichen, Index 0 = Füllnull)
+    lut = np.full(257, 1 << OTHER_BIT, dtype=np.int32)
+    lut[0] = 0
+    lut[[ord(ch) for ch in LETTER_BITS]] = [1 << bit for bit in LETTER_BITS.values()]
+    letter_bits = lut[norm if norm.dtype == np.uint8 else np.minimum(norm, 256)]
+    letter_mask = np.bitwise_or.reduce(letter_bits, axis=1) if n else np.zeros(0, dtype=np.int32)
+
+    norm_id, norm_key, sorted_norms, sorted_ids, first_rows = _group_rows(norm)
+    sig_id = _group_rows(sig)[0]
+
+    # Plural-Singulare: Stamm (Wort ohne Suffix) per np.searchsorted in den sortierten Normalform-Schlüsseln
+    # nachschlagen, Treffer exakt gegen die erste Zeile der Gruppe prüfen
+    plural_of = np.full((n, len(PLURAL_SUFFIXES)), -1, dtype=np.int32)
+    for k, suf in enumerate(PLURAL_SUFFIXES):
+        rows = np.flatnonzero(length > len(suf))
+        for j, ch in enumerate(reversed(suf)):
+            rows = rows[norm[rows, length[rows] - 1 - j] == ord(ch)]
+        if not len(rows):
+            continue
+        stems = norm[rows]
+        for j in range(len(suf)):
+            stems[np.arange(len(rows)), length[rows] - 1 - j] = 0
+        pos = np.minimum(np.searchsorted(sorted_norms, norm_key(stems)), len(sorted_norms) - 1)
+        hit = (norm[first_rows[pos]] == stems).all(axis=1)
+        plural_of[rows[hit], k] = sorted_ids[pos[hit]]
+
+    # Nur Zeilen mit Nicht-ASCII-Rohwort können Mehrbyte-Zeichen (auch in Normalform und Signatur) enthalten
+    raw_blob, raw_offsets = _blob(words, raw_length, codes, other)
+    norm_blob, norm_offsets = _blob(_row_strings(norm), length, norm, other)
+    sig_blob, _ = _blob(_row_strings(sig), length, sig, other)
+
+    return {
+        "raw_blob": raw_blob, "raw_offsets": raw_offsets,
+        "norm_blob": norm_blob, "norm_offsets": norm_offsets, "sig_blob": sig_blob,
+        "length": length.astype(np.int16), "unique_count": unique_count.astype(np.int16),
+        "letter_mask": letter_mask.astype(np.int64), "forbidden": forbidden, "space": space, "alpha": alpha,
+        "norm_id": norm_id, "sig_id": sig_id, "plural_of": plural_of,
+    }
+
+
+class WordTable:
+    """Spaltenorientierte Merkmalstabelle einer Wortliste (Spalten als Attribute)."""
+    COLUMNS = ("raw_blob", "raw_offsets", "norm_blob", "norm_offsets", "sig_blob", "length", "unique_count",
+               "letter_mask", "forbidden", "space", "alpha", "norm_id", "sig_id", "plural_of")
+
+    def __init__(self, columns, meta=None):
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name])
+        self.meta = meta or {}
+        self.norm_count = int(self.norm_id.max()) + 1 if len(self.norm_id) else 0
+        self.sig_count = int(self.sig_id.max()) + 1 if len(self.sig_id) else 0
+        self._decoded = {}
+        self._first_bits = None
+        self._signature_masks = None
+
+    @classmethod
+    def from_words(cls, words):
+        """Baut die Tabelle im Speicher (ohne Cache), z. B. für bereits geladene Rohlisten."""
+        return cls(compile_columns(list(words)), {"source": None, "rows": len(words)})
+
+    @classmethod
+    def load(cls, path, cache_dir=None, rebuild=False, verbose=True, first_token=False):
+        """
+        Lädt die Tabelle zu `path` aus dem Cache (Memory-Mapping) oder kompiliert sie einmalig.
+        `first_token` wie in `read_word_lines`; beide Lesarten haben getrennte Cache-Ordner.
+        Wirft FileNotFoundError, wenn die Quelldatei fehlt.
+        """
+        digest = file_hash(path)
+        cache_root = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIRNAME)
+        target = os.path.join(cache_root, f"{digest}_v{FORMAT_VERSION}{'_t' if first_token else ''}")
+        if rebuild and os.path.isdir(target):
+            shutil.rmtree(target, ignore_errors=True)
+        if not os.path.isfile(os.path.join(target, "meta.json")):
+            cls.compile(path, target, digest, first_token)
+            if verbose: print(f"Merkmalstabelle für '{os.path.basename(path)}' kompiliert ({target}).")
+        with open(os.path.join(target, "meta.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        columns = {name: np.load(os.path.join(target, f"{name}.npy"), mmap_mode='r') for name in cls.COLUMNS}
+        meta["cache_dir"] = target
+        return cls(columns, meta)
+
+    @classmethod
+    def compile(cls, path, target, digest=None, first_token=False):
+        """Kompiliert die Liste nach `target` (erst in einen Temp-Ordner, dann atomar umbenannt)."""
+        words = read_word_lines(path, first_token)
+        columns = compile_columns(words)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        os.makedirs(tmp, exist_ok=True)
+        for name in cls.COLUMNS:
+            np.save(os.path.join(tmp, f"{name}.npy"), columns[name])
+        meta = {"source": os.path.abspath(path), "sha1": digest or file_hash(path), "rows": len(words), "version": FORMAT_VERSION,
+                "first_token": first_token}
+        with open(os.path.join(tmp, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        try:
+            os.replace(tmp, target)
+        except OSError:
+            # Ein paralleler Lauf war schneller – dessen (identische) Tabelle verwenden.
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def __len__(self):
+        return len(self.length)
+
+    def _strings(self, blob_name):
+        if blob_name not in self._decoded:
+            blob = getattr(self, blob_name)
+            self._decoded[blob_name] = bytes(blob).decode('utf-8').split('\n') if len(self) else []
+        return self._decoded[blob_name]
+
+    def _at(self, blob_name, offsets, i):
+        return bytes(getattr(self, blob_name)[offsets[i]:offsets[i + 1] - 1]).decode('utf-8')
+
+    def word(self, i):
+        """Originalwort der Zeile i (O(1), ohne den ganzen Blob zu dekodieren)."""
+        return self._at("raw_blob", self.raw_offsets, i)
+
+    def normalized(self, i):
+        return self._at("norm_blob", self.norm_offsets, i)
+
+    def signature(self, i):
+        return self._at("sig_blob", self.norm_offsets, i)
+
+    def words(self, indices=None):
+        """Originalwörter (alle oder zu einem Index-Array)."""
+        strings = self._strings("raw_blob")
+        return strings if indices is None else [strings[i] for i in indices]
+
+    def normalized_words(self, indices=None):
+        strings = self._strings("norm_blob")
+        return strings if indices is None else [strings[i] for i in indices]
+
+    def signatures(self, indices=None):
+        strings = self._strings("sig_blob")
+        return strings if indices is None else [strings[i] for i in indices]
+
+    def first_letter_bits(self):
+        """Bit des Anfangsbuchstabens je Zeile wie `first_letter_bit`, aus dem ersten Byte der Normalform
+        (nur Zeilen mit Mehrbyte-Anfang werden dekodiert)."""
+        if self._first_bits is None:
+            lut = np.full(256, 1 << OTHER_BIT, dtype=np.int64)
+            lut[[ord(ch) for ch in LETTER_BITS if ord(ch) < 128]] = [1 << bit for ch, bit in LETTER_BITS.items() if ord(ch) < 128]
+            blob = np.asarray(self.norm_blob)
+            first = blob[np.minimum(self.norm_offsets[:-1], max(len(blob) - 1, 0))] if len(blob) else np.zeros(len(self), np.uint8)
+            bits = np.where(np.asarray(self.length) > 0, lut[first], 1 << OTHER_BIT)
+            for i in np.flatnonzero((first >= 0x80) & (np.asarray(self.length) > 0)):
+                bits[i] = first_letter_bit(self.normalized(i))
+            self._first_bits = bits
+        return self._first_bits
+
+    def signature_masks(self):
+        """Je Signaturgruppe das ODER der Anfangsbuchstaben-Bits aller alphabetischen Zeilen (0 ohne solche Zeilen)."""
+        if self._signature_masks is None:
+            rows = np.flatnonzero(self.alpha)
+            self._signature_masks = np.zeros(self.sig_count, dtype=np.int64)
+            np.bitwise_or.at(self._signature_masks, np.asarray(self.sig_id)[rows], self.first_letter_bits()[rows])
+        return self._signature_masks
+
+
+def first_letter_bit(normalized):
+    """Bit des Anfangsbuchstabens (gleiche Kodierung wie `letter_mask`)."""
+    return 1 << LETTER_BITS.get(normalized[:1], OTHER_BIT)
+
+
+class AnagramLexicon:
+    """
+    Signatur-indiziertes Lexikon: sortierte Buchstaben (Normalform) -> Bitmaske aller Anfangsbuchstaben,
+    mit denen sich aus genau diesen Buchstaben ein Wort des Lexikons bilden lässt.
+    Ein Anagramm ist fair, wenn alle Lösungen denselben Anfangsbuchstaben haben; die Prüfung ist ein Dict-Zugriff.
+    """
+    def __init__(self):
+        self.first_letters = {}
+
+    @classmethod
+    def from_files(cls, paths, verbose=True, first_token=False):
+        """Baut das Lexikon aus Wortlisten (über deren gecachte Merkmalstabellen); fehlende Dateien werden übersprungen."""
+        lexicon = cls()
+        for path in paths:
+            try:
+                lexicon.add_table(WordTable.load(path, verbose=verbose, first_token=first_token))
+            except FileNotFoundError:
+                if verbose: print(f"WARNUNG: Lexikon-Datei '{path}' nicht gefunden – wird übersprungen.")
+        return lexicon
+
+    def __len__(self):
+        return len(self.first_letters)
+
+    def copy(self):
+        lexicon = AnagramLexicon()
+        lexicon.first_letters = dict(self.first_letters)
+        return lexicon
+
+    def add(self, normalized):
+        """Nimmt ein (bereits großgeschriebenes) Wort auf."""
+        sig = ''.join(sorted(normalized))
+        self.first_letters[sig] = self.first_letters.get(sig, 0) | first_letter_bit(normalized)
+
+    def add_table(self, table):
+        """Nimmt alle alphabetischen Zeilen einer Merkmalstabelle auf (ein Dict-Zugriff je Signaturgruppe)."""
+        masks = table.signature_masks()
+        _, first_rows = np.unique(table.sig_id, return_index=True)
+        groups = np.flatnonzero(masks)
+        get = self.first_letters.get
+        for sig, mask in zip(table.signatures(first_rows[groups]), masks[groups].tolist()):
+            self.first_letters[sig] = get(sig, 0) | mask
+
+    def first_letter_mask(self, signature):
+        return self.first_letters.get(signature, 0)
+
+    def is_ambiguous(self, word):
+        """True, wenn die Buchstaben von `word` auch ein Lexikonwort mit anderem Anfangsbuchstaben ergeben."""
+        norm = word.upper()
+        return bool(self.first_letters.get(''.join(sorted(norm)), 0) & ~first_letter_bit(norm))
+
+    def ambiguous_rows(self, table, rows=None, include_table=False):
+        """
+        Bool-Array: Mehrdeutigkeit je Tabellenzeile bzw. je Zeile aus `rows` (ein Lookup je Signaturgruppe statt je Wort).
+        Mit `include_table=True` zählen die alphabetischen Zeilen der Tabelle selbst mit, als wäre sie per
+        `add_table` aufgenommen – ohne das Lexikon zu kopieren oder zu verändern.
+        """
+        rows = np.arange(len(table)) if rows is None else np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return np.zeros(0, dtype=bool)
+        sig_id = np.asarray(table.sig_id)[rows]
+        groups, first = np.unique(sig_id, return_index=True)
+        group_masks = np.zeros(table.sig_count, dtype=np.int64)
+        group_masks[groups] = [self.first_letters.get(s, 0) for s in table.signatures(rows[first])]
+        if include_table:
+            group_masks |= table.signature_masks()
+        return (group_masks[sig_id] & ~table.first_letter_bits()[rows]) != 0
+
+
+class UsedWordLedger:
+    """
+    Persistentes Register ausgegebener Wörter über mehrere Läufe: je Lauf eine Bitmap über die Zeilen der
+    Merkmalstabelle (np.packbits, 1 Bit pro Wort – 12,5 KB je Lauf bei 100.000 Wörtern).
+    Es werden höchstens MAX_RUNS Lauf-Bitmaps einzeln gehalten, ältere werden in `older` zusammengefasst.
+    `horizon=None` sperrt jedes jemals ausgegebene Wort, `horizon=k` nur Wörter der letzten k Läufe.
+    Nachschlagen und Markieren sind Array-Zugriffe; Schreiben erfolgt atomar (Temp-Datei + os.replace).
+    """
+    MAX_RUNS = 32
+
+    def __init__(self, path, n_words, sha1, horizon=None):
+        self.path = path
+        self.n_words = n_words
+        self.sha1 = sha1
+        self.horizon = horizon
+        self.older = np.zeros(n_words, dtype=bool)
+        self.runs = []                                  # ältester zuerst, ohne den aktuellen Lauf
+        self.current = np.zeros(n_words, dtype=bool)
+        self.blocked = self.older.copy()
+
+    @classmethod
+    def open(cls, path, table, horizon=None, reset=False, verbose=True):
+        """Lädt das Register zu `table` (Schlüssel: SHA-1 der Wortliste) oder legt ein leeres an."""
+        sha1 = table.meta.get("sha1") or ""
+        ledger = cls(path, len(table), sha1, horizon)
+        if reset:
+            ledger.commit()
+            if verbose: print(f"Wort-Register '{path}' wurde zurückgesetzt.")
+            return ledger
+        if not os.path.isfile(path):
+            return ledger
+        with np.load(path) as data:
+            if str(data["sha1"]) != sha1 or int(data["n_words"]) != len(table):
+                if verbose: print(f"WARNUNG: Wort-Register '{path}' gehört zu einer anderen Wortliste – es wird neu begonnen.")
+                return ledger
+            ledger.older = np.unpackbits(data["older"], count=len(table)).astype(bool)
+            ledger.runs = [np.unpackbits(run, count=len(table)).astype(bool) for run in data["runs"]]
+        ledger._refresh_blocked()
+        return ledger
+
+    def _refresh_blocked(self):
+        if self.horizon is None:
+            self.blocked = self.older.copy()
+            for run in self.runs:
+                self.blocked |= run
+        else:
+            self.blocked = np.zeros(self.n_words, dtype=bool)
+            recent = self.runs[-self.horizon:] if self.horizon > 0 else []
+            for run in recent:
+                self.blocked |= run
+            if self.horizon > len(self.runs):
+                self.blocked |= self.older
+
+    def __contains__(self, index):
+        return bool(self.blocked[index] or self.current[index])
+
+    def mark(self, index):
+        self.current[index] = True
+
+    def issued_count(self):
+        return int((self.blocked | self.current).sum())
+
+    def commit(self):
+        """Schreibt den aktuellen Stand (inkl. laufendem Lauf) atomar; ein leerer Lauf wird nicht angehängt."""
+        runs = self.runs + ([self.current] if self.current.any() else [])
+        older = self.older.copy()
+        while len(runs) > self.MAX_RUNS:
+            older |= runs.pop(0)
+        packed_runs = np.zeros((len(runs), (self.n_words + 7) // 8), dtype=np.uint8)
+        for k, run in enumerate(runs):
+            packed_runs[k] = np.packbits(run)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, sha1=np.array(self.sha1), n_words=np.array(self.n_words), older=np.packbits(older), runs=packed_runs)
+        os.replace(tmp_path, self.path)
+
+
+def scramble_scores(letters, perms, weights=SCRAMBLE_WEIGHTS):
+    """
+    Bewertet Kandidaten-Permutationen gleich langer Wörter auf einmal; niedriger = schwerer.
+    `letters`: (m, L) Codepoints, `perms`: (m, K, L) Index-Matrix. Gezählt werden: Anfangsbuchstabe an Position 0,
+    erhaltene Bigramme des Worts (gleiche Reihenfolge) und Fixpunkte (gleicher Buchstabe an gleicher Stelle).
+    """
+    scrambled = np.take_along_axis(letters[:, None, :], perms, axis=2)
+    fixed = (scrambled == letters[:, None, :]).sum(axis=2)
+    pairs = scrambled[:, :, :-1] * 65536 + scrambled[:, :, 1:]
+    original_pairs = letters[:, :-1] * 65536 + letters[:, 1:]
+    bigrams = (pairs[:, :, :, None] == original_pairs[:, None, None, :]).any(axis=3).sum(axis=2)
+    starts = scrambled[:, :, 0] == letters[:, None, 0]
+    return weights[0] * starts + weights[1] * bigrams + weights[2] * fixed
+
+
+def hardest_scrambles(words, rng=random, candidates=SCRAMBLE_CANDIDATES):
+    """
+    Liefert zu jedem Wort die schwerste von `candidates` zufälligen Permutationen. Wörter gleicher Länge werden
+    gemeinsam verarbeitet (eine Index-Matrix m × K × L, eine Bewertung), damit die Kosten je Wort im
+    Mikrosekundenbereich bleiben. Der Zufall stammt aus `rng` (reproduzierbar bei gesetztem Seed).
+    """
+    result = list(words)
+    by_length = {}
+    for i, word in enumerate(words):
+        if len(word) >= 2:
+            by_length.setdefault(len(word), []).append(i)
+    for length, indices in by_length.items():
+        letters = np.array([[ord(c) for c in words[i]] for i in indices], dtype=np.uint32)
+        # zufällige 16-Bit-Sortierschlüssel direkt aus rng (billiger als ein eigener NumPy-Generator)
+        n_bytes = len(indices) * candidates * length * 2
+        keys = np.frombuffer(rng.getrandbits(n_bytes * 8).to_bytes(n_bytes, 'little'), dtype=np.uint16)
+        perms = np.argsort(keys.reshape(len(indices), candidates, length), axis=2)
+        best = perms[np.arange(len(indices)), np.argmin(scramble_scores(letters, perms), axis=1)]
+        for i, order in zip(indices, best.tolist()):
+            result[i] = ''.join(words[i][k] for k in order)
+    return result
+
+
+def hardest_scramble(word, rng=random, candidates=SCRAMBLE_CANDIDATES):
+    """Einzelwort-Variante von hardest_scrambles."""
+    return hardest_scrambles([word], rng, candidates)[0]
+
+
+def read_frequency_counts(path, table):
+    """
+    Streamt eine Frequenzdatei (ID\tWort\tAnzahl) und liefert die Korpushäufigkeit je Tabellenzeile
+    (Vergleich über die Großschreibung, Schreibvarianten werden addiert; fehlende Wörter = 0).
+    """
+    norm_ids = {w: k for k, w in zip(table.norm_id.tolist(), table.normalized_words())}
+    counts = np.zeros(table.norm_count, dtype=np.float64)
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) >= 3:
+                k = norm_ids.get(parts[1].upper())
+                if k is not None and parts[2].isdigit():
+                    counts[k] += int(parts[2])
+    return counts[table.norm_id]
+
+
+def _mid_ranks(values):
+    """Quantil je Wert in [0, 1]; gleiche Werte erhalten denselben (mittleren) Rang."""
+    if len(values) < 2:
+        return np.zeros(len(values))
+    ordered = np.sort(values)
+    ranks = (np.searchsorted(ordered, values, 'left') + np.searchsorted(ordered, values, 'right') - 1) / 2
+    return ranks / (len(values) - 1)
+
+
+def compute_difficulty(table, counts=None):
+    """
+    Schwierigkeitswert je Zeile als Quantil in [0, 1] (höher = schwerer), vollständig als Array-Operationen:
+    - Korpushäufigkeit (nur mit `counts`): seltenere Wörter sind schwerer.
+    - Vorhersagbarkeit des Anfangs: log P(Wortanfang = 1. Buchstabe) + log P(2. Buchstabe | 1. Buchstabe),
+      geschätzt aus der Wortliste selbst; gut vorhersagbare Anfänge sind leichter.
+    - Anzahl plausibler Anfangsbuchstaben unter den Buchstaben des Worts (Anteil ≥ PLAUSIBLE_START_SHARE).
+    Die Merkmale werden in Quantile umgerechnet, gemittelt und erneut in Quantile überführt.
+    """
+    n = len(table)
+    if not n:
+        return np.zeros(0, dtype=np.float32)
+    blob = np.asarray(table.norm_blob, dtype=np.int64)
+    starts = np.asarray(table.norm_offsets[:-1])
+    first = blob[starts]
+    second = blob[np.minimum(starts + 1, len(blob) - 1)]   # bei einbuchstabigen Wörtern das Trennzeichen
+
+    # Anfangs- und Bigrammverteilung (Bytes; Umlaute zählen über ihr UTF-8-Lead-Byte), Laplace-geglättet
+    initial = np.bincount(first, minlength=256) + 1.0
+    initial /= initial.sum()
+    inner = (blob[:-1] != 10) & (blob[1:] != 10)
+    bigram = np.bincount(blob[:-1][inner] * 256 + blob[1:][inner], minlength=65536).reshape(256, 256) + 1.0
+    bigram /= bigram.sum(axis=1, keepdims=True)
+    predictability = np.log(initial[first]) + np.log(bigram[first, second])
+
+    # plausible Anfangsbuchstaben A–Z als Bitmaske, gezählt per Popcount über die Buchstabenmaske
+    share = initial[65:91] / initial[65:91].sum()
+    plausible_mask = int(np.sum(1 << np.flatnonzero(share >= PLAUSIBLE_START_SHARE)))
+    masked = (np.asarray(table.letter_mask, dtype=np.int64) & plausible_mask).astype('<u4')
+    plausible = np.unpackbits(masked.view(np.uint8).reshape(n, 4), axis=1).sum(axis=1)
+
+    features = [_mid_ranks(-predictability), _mid_ranks(plausible)]
+    if counts is not None:
+        features.append(_mid_ranks(-np.log1p(counts)))
+    return _mid_ranks(np.mean(features, axis=0)).astype(np.float32)
+
+
+def _corpus_key(path):
+    """Schlüssel des Frequenzkorpus (Größe + Änderungszeit, damit große Korpora nicht gehasht werden müssen)."""
+    if not path or not os.path.isfile(path):
+        return "ohne_korpus"
+    stat = os.stat(path)
+    return f"{stat.st_size}_{stat.st_mtime_ns}"
+
+
+def load_difficulty(table, frequency_path=None, rebuild=False, verbose=True):
+    """
+    Lädt den Schwierigkeitswert je Zeile aus dem Tabellen-Cache oder berechnet ihn einmalig (siehe compute_difficulty).
+    Fehlt die Frequenzdatei, entfällt nur das Häufigkeitsmerkmal.
+    """
+    cache_dir = table.meta.get("cache_dir")
+    target = os.path.join(cache_dir, f"difficulty_{_corpus_key(frequency_path)}_v{DIFFICULTY_VERSION}.npy") if cache_dir else None
+    if target and not rebuild and os.path.isfile(target):
+        return np.load(target, mmap_mode='r')
+    counts = None
+    if frequency_path and os.path.isfile(frequency_path):
+        counts = read_frequency_counts(frequency_path, table)
+    elif frequency_path and verbose:
+        print(f"HINWEIS: Frequenzdatei '{frequency_path}' nicht gefunden – Schwierigkeit ohne Korpushäufigkeit.")
+    scores = compute_difficulty(table, counts)
+    if target:
+        tmp = f"{target}.{os.getpid()}.tmp.npy"
+        np.save(tmp, scores)
+        os.replace(tmp, target)
+        if verbose: print(f"Schwierigkeitswerte für {len(scores)} Wörter berechnet ({os.path.basename(target)}).")
+    return scores
+
+
+def difficulty_bands(scores, bands=DIFFICULTY_BANDS):
+    """Band-Nummer (0 … bands-1) je Schwierigkeitswert; Schlüsselteil des Wortindex."""
+    return np.minimum((np.asarray(scores) * bands).astype(np.int64), bands - 1)
+
+
+def band_range(min_q, max_q, bands=DIFFICULTY_BANDS):
+    """Bänder, die das Quantil-Intervall [min_q, max_q] abdecken."""
+    return int(min_q * bands), max(int(min_q * bands), min(bands - 1, int(np.ceil(max_q * bands)) - 1))
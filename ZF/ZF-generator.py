@@ -18,14 +18,23 @@ Wesentliche Neuerungen in dieser Version:
 - **Anpassung der Lösungs-Formulierung:** "Sequenz" wurde durch "Schritt" ersetzt.
 - **Terminologie-Anpassung:** "Exponentiell" wurde zu "Multiplikativ" korrigiert.
 
-Benötigte Bibliothek: reportlab
-Installation: pip install reportlab
+Benötigte Bibliotheken: reportlab, numpy
+Installation: pip install reportlab numpy
 """
 
 import random
 import os
 import argparse
-from itertools import cycle
+import copy
+import json
+import math
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from collections import defaultdict
+from itertools import permutations, product
+
+import numpy as np
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
@@ -40,75 +49,261 @@ from reportlab.platypus import Flowable
 # ==============================================================================
 
 E_IS_CORRECT_PROBABILITY = 0.20
+# Rückfall-Distraktoren: parallel verschobene Lösungspaare (immer verschieden von der Lösung)
+FALLBACK_DISTRACTOR_OFFSETS = (1, -1, 2, -2, 3, -3)
+# Alternative Regeln zählen erst als mehrdeutig, wenn sie durch mindestens so viele
+# zusätzliche Zahlen bestätigt werden (gezeigte Zahlen minus freie Parameter der Regel).
+AMBIGUITY_MIN_CHECKS = 2
+# Kandidaten je Schwierigkeitsgrad, mit denen eine leere Itembank automatisch befüllt wird
+BANK_FILL_DEFAULT = 20000
 
 # ==============================================================================
 # 2. KLASSEN FÜR SEQUENZTYPEN
 # ==============================================================================
 
+class ParameterSpace:
+    """Endlicher Parameterraum einer Sequenzkonfiguration.
+
+    Der Raum ist ein Produkt von Faktoren; jeder Faktor ist eine Liste gültiger Teil-Tupel.
+    Ein Index wird per Mixed-Radix-Zerlegung in ein Parameter-Tupel übersetzt, ohne den
+    Raum zu materialisieren (der letzte Faktor läuft am schnellsten).
+    """
+    def __init__(self, factors):
+        self.factors = [list(f) for f in factors]
+        self.size = math.prod(len(f) for f in self.factors)
+
+    def __len__(self): return self.size
+
+    def __iter__(self):
+        for combo in product(*self.factors): yield tuple(v for part in combo for v in part)
+
+    @property
+    def width(self): return sum(len(f[0]) for f in self.factors) if self.size else 0
+
+    def params(self, index):
+        if not 0 <= index < self.size: raise IndexError(f"Index {index} außerhalb des Parameterraums ({self.size})")
+        parts = []
+        for f in reversed(self.factors):
+            index, r = divmod(index, len(f))
+            parts.append(f[r])
+        return tuple(v for part in reversed(parts) for v in part)
+
+    def random_params(self, rng=random): return self.params(rng.randrange(self.size))
+
+    def index(self, params):
+        """Umkehrung von params(): Parameter-Tupel -> Index, None wenn das Tupel nicht im Raum liegt."""
+        if getattr(self, "_positions", None) is None:
+            self._positions = [{part: i for i, part in enumerate(f)} for f in self.factors]
+        index, offset = 0, 0
+        for f, positions in zip(self.factors, self._positions):
+            width = len(f[0])
+            position = positions.get(tuple(params[offset:offset + width]))
+            if position is None: return None
+            index, offset = index * len(f) + position, offset + width
+        return index if offset == len(params) else None
+
+    def params_array(self, indices):
+        """Vektorisierte Variante von params(): (n,) Indizes -> (n, width) int64-Matrix."""
+        if getattr(self, "_arrays", None) is None:
+            self._arrays = [np.asarray(f, dtype=np.int64).reshape(len(f), -1) for f in self.factors]
+        coords = np.unravel_index(np.asarray(indices, dtype=np.int64), [len(f) for f in self.factors])
+        return np.hstack([arr[c] for arr, c in zip(self._arrays, coords)])
+
+
+def _pair(a, b): return np.stack([a, b], axis=1)
+def _values(r): return [(v,) for v in range(r[0], r[1] + 1)]
+def _nonzero_values(r): return [(v,) for v in range(r[0], r[1] + 1) if v != 0]
+
+
 class NumberSequence:
+    step_param = None  # Index des Parameters, der bei A-B-A-B-Mustern geteilt wird
+
     def __init__(self, length=9):
         self.length = length
         self.sequence = []
+        self.params = None
         self.rule_type = "Unbekannt"
         self.solution_text = ""
+        self._space = None
+
+    def _build_space(self): raise NotImplementedError
+    def _apply(self, params): raise NotImplementedError
+    def _batch(self, P): raise NotImplementedError
+    def _fit_params(self, shown):
+        """Parameter-Tupel, das die gezeigten Zahlen erzeugen würde (ohne Bereichsprüfung), oder None."""
+        raise NotImplementedError
+
+    def locate(self, shown):
+        """Index im Parameterraum, dessen Folge mit den gezeigten Zahlen beginnt, oder None."""
+        params = self._fit_params(list(shown))
+        index = self.parameter_space().index(params) if params is not None else None
+        if index is None: return None
+        values, valid = self.batch([params])
+        return index if valid[0] and values[0, :len(shown)].tolist() == list(shown) else None
+
+    def batch(self, P):
+        """Ganze Blöcke: (n, width) Parameter -> ((n, length) int64-Werte, (n,) Gültigkeitsmaske).
+
+        Grenzen (|x| > 50000) und nicht aufgehende Divisionen werden als Maske gemeldet, nicht verworfen.
+        """
+        values, valid = self._batch(np.asarray(P, dtype=np.int64).reshape(len(P), -1))
+        return values, valid & (np.abs(values) <= 50000).all(axis=1)
+
+    def parameter_space(self):
+        if self._space is None: self._space = self._build_space()
+        return self._space
+
+    def generate(self, params=None):
+        """Erzeugt die Folge aus festen Parametern oder aus einem zufälligen gültigen Tupel."""
+        self.params = tuple(params) if params is not None else self.parameter_space().random_params()
+        self._apply(self.params)
+
+    def with_params(self, params):
+        """Neue Instanz derselben Konfiguration mit festen Parametern (Parameterraum wird geteilt)."""
+        seq = copy.copy(self)
+        seq.generate(params)
+        return seq
+
+    def _near_misses(self, P, E):
+        """Fortsetzungen naheliegender Fehlregeln; P Parameter, E um 4 Glieder verlängerte Werte. -> Liste (n, 2)"""
+        raise NotImplementedError
+
+    def distractor_block(self, P, count=3, rng=None):
+        """Regelbasierte Distraktoren für einen Block: (n, width) -> (n, count, 2).
+
+        Kandidaten aus Fehlregeln werden je Zeile zufällig gereiht, danach folgen die Rückfall-Paare;
+        per Maske werden die ersten `count` Kandidaten gewählt, die weder der Lösung noch einem
+        früheren Kandidaten gleichen. Da die Rückfall-Paare paarweise verschieden sind, reicht es immer.
+        """
+        P = np.asarray(P, dtype=np.int64).reshape(len(P), -1)
+        extended = copy.copy(self); extended.length = self.length + 4
+        with np.errstate(all="ignore"):
+            E, _ = extended._batch(P)
+            candidates = np.stack(self._near_misses(P, E), axis=1)
+        correct = E[:, 7:9]
+        rng = rng if rng is not None else np.random.default_rng(random.getrandbits(64))
+        order = np.argsort(rng.random(candidates.shape[:2]), axis=1)
+        candidates = np.take_along_axis(candidates, order[:, :, None], axis=1)
+        fallback = correct[:, None, :] + np.asarray(FALLBACK_DISTRACTOR_OFFSETS, dtype=np.int64)[None, :, None]
+        C = np.concatenate([candidates, fallback], axis=1)
+        duplicate = np.tril((C[:, :, None, :] == C[:, None, :, :]).all(axis=3), k=-1).any(axis=2)
+        usable = ~duplicate & ~(C == correct[:, None, :]).all(axis=2)
+        pick = np.argsort(~usable, axis=1, kind="stable")[:, :count]
+        return np.take_along_axis(C, pick[:, :, None], axis=1)
+
+    def distractors(self, count=3, rng=random):
+        block = self.distractor_block([self.params], count, rng=np.random.default_rng(rng.getrandbits(64)))
+        return [f"{a}, {b}" for a, b in block[0].tolist()]
 
-    def generate(self): raise NotImplementedError
     def get_initial_sequence(self): return self.sequence[:7]
     def get_sequence_str(self): return " ".join(map(str, self.get_initial_sequence()))
     def get_missing_numbers(self): return self.sequence[7:9]
-    def _ensure_no_zero_param(self, v, r): return v if v != 0 else self._ensure_no_zero_param(random.randint(*r), r)
 
 class ArithmeticSequence(NumberSequence):
+    step_param = 1
+
     def __init__(self, start_range, diff_range, **kwargs):
         super().__init__(**kwargs)
-        self.start = random.randint(*start_range)
-        self.diff = self._ensure_no_zero_param(random.randint(*diff_range), diff_range)
+        self.start_range, self.diff_range = start_range, diff_range
         self.rule_type = "Arithmetisch"
+
+    def _build_space(self): return ParameterSpace([_values(self.start_range), _nonzero_values(self.diff_range)])
+
+    def _apply(self, params):
+        self.start, self.diff = params
+        self.sequence = [self.start + i * self.diff for i in range(self.length)]
         diff_str = f"+{self.diff}" if self.diff > 0 else str(self.diff)
         self.solution_text = f"Arithmetische Folge. Die konstante Differenz ist {diff_str}."
 
-    def generate(self):
-        self.sequence = [self.start + i * self.diff for i in range(self.length)]
+    def _batch(self, P):
+        k = np.arange(self.length, dtype=np.int64)
+        return P[:, :1] + k * P[:, 1:2], P[:, 1] != 0
+
+    def _fit_params(self, shown): return (shown[0], shown[1] - shown[0])
+
+    def _near_misses(self, P, E):
+        d, x6 = P[:, 1], E[:, 6]
+        return [_pair(x6 + d + 1, x6 + 2 * (d + 1)),   # Differenz um eins zu groß
+                _pair(x6 + d - 1, x6 + 2 * (d - 1)),   # Differenz um eins zu klein
+                _pair(x6 - d, x6 - 2 * d),             # falsche Richtung
+                E[:, 8:10]]                            # ein Schritt zu viel
 
 class MultiplicativeSequence(NumberSequence):
+    step_param = 1
+
     def __init__(self, start_range, ratio_range, **kwargs):
         super().__init__(**kwargs)
         self.start_range, self.ratio_range = start_range, ratio_range
         self.rule_type = "Multiplikativ"
 
-    def generate(self):
-        while True:
-            self.start = self._ensure_no_zero_param(random.randint(*self.start_range), self.start_range)
-            self.ratio = self._ensure_no_zero_param(random.randint(*self.ratio_range), self.ratio_range)
-            if self.ratio in [1, -1]: continue
-            self.sequence = [self.start]
-            valid = True
-            for _ in range(1, self.length):
-                next_val = self.sequence[-1] * self.ratio
-                if abs(next_val) > 50000: valid = False; break
-                self.sequence.append(int(next_val))
-            if valid:
-                self.solution_text = f"Multiplikative Folge. Jede nächste Zahl wird mit {self.ratio} multipliziert."
-                break
+    def _build_space(self):
+        valid = [(start, ratio) for (start,) in _nonzero_values(self.start_range) for (ratio,) in _nonzero_values(self.ratio_range)
+                 if ratio not in (1, -1) and abs(start * ratio ** (self.length - 1)) <= 50000]
+        return ParameterSpace([valid])
+
+    def _apply(self, params):
+        self.start, self.ratio = params
+        self.sequence = [self.start * self.ratio ** i for i in range(self.length)]
+        self.solution_text = f"Multiplikative Folge. Jede nächste Zahl wird mit {self.ratio} multipliziert."
+
+    def _batch(self, P):
+        k = np.arange(self.length, dtype=np.int64)
+        # Größenprüfung in float64, damit große Rohparameter nicht per int64-Überlauf "gültig" werden
+        fits = (np.abs(P[:, :1] * P[:, 1:2].astype(float) ** k) < 2.0 ** 62).all(axis=1)
+        values = np.where(fits[:, None], P[:, :1] * np.where(fits, P[:, 1], 0)[:, None] ** k, 0)
+        return values, fits & (P[:, 0] != 0) & (np.abs(P[:, 1]) > 1)
+
+    def _fit_params(self, shown):
+        return (shown[0], shown[1] // shown[0]) if shown[0] and shown[1] % shown[0] == 0 else None
+
+    def _near_misses(self, P, E):
+        r, x5, x6 = P[:, 1], E[:, 5], E[:, 6]
+        larger, smaller = r + np.sign(r), r - np.sign(r)
+        return [_pair(x6 * larger, x6 * larger ** 2),      # Verhältnis um eins zu groß
+                _pair(x6 * smaller, x6 * smaller ** 2),    # Verhältnis um eins zu klein
+                _pair(2 * x6 - x5, 3 * x6 - 2 * x5),       # letzte Differenz statt Verhältnis
+                E[:, 8:10]]                                # ein Schritt zu viel
 
 class FibonacciSequence(NumberSequence):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.rule_type = "Fibonacci"
-    
-    def generate(self):
-        start1, start2 = random.randint(1, 5), random.randint(1, 5)
+
+    def _build_space(self): return ParameterSpace([_values((1, 5)), _values((1, 5))])
+
+    def _apply(self, params):
+        start1, start2 = params
         self.sequence = [start1, start2]
         while len(self.sequence) < self.length: self.sequence.append(self.sequence[-1] + self.sequence[-2])
         self.solution_text = f"Fibonacci-Folge (Start: {start1}, {start2}). Jede nächste Zahl ist die Summe der beiden vorhergehenden."
 
+    def _batch(self, P):
+        # a_k = F(k-1)*start1 + F(k)*start2 mit F(-1)=1, F(0)=0
+        fib = [1, 0]
+        while len(fib) < self.length + 1: fib.append(fib[-1] + fib[-2])
+        fib = np.asarray(fib, dtype=np.int64)
+        return P[:, :1] * fib[:-1] + P[:, 1:2] * fib[1:], np.ones(len(P), dtype=bool)
+
+    def _fit_params(self, shown): return (shown[0], shown[1])
+
+    def _near_misses(self, P, E):
+        x4, x5, x6, c7, c8 = E[:, 4], E[:, 5], E[:, 6], E[:, 7], E[:, 8]
+        return [_pair(c7 + 1, c8 + 1),                     # Rechenfehler im ersten Glied, korrekt weitergeführt
+                _pair(x6 + x4, 2 * x6 + x4),               # falsches Summandenpaar
+                _pair(2 * x6 - x5, 3 * x6 - 2 * x5),       # letzte Differenz fortgeschrieben
+                E[:, 8:10]]                                # ein Schritt zu viel
+
 class MultiLevelSequence(NumberSequence):
     def __init__(self, start_range, op_start_range, op_diff_range, **kwargs):
         super().__init__(**kwargs)
-        self.start, self.op_start, self.op_diff = random.randint(*start_range), random.randint(*op_start_range), self._ensure_no_zero_param(random.randint(*op_diff_range), op_diff_range)
+        self.start_range, self.op_start_range, self.op_diff_range = start_range, op_start_range, op_diff_range
         self.rule_type = "Mehrstufig (arithmetisch)"
-        
-    def generate(self):
+
+    def _build_space(self):
+        return ParameterSpace([_values(self.start_range), _values(self.op_start_range), _nonzero_values(self.op_diff_range)])
+
+    def _apply(self, params):
+        self.start, self.op_start, self.op_diff = params
         self.sequence, op_sequence = [self.start], []
         current_op_val = self.op_start
         for _ in range(1, self.length):
@@ -119,58 +314,187 @@ class MultiLevelSequence(NumberSequence):
         op_diff_str = f"+{self.op_diff}" if self.op_diff >= 0 else str(self.op_diff)
         self.solution_text = (f"Mehrstufige Regel. Die Rechenschritte bilden eine arithmetische Folge (beginnend mit {self.op_start}, Differenz {op_diff_str}).<br/>Rechenschritte: {op_str}...")
 
+    def _batch(self, P):
+        # Geschlossene Form: a_k = start + k*op_start + op_diff * k(k-1)/2
+        k = np.arange(self.length, dtype=np.int64)
+        return P[:, :1] + k * P[:, 1:2] + (k * (k - 1) // 2) * P[:, 2:3], P[:, 2] != 0
+
+    def _fit_params(self, shown): return (shown[0], shown[1] - shown[0], shown[2] - 2 * shown[1] + shown[0])
+
+    def _near_misses(self, P, E):
+        op_diff, x6, op6 = P[:, 2], E[:, 6], E[:, 6] - E[:, 5]
+        result = []
+        for delta in (1, -1):                              # Differenz der Rechenschritte um eins daneben
+            op7 = op6 + op_diff + delta
+            result.append(_pair(x6 + op7, x6 + 2 * op7 + op_diff + delta))
+        result.append(_pair(x6 + op6, x6 + 2 * op6))       # letzter Rechenschritt als konstant angenommen
+        result.append(E[:, 8:10])                          # ein Schritt zu viel
+        return result
+
 class AlternatingOperationsSequence(NumberSequence):
+    OP_SYMBOLS = {'add': "+", 'sub': "-", 'mul': "x", 'div': "÷"}
+
     def __init__(self, start_range, operations, **kwargs):
         super().__init__(**kwargs)
         self.start_range, self.operations_config = start_range, operations
         self.rule_type = "Wechselnde Operationen"
 
-    def generate(self):
-        while True:
-            self.start = random.randint(*self.start_range)
-            ops, op_descriptions = [], []
-            for op_type, op_range in self.operations_config:
-                val = self._ensure_no_zero_param(random.randint(*op_range), op_range)
-                op_map = {'add': (lambda x, v=val: x + v, f"+{val}"), 'sub': (lambda x, v=val: x - v, f"-{val}"),
-                          'mul': (lambda x, v=val: x * v, f"x{val}"), 'div': (lambda x, v=val: x / v, f"÷{val}")}
-                op_func, op_desc = op_map[op_type]
-                ops.append(op_func); op_descriptions.append(op_desc)
-            self.sequence, op_cycle, valid = [self.start], cycle(ops), True
-            for _ in range(1, self.length):
-                next_val = op_cycle.__next__()(self.sequence[-1])
-                if isinstance(next_val, float) and next_val != int(next_val): valid = False; break
-                if abs(int(next_val)) > 50000: valid = False; break
-                self.sequence.append(int(next_val))
-            if valid:
-                self.solution_text = f"Wechselnde Operationen im Zyklus: {', '.join(op_descriptions)}."
-                break
+    @staticmethod
+    def _step(op_type, x, v):
+        """Ein Rechenschritt; None, wenn die Division nicht aufgeht."""
+        if op_type == 'add': return x + v
+        if op_type == 'sub': return x - v
+        if op_type == 'mul': return x * v
+        return x // v if x % v == 0 else None
+
+    def _run(self, start, values):
+        sequence = [start]
+        n_ops = len(self.operations_config)
+        for k in range(1, self.length):
+            next_val = self._step(self.operations_config[(k - 1) % n_ops][0], sequence[-1], values[(k - 1) % n_ops])
+            if next_val is None or abs(next_val) > 50000: return None
+            sequence.append(next_val)
+        return sequence
+
+    def _build_space(self):
+        op_values = product(*[[v for (v,) in _nonzero_values(op_range)] for _, op_range in self.operations_config])
+        combos = [(start,) + values for values in op_values for (start,) in _values(self.start_range)]
+        return ParameterSpace([[c for c in combos if self._run(c[0], c[1:]) is not None]])
+
+    def _apply(self, params):
+        self.start, values = params[0], params[1:]
+        self.sequence = self._run(self.start, values)
+        op_descriptions = [f"{self.OP_SYMBOLS[op_type]}{val}" for (op_type, _), val in zip(self.operations_config, values)]
+        self.solution_text = f"Wechselnde Operationen im Zyklus: {', '.join(op_descriptions)}."
+
+    def _batch(self, P):
+        # Jeder Schritt ist affin: x -> (num/den)*x + add. Mit M_k = cumprod(num/den) gilt
+        # a_k / M_k = start + cumsum(add_j / M_j); mit dem gemeinsamen Nenner L = cumprod(num)[-1]
+        # bleibt die Rechnung ganzzahlig. Alle a_k ganzzahlig <=> jede Division geht auf.
+        cols = [(k - 1) % len(self.operations_config) for k in range(1, self.length)]
+        ops = np.array([self.operations_config[c][0] for c in cols])
+        V = P[:, [1 + c for c in cols]]
+        valid = (V != 0).all(axis=1)
+        V = np.where(V == 0, 1, V)
+        num, den = np.where(ops == 'mul', V, 1), np.where(ops == 'div', V, 1)
+        add = V * np.where(ops == 'add', 1, np.where(ops == 'sub', -1, 0))
+        # Zeilen, deren Zwischenwerte int64 sprengen würden, gelten als ungültig
+        magnitude = (np.abs(P[:, 0]) + np.abs(add).sum(axis=1) + 1) * np.prod(num.astype(float), axis=1) ** 2 * np.prod(den.astype(float), axis=1)
+        fits = magnitude < 2.0 ** 62
+        num, den, add = (np.where(fits[:, None], a, 1) for a in (num, den, add))
+        M_num, M_den = np.cumprod(num, axis=1), np.cumprod(den, axis=1)
+        L = M_num[:, -1:]
+        top = P[:, :1] * L + np.cumsum(add * M_den * (L // M_num), axis=1)   # = a_k / M_k * L
+        numer, scale = top * M_num, M_den * L                                 # a_k = numer / scale
+        exact = (numer % scale == 0).all(axis=1)
+        return np.hstack([P[:, :1], numer // scale]), valid & fits & exact
+
+    def _fit_params(self, shown):
+        values = []
+        for c, (op_type, _) in enumerate(self.operations_config):
+            a, b = shown[c], shown[c + 1]
+            if op_type == 'add': values.append(b - a)
+            elif op_type == 'sub': values.append(a - b)
+            else:
+                num, den = (b, a) if op_type == 'mul' else (a, b)
+                if not den or num % den: return None
+                values.append(num // den)
+        return (shown[0],) + tuple(values)
+
+    def _near_misses(self, P, E):
+        n_ops = len(self.operations_config)
+        ops = [op for op, _ in self.operations_config]
+        i7, i8 = 6 % n_ops, 7 % n_ops
+        correct = E[:, 7:9]
+        def run(first, second, x):
+            # Zwei Rechenschritte; geht eine Division nicht auf, wird der Kandidat zur Lösung (und damit verworfen)
+            (op_a, v_a), (op_b, v_b) = first, second
+            v_a, v_b = np.where(v_a == 0, 1, v_a), np.where(v_b == 0, 1, v_b)
+            a = x // v_a if op_a == 'div' else self._step(op_a, x, v_a)
+            b = a // v_b if op_b == 'div' else self._step(op_b, a, v_b)
+            exact = np.ones(len(x), dtype=bool)
+            if op_a == 'div': exact &= x % v_a == 0
+            if op_b == 'div': exact &= a % v_b == 0
+            return np.where(exact[:, None], _pair(a, b), correct)
+        values = [P[:, 1 + c] for c in range(n_ops)]
+        result = []
+        for delta in (1, -1):                              # Operand des nächsten Schritts um eins daneben
+            shifted = [v + delta if c == i7 else v for c, v in enumerate(values)]
+            result.append(run((ops[i7], shifted[i7]), (ops[i8], shifted[i8]), E[:, 6]))
+        result.append(run((ops[i8], values[i8]), (ops[i7], values[i7]), E[:, 6]))  # Zyklus vertauscht
+        result.append(E[:, 8:10])                          # ein Schritt zu viel
+        return result
 
 class InterleavedSequence(NumberSequence):
     def __init__(self, sub_sequence_configs, **kwargs):
         super().__init__(**kwargs)
         self.num_interleaved = len(sub_sequence_configs)
         self.rule_type = f"{self.num_interleaved}er-Sprung"
-        
+        # Bei 4er-Sprüngen (A-B-A-B) werden A und B nur einmal instanziiert; A1/A2 bzw. B1/B2
+        # teilen sich Differenz/Verhältnis, haben aber eigene Startwerte.
+        configs = sub_sequence_configs[:2] if self.num_interleaved == 4 else sub_sequence_configs
+        self.sub_prototypes = [config["class"](**{k: v for k, v in config.items() if k != 'class'}) for config in configs]
         self.sub_sequences = []
+
+    def _build_space(self):
+        sub_spaces = [proto.parameter_space() for proto in self.sub_prototypes]
         if self.num_interleaved == 4:
-            seq_a_conf, seq_b_conf = sub_sequence_configs[0], sub_sequence_configs[1]
-            seq_a1 = seq_a_conf["class"](**{k: v for k, v in seq_a_conf.items() if k != 'class'})
-            seq_b1 = seq_b_conf["class"](**{k: v for k, v in seq_b_conf.items() if k != 'class'})
-            seq_a2 = seq_a_conf["class"](**{k: v for k, v in seq_a_conf.items() if k != 'class'})
-            seq_b2 = seq_b_conf["class"](**{k: v for k, v in seq_b_conf.items() if k != 'class'})
+            factors = []
+            for proto, space in zip(self.sub_prototypes, sub_spaces):
+                by_step = defaultdict(list)
+                for p in space: by_step[p[proto.step_param]].append(p)
+                factors.append([a + b for group in by_step.values() for a in group for b in group])
+            return ParameterSpace(factors)
+        return ParameterSpace([f for space in sub_spaces for f in space.factors])
 
-            for attr in ['diff', 'ratio']:
-                if hasattr(seq_a1, attr): setattr(seq_a2, attr, getattr(seq_a1, attr))
-                if hasattr(seq_b1, attr): setattr(seq_b2, attr, getattr(seq_b1, attr))
+    def _sub_params(self, params):
+        widths = [proto.parameter_space().width for proto in self.sub_prototypes]
+        if self.num_interleaved == 4:
+            wa, wb = widths
+            a1, a2 = params[:wa], params[wa:2 * wa]
+            b1, b2 = params[2 * wa:2 * wa + wb], params[2 * wa + wb:]
+            return [(self.sub_prototypes[0], a1), (self.sub_prototypes[1], b1), (self.sub_prototypes[0], a2), (self.sub_prototypes[1], b2)]
+        result, offset = [], 0
+        for proto, w in zip(self.sub_prototypes, widths):
+            result.append((proto, params[offset:offset + w])); offset += w
+        return result
 
-            self.sub_sequences = [seq_a1, seq_b1, seq_a2, seq_b2]
-        else:
-            self.sub_sequences = [config["class"](**{k: v for k, v in config.items() if k != 'class'}) for config in sub_sequence_configs]
+    def _batch(self, P):
+        # Teilfolgen blockweise erzeugen und per Schrittweiten-Zuweisung verschränken
+        values = np.zeros((len(P), self.length), dtype=np.int64)
+        valid = np.ones(len(P), dtype=bool)
+        # _sub_params auf Spaltenindizes angewendet liefert die Parameterspalten je Teilfolge
+        for j, (proto, cols) in enumerate(self._sub_params(tuple(range(self.parameter_space().width)))):
+            sub_values, sub_valid = proto.batch(P[:, list(cols)])
+            count = len(range(j, self.length, self.num_interleaved))
+            values[:, j::self.num_interleaved] = sub_values[:, :count]
+            valid &= sub_valid
+        return values, valid
 
-    def generate(self):
-        for seq in self.sub_sequences:
-            if not seq.sequence: seq.generate()
-        
+    def _fit_params(self, shown):
+        m = self.num_interleaved
+        if m == 4:
+            # A1, B1, A2 zeigen je zwei Glieder; B2 nur seinen Start und teilt die Schrittweite mit B1
+            a1, b1, a2 = (self.sub_prototypes[j % 2]._fit_params(shown[j::4]) for j in range(3))
+            if None in (a1, b1, a2): return None
+            return a1 + a2 + b1 + (shown[3],) + b1[1:]
+        parts = [proto._fit_params(shown[j::m]) for j, proto in enumerate(self.sub_prototypes)]
+        return None if None in parts else tuple(v for part in parts for v in part)
+
+    def _near_misses(self, P, E):
+        m, c7, c8 = self.num_interleaved, E[:, 7], E[:, 8]
+        slots = [proto for proto, _ in self._sub_params(tuple(range(self.parameter_space().width)))]
+        def delta(pos):
+            # Schrittweite der zuständigen Teilfolge um eins daneben: ±1 bzw. ±Vorgänger bei Verhältnissen
+            return E[:, pos - m] if isinstance(slots[pos % m], MultiplicativeSequence) else np.ones(len(E), dtype=np.int64)
+        d7, d8 = delta(7), delta(8)
+        return [_pair(c8, c7),                             # Phase verschoben: Teilfolgen vertauscht
+                _pair(c7 + d7, c8), _pair(c7 - d7, c8),
+                _pair(c7, c8 + d8), _pair(c7, c8 - d8),
+                E[:, 7 + m:9 + m]]                         # ein Durchlauf zu viel
+
+    def _apply(self, params):
+        self.sub_sequences = [proto.with_params(p) for proto, p in self._sub_params(params)]
         self.sequence = []
         generated_length, i = 0, 0
         while generated_length < self.length:
@@ -180,7 +504,7 @@ class InterleavedSequence(NumberSequence):
                     generated_length += 1
                     if generated_length >= self.length: break
             i += 1
-        
+
         if self.num_interleaved == 4:
             self.solution_text = (f"Verschachtelte Folgen (A-B-A-B Muster).<br/>"
                                 f"<b>Schritt 1:</b> {self.sub_sequences[0].solution_text}<br/>"
@@ -223,40 +547,312 @@ DIFFICULTY_CONFIG = {
             {"class": MultiplicativeSequence, "start_range": (1, 3), "ratio_range": (2, 3)},
             {"class": ArithmeticSequence, "start_range": (80, 100), "diff_range": (-15, -5)}
         ]},
-        {"class": InterleavedSequence, "sub_sequence_configs": lambda: random.sample(schwer_4er_pool, 2) * 2},
+        # 4er Sprung: zwei verschiedene Regeln aus dem Pool im A-B-A-B-Muster
+        {"class": InterleavedSequence, "sub_sequence_configs": [[a, b, a, b] for a, b in permutations(schwer_4er_pool, 2)]},
         {"class": AlternatingOperationsSequence, "start_range": (200, 400), "operations": [('div', (2, 5)), ('sub', (10, 25))]},
         {"class": AlternatingOperationsSequence, "start_range": (10, 30), "operations": [('mul', (2, 3)), ('add', (5, 15))]},
     ]}
 }
 
 class SequenceFactory:
+    _prototypes = {}
+
     @staticmethod
-    def create_sequence(difficulty="Mittel"):
-        seq_config = random.choice(DIFFICULTY_CONFIG[difficulty]["types"])
-        params = {k: v for k, v in seq_config.items() if k != 'class'}
-        
-        if 'sub_sequence_configs' in params and callable(params['sub_sequence_configs']):
-            params['sub_sequence_configs'] = params['sub_sequence_configs']()
+    def prototypes(difficulty="Mittel"):
+        """Je Typ-Eintrag eine Liste von Prototypen (mehrere, wenn der Eintrag Varianten aufzählt).
+        Prototypen und ihre Parameterräume werden pro Prozess nur einmal aufgebaut."""
+        if difficulty not in SequenceFactory._prototypes:
+            groups = []
+            for seq_config in DIFFICULTY_CONFIG[difficulty]["types"]:
+                params = {k: v for k, v in seq_config.items() if k != 'class'}
+                variants = params.pop('sub_sequence_configs', None)
+                if variants is not None and isinstance(variants[0], list):
+                    groups.append([seq_config["class"](sub_sequence_configs=v, **params) for v in variants])
+                elif variants is not None:
+                    groups.append([seq_config["class"](sub_sequence_configs=variants, **params)])
+                else:
+                    groups.append([seq_config["class"](**params)])
+            SequenceFactory._prototypes[difficulty] = groups
+        return SequenceFactory._prototypes[difficulty]
 
-        instance = seq_config["class"](**params)
-        instance.generate()
-        return instance
+    @staticmethod
+    def capacity(difficulty="Mittel"):
+        """Anzahl gültiger Parameter-Tupel eines Schwierigkeitsgrads (obere Schranke eindeutiger Folgen)."""
+        return sum(len(proto.parameter_space()) for group in SequenceFactory.prototypes(difficulty) for proto in group)
+
+    @staticmethod
+    def create_sequence(difficulty="Mittel", rng=random):
+        proto = rng.choice(rng.choice(SequenceFactory.prototypes(difficulty)))
+        return proto.with_params(proto.parameter_space().random_params(rng))
+
+
+class AmbiguityChecker:
+    """Prüft, ob die sieben gezeigten Zahlen auch zu einer anderen Regelfamilie passen.
+
+    Alle Familien aus DIFFICULTY_CONFIG (über alle Schwierigkeitsgrade) werden per exakter
+    Ganzzahl-Anpassung gleichzeitig und vektorisiert auf (n, 7)-Präfixe angewendet. Eine Aufgabe
+    ist mehrdeutig, wenn eine ausreichend bestätigte Alternative eine andere Fortsetzung liefert.
+    """
+    SHOWN = 7
+
+    def __init__(self, config=None, min_checks=AMBIGUITY_MIN_CHECKS):
+        self.families = [f for f in self._collect_families(config or DIFFICULTY_CONFIG) if f[1] >= min_checks]
+
+    @staticmethod
+    def _leaf_kind(cls): return {ArithmeticSequence: "arith", MultiplicativeSequence: "mult"}.get(cls)
+
+    def _collect_families(self, config):
+        """-> Liste (name, checks, fit), fit(X) liefert (ok (n,), Fortsetzung (n, 2))."""
+        seen, families = set(), []
+        def add(key, checks, fit):
+            if key not in seen: seen.add(key); families.append((key, checks, fit))
+        n = self.SHOWN
+        for seq_config in (c for d in config.values() for c in d["types"]):
+            cls = seq_config["class"]
+            if cls in (ArithmeticSequence, MultiplicativeSequence):
+                kind = self._leaf_kind(cls)
+                add(kind, n - 2, lambda X, kind=kind: self._fit_interleaved(X, 1, [[0]], (kind,)))
+            elif cls is FibonacciSequence: add("fib", n - 2, self._fit_fibonacci)
+            elif cls is MultiLevelSequence: add("multilevel", n - 3, self._fit_multilevel)
+            elif cls is AlternatingOperationsSequence:
+                ops = tuple(op for op, _ in seq_config["operations"])
+                add(("alt",) + ops, n - 1 - len(ops), lambda X, ops=ops: self._fit_alternating(X, ops))
+            elif cls is InterleavedSequence:
+                variants = seq_config["sub_sequence_configs"]
+                subs = [c for v in variants for c in v] if isinstance(variants[0], list) else variants
+                m = len(variants[0]) if isinstance(variants[0], list) else len(variants)
+                groups = [[0, 2], [1, 3]] if m == 4 else [[j] for j in range(m)]
+                kinds = sorted({self._leaf_kind(c["class"]) for c in subs})
+                for combo in product(kinds, repeat=len(groups)):
+                    add(("inter", m) + combo, n - sum(len(g) + 1 for g in groups),
+                        lambda X, m=m, groups=groups, combo=combo: self._fit_interleaved(X, m, groups, combo))
+        return families
+
+    @staticmethod
+    def _step(kind, a, b):
+        """Schrittweite a -> b (Differenz oder ganzzahliges Verhältnis) und ob sie existiert."""
+        if kind == "arith": return b - a, np.ones(len(a), dtype=bool)
+        ok = (a != 0) & (b % np.where(a == 0, 1, a) == 0)
+        return b // np.where(a == 0, 1, a), ok
+
+    @staticmethod
+    def _advance(kind, x, step, times):
+        return x + step * times if kind == "arith" else x * step ** times
+
+    def _fit_interleaved(self, X, m, groups, kinds):
+        # Teilfolgen X[:, j::m]; Slots einer Gruppe teilen Differenz bzw. Verhältnis (A-B-A-B)
+        n = len(X)
+        ok, steps = np.ones(n, dtype=bool), {}
+        for group, kind in zip(groups, kinds):
+            first = X[:, group[0]::m]
+            step, has_step = self._step(kind, first[:, 0], first[:, 1])
+            ok &= has_step
+            for j in group:
+                sub = X[:, j::m]
+                ok &= (self._advance(kind, sub[:, :-1], step[:, None], 1) == sub[:, 1:]).all(axis=1)
+                steps[j] = (kind, step)
+        pred = np.stack([self._advance(steps[p % m][0], X[:, p % m], steps[p % m][1], p // m)
+                         for p in (self.SHOWN, self.SHOWN + 1)], axis=1)
+        return ok, pred
+
+    @staticmethod
+    def _fit_fibonacci(X):
+        ok = (X[:, 2:] == X[:, 1:-1] + X[:, :-2]).all(axis=1)
+        x7 = X[:, -1] + X[:, -2]
+        return ok, np.stack([x7, x7 + X[:, -1]], axis=1)
+
+    @staticmethod
+    def _fit_multilevel(X):
+        d = np.diff(X, axis=1); dd = np.diff(d, axis=1)
+        ok = (dd == dd[:, :1]).all(axis=1)
+        x7 = X[:, -1] + d[:, -1] + dd[:, 0]
+        return ok, np.stack([x7, x7 + d[:, -1] + 2 * dd[:, 0]], axis=1)
+
+    def _fit_alternating(self, X, ops):
+        n, p = len(X), len(ops)
+        ok, values = np.ones(n, dtype=bool), []
+        for c, op in enumerate(ops):
+            a, b = X[:, c], X[:, c + 1]
+            if op in ("add", "sub"): v, has = (b - a) if op == "add" else (a - b), np.ones(n, dtype=bool)
+            elif op == "mul": v, has = self._step("mult", a, b)
+            else: v, has = self._step("mult", b, a)
+            ok &= has & (v != 0); values.append(np.where(v == 0, 1, v))
+        def apply(op, x, v):
+            if op == "add": return x + v, True
+            if op == "sub": return x - v, True
+            if op == "mul": return x * v, True
+            return x // v, x % v == 0
+        seq = [X[:, 0]]
+        for k in range(1, self.SHOWN + 2):
+            nxt, exact = apply(ops[(k - 1) % p], seq[-1], values[(k - 1) % p])
+            ok &= exact
+            if k < self.SHOWN: ok &= nxt == X[:, k]; seq.append(X[:, k])
+            else: seq.append(nxt)
+        return ok, np.stack(seq[-2:], axis=1)
+
+    def ambiguous(self, X, answers):
+        """(n, 7) gezeigte Zahlen, (n, 2) richtige Fortsetzung -> (n,) Maske mehrdeutiger Aufgaben."""
+        X = np.asarray(X, dtype=np.int64).reshape(-1, self.SHOWN)
+        answers = np.asarray(answers, dtype=np.int64).reshape(-1, 2)
+        flagged = np.zeros(len(X), dtype=bool)
+        with np.errstate(all="ignore"):
+            for _, _, fit in self.families:
+                ok, pred = fit(X)
+                flagged |= ok & (pred != answers).any(axis=1)
+        return flagged
+
+    def alternatives(self, seq):
+        """Alle ausreichend bestätigten Regelfamilien mit ihrer Fortsetzung für eine einzelne Aufgabe."""
+        X = np.asarray([seq.get_initial_sequence()], dtype=np.int64)
+        with np.errstate(all="ignore"):
+            return [(name, tuple(int(v) for v in pred[0])) for name, _, fit in self.families for ok, pred in [fit(X)] if ok[0]]
+
+    def is_ambiguous(self, seq): return bool(self.ambiguous([seq.get_initial_sequence()], [seq.get_missing_numbers()])[0])
+
+
+class UniqueIndexSampler:
+    """Zieht Indizes aus range(size) ohne Zurücklegen entlang einer pseudozufälligen Permutation
+    (Feistel-Netz mit Cycle-Walking, wie QuestionSpace im IM-Generator). Zustand: Schlüssel und Cursor, O(1) je Zug."""
+    ROUNDS = 4
+
+    def __init__(self, size, rng=random):
+        self.size, self.cursor = size, 0
+        self.half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self.half_mask = (1 << self.half_bits) - 1
+        key = rng.getrandbits(64)
+        self.round_keys = [(key * (2 * r + 1) + 0x9E3779B97F4A7C15 * (r + 1)) & 0xFFFFFFFFFFFFFFFF for r in range(self.ROUNDS)]
+
+    @property
+    def remaining(self): return self.size - self.cursor
+
+    def _feistel(self, x):
+        left, right = x >> self.half_bits, x & self.half_mask
+        for round_key in self.round_keys:
+            mixed = (right ^ round_key) * 0xBF58476D1CE4E5B9 & 0xFFFFFFFFFFFFFFFF
+            left, right = right, left ^ ((mixed ^ (mixed >> 31)) & self.half_mask)
+        return (left << self.half_bits) | right
+
+    def draw(self):
+        if self.remaining <= 0: raise IndexError("Parameterraum erschöpft")
+        value = self._feistel(self.cursor)
+        while value >= self.size: value = self._feistel(value)
+        self.cursor += 1
+        return value
+
+
+class SequencePool:
+    """Zieht eindeutige Folgen eines Schwierigkeitsgrads ohne Zurücklegen, mit konstantem Speicher.
+
+    Die Verteilung entspricht SequenceFactory.create_sequence (Typ gleichverteilt, dann Variante,
+    dann gültige Parameter), erschöpfte Typen fallen aus der Auswahl heraus. Mit einem
+    AmbiguityChecker werden mehrdeutige Folgen übersprungen.
+    Können mehrere Prototypen dieselben gezeigten Zahlen erzeugen (z. B. überlappende 4er-Sprünge),
+    gibt nur der erste davon (Reihenfolge der Konfiguration, per `locate` geprüft) die Folge aus;
+    so wiederholt sich keine Folge, ohne dass bereits ausgegebene Folgen gespeichert werden.
+    """
+    def __init__(self, difficulty="Mittel", rng=random, checker=None):
+        self.difficulty, self.rng, self.checker = difficulty, rng, checker
+        self.groups = [[(proto, UniqueIndexSampler(len(proto.parameter_space()), rng)) for proto in group]
+                       for group in SequenceFactory.prototypes(difficulty)]
+        self.order = [proto for group in SequenceFactory.prototypes(difficulty) for proto in group]
+
+    @property
+    def remaining(self): return sum(sampler.remaining for group in self.groups for _, sampler in group)
+
+    def draw(self):
+        while True:
+            groups = [[entry for entry in group if entry[1].remaining] for group in self.groups]
+            groups = [group for group in groups if group]
+            if not groups:
+                raise ValueError(f"Keine weiteren eindeutigen Folgen für '{self.difficulty}' verfügbar.")
+            proto, sampler = self.rng.choice(self.rng.choice(groups))
+            seq = proto.with_params(proto.parameter_space().params(sampler.draw()))
+            shown = seq.get_initial_sequence()
+            if any(earlier.locate(shown) is not None for earlier in self.order[:self.order.index(proto)]): continue
+            if self.checker is None or not self.checker.is_ambiguous(seq):
+                return seq
+
+def generate_sequence_blocks(difficulty="Mittel", n=100000, seed=None, unique=True, checker=None):
+    """NumPy-Batch-Engine: erzeugt bis zu n Kandidaten eines Schwierigkeitsgrads als Integer-Blöcke.
+
+    Die Anzahl je Prototyp folgt der Verteilung von create_sequence (Typ, dann Variante gleichverteilt).
+    Mit unique=True wird je Prototyp ohne Zurücklegen gezogen und über alle Blöcke nach den sieben
+    gezeigten Zahlen dedupliziert, daher können es weniger als n Zeilen sein.
+    Mit einem AmbiguityChecker werden mehrdeutige Zeilen blockweise verworfen.
+    Rückgabe: Liste von (prototype, params (k, width), values (k, length)); eine einzelne Zeile wird
+    mit prototype.with_params(tuple(params[i])) zur vollwertigen Aufgabe.
+    """
+    rng = np.random.default_rng(seed)
+    groups = SequenceFactory.prototypes(difficulty)
+    protos = [proto for group in groups for proto in group]
+    weights = [1 / (len(groups) * len(group)) for group in groups for _ in group]
+    blocks = []
+    for proto, k in zip(protos, rng.multinomial(n, weights)):
+        if not k: continue
+        size = len(proto.parameter_space())
+        indices = rng.choice(size, size=min(k, size), replace=False) if unique else rng.integers(0, size, size=k)
+        params = proto.parameter_space().params_array(indices)
+        values, valid = proto.batch(params)
+        blocks.append((proto, params[valid], values[valid]))
+    if unique and blocks:
+        prefixes = np.vstack([values[:, :7] for _, _, values in blocks])
+        _, first = np.unique(prefixes, axis=0, return_index=True)
+        keep = np.zeros(len(prefixes), dtype=bool); keep[first] = True
+        offsets = np.cumsum([0] + [len(values) for _, _, values in blocks])
+        blocks = [(proto, params[keep[a:b]], values[keep[a:b]]) for (proto, params, values), a, b in zip(blocks, offsets[:-1], offsets[1:])]
+    if checker is not None:
+        blocks = [(proto, params[~flagged], values[~flagged]) for proto, params, values in blocks
+                  for flagged in [checker.ambiguous(values[:, :7], values[:, 7:9])]]
+    return blocks
 
 # ==============================================================================
 # 4. PDF-GENERIERUNG
 # ==============================================================================
 
-def generate_distractors(correct_answer, count=3):
-    distractors = set()
-    n1, n2 = correct_answer
-    while len(distractors) < count:
-        offset1, offset2 = random.randint(-5, 5) or 1, random.randint(-5, 5) or 1
-        d1, d2 = n1 + offset1, n2 + offset2
-        if (d1, d2) != (n1, n2) and (d1, d2) not in distractors: distractors.add((d1, d2))
-    return [f"{d[0]}, {d[1]}" for d in distractors]
-
-def generate_number_sequence_pdf(filename, num_sequences=10, difficulty="Mittel"):
-    doc = SimpleDocTemplate(filename, pagesize=letter)
+def assemble_item(item_id, seq_obj, distractors=None, rng=random):
+    """Fertige Aufgabe: Distraktoren und richtige Antwort gemischt auf A–D, ggf. "E ist richtig"."""
+    correct_answer = seq_obj.get_missing_numbers()
+    correct_answer_str = f"{correct_answer[0]}, {correct_answer[1]}"
+    options = list(distractors) if distractors is not None else seq_obj.distractors(3, rng)
+    e_is_correct = rng.random() < E_IS_CORRECT_PROBABILITY
+
+    if not e_is_correct:
+        options.append(correct_answer_str); rng.shuffle(options)
+        correct_letter = chr(ord('A') + options.index(correct_answer_str))
+    else:
+        rng.shuffle(options); correct_letter = "E"
+
+    return {"id": item_id, "sequence_str": seq_obj.get_sequence_str(), "shown": list(seq_obj.get_initial_sequence()),
+            "answer": list(correct_answer), "options": options, "correct_letter": correct_letter,
+            "rule_type": seq_obj.rule_type, "solution_text": seq_obj.solution_text, "full_sequence": seq_obj.sequence}
+
+def iter_items(difficulty="Mittel", seed=None, unique=True, check_ambiguity=True):
+    """Öffentliche Streaming-API: liefert fertige Aufgaben einzeln und erst bei Bedarf.
+
+    Jede Aufgabe ist ein Dict wie in assemble_item (gezeigte Zahlen, Optionen A–D, richtiger Buchstabe,
+    Regeltext). Der Seed wirkt nur auf einen eigenen Zufallsgenerator, der globale Zustand bleibt unberührt.
+    Der Speicher ist in beiden Modi konstant (je Prototyp nur Permutationsschlüssel und Cursor, siehe SequencePool).
+    unique=True: keine Wiederholungen, endet, wenn der Parameterraum erschöpft ist. unique=False: endloser Strom.
+    """
+    rng = random.Random(seed)
+    checker = AmbiguityChecker() if check_ambiguity else None
+    pool = SequencePool(difficulty, rng=rng, checker=checker) if unique else None
+    item_id = 0
+    while True:
+        if pool is not None:
+            try: seq_obj = pool.draw()
+            except ValueError: return
+        else:
+            seq_obj = SequenceFactory.create_sequence(difficulty, rng)
+            if checker is not None and checker.is_ambiguous(seq_obj): continue
+        item_id += 1
+        yield assemble_item(item_id, seq_obj, rng=rng)
+
+def generate_number_sequence_pdf(filename, num_sequences=10, difficulty="Mittel", items=None):
+    """Erzeugt das PDF; ohne `items` werden num_sequences eindeutige, eindeutig lösbare Aufgaben gezogen."""
+    # Erst in eine temporäre Datei schreiben und danach umbenennen, damit nie halbe PDFs liegen bleiben
+    tmp_filename = f"{filename}.{os.getpid()}.tmp"
+    doc = SimpleDocTemplate(tmp_filename, pagesize=letter)
     styles = getSampleStyleSheet()
     story = []
 
@@ -266,34 +862,22 @@ def generate_number_sequence_pdf(filename, num_sequences=10, difficulty="Mittel"
     story.append(Paragraph("Zeit: 15 Minuten", styles['h2']))
     story.append(PageBreak())
 
-    sequences_data, generated_sequences = [], set()
-    
-    for i in range(num_sequences):
-        while True:
-            seq_obj = SequenceFactory.create_sequence(difficulty)
-            if seq_obj.get_sequence_str() not in generated_sequences:
-                generated_sequences.add(seq_obj.get_sequence_str()); break
-        
-        correct_answer = seq_obj.get_missing_numbers()
-        correct_answer_str = f"{correct_answer[0]}, {correct_answer[1]}"
-        options = generate_distractors(correct_answer, 3)
-        e_is_correct = random.random() < E_IS_CORRECT_PROBABILITY
-        
-        if not e_is_correct:
-            options.append(correct_answer_str); random.shuffle(options)
-            correct_letter = chr(ord('A') + options.index(correct_answer_str))
-        else:
-            random.shuffle(options); correct_letter = "E"
-
-        sequences_data.append({"id": i + 1, "correct_letter": correct_letter, "solution_text": seq_obj.solution_text, "full_sequence": seq_obj.sequence})
+    if items is None:
+        capacity = SequenceFactory.capacity(difficulty)
+        if num_sequences > capacity:
+            raise ValueError(f"'{difficulty}' bietet nur {capacity} verschiedene Folgen, angefordert: {num_sequences}.")
+        pool = SequencePool(difficulty, checker=AmbiguityChecker())
+        items = [assemble_item(i + 1, pool.draw()) for i in range(num_sequences)]
+    sequences_data, num_sequences = items, len(items)
 
+    for i, item in enumerate(items):
         question_block = [
             Paragraph(f"<b>Aufgabe {i + 1}:</b>", styles['Normal']),
             Spacer(1, 0.05 * inch),
-            Paragraph(seq_obj.get_sequence_str() + " , ___ , ___", styles['Code']),
+            Paragraph(item["sequence_str"] + " , ___ , ___", styles['Code']),
             Spacer(1, 0.1 * inch)
         ]
-        for j, opt in enumerate(options): question_block.append(Paragraph(f"<b>{chr(ord('A') + j)}:</b> {opt}", styles['Normal']))
+        for j, opt in enumerate(item["options"]): question_block.append(Paragraph(f"<b>{chr(ord('A') + j)}:</b> {opt}", styles['Normal']))
         question_block.append(Paragraph("<b>E:</b> Keine der Antworten ist richtig.", styles['Normal']))
         # Reduzierter Abstand, damit 5 Aufgaben auf eine Seite passen
         question_block.append(Spacer(1, 0.35 * inch))
@@ -346,13 +930,112 @@ def generate_number_sequence_pdf(filename, num_sequences=10, difficulty="Mittel"
         story.append(KeepTogether(solution_block))
 
     try:
-        doc.build(story); print(f"PDF '{filename}' wurde erfolgreich erstellt.")
-    except Exception as e: print(f"Fehler bei der PDF-Erstellung: {e}")
+        doc.build(story); os.replace(tmp_filename, filename); print(f"PDF '{filename}' wurde erfolgreich erstellt.")
+        return True
+    except Exception as e:
+        print(f"Fehler bei der PDF-Erstellung: {e}")
+        if os.path.exists(tmp_filename): os.remove(tmp_filename)
+        return False
 
 # ==============================================================================
-# 5. AUSFÜHRUNGSPUNKT
+# 5. ITEMBANK
 # ==============================================================================
 
+class ItemBank:
+    """SQLite-Itembank geprüfter Folgen mit Ausgabezähler.
+
+    Befüllt wird über die Batch-Engine (inkl. Mehrdeutigkeitsprüfung); Sets werden per indizierter
+    Abfrage zusammengestellt: Regeltypen im Wechsel (ausgewogen), innerhalb eines Typs die am
+    seltensten ausgegebenen Aufgaben zuerst.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS items (
+            id INTEGER PRIMARY KEY,
+            difficulty TEXT NOT NULL,
+            rule_type TEXT NOT NULL,
+            params TEXT NOT NULL,
+            sequence TEXT NOT NULL,
+            shown TEXT NOT NULL,
+            solution_text TEXT NOT NULL,
+            distractors TEXT NOT NULL,
+            times_issued INTEGER NOT NULL DEFAULT 0,
+            shuffle_key INTEGER NOT NULL,
+            UNIQUE (difficulty, shown)
+        );
+        CREATE INDEX IF NOT EXISTS idx_items_pick ON items (difficulty, rule_type, times_issued, shuffle_key);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(self.SCHEMA)
+
+    def close(self): self.conn.close()
+
+    def count(self, difficulty):
+        return self.conn.execute("SELECT COUNT(*) FROM items WHERE difficulty = ?", (difficulty,)).fetchone()[0]
+
+    def fill(self, difficulty, n=BANK_FILL_DEFAULT, seed=None):
+        """Erzeugt bis zu n Kandidaten und übernimmt alle neuen, eindeutig lösbaren Folgen. -> Anzahl neuer Aufgaben"""
+        rng = random.Random(seed)
+        rows = []
+        for proto, params, values in generate_sequence_blocks(difficulty, n, seed=seed, checker=AmbiguityChecker()):
+            distractors = proto.distractor_block(params, 3, rng=np.random.default_rng(rng.getrandbits(64))).tolist()
+            for p, ds in zip(params.tolist(), distractors):
+                seq = proto.with_params(tuple(p))
+                rows.append((difficulty, seq.rule_type, json.dumps(p), json.dumps(seq.sequence), seq.get_sequence_str(),
+                             seq.solution_text, json.dumps([f"{a}, {b}" for a, b in ds]), rng.getrandbits(62)))
+        before = self.conn.total_changes
+        with self.conn:
+            self.conn.executemany("""INSERT OR IGNORE INTO items
+                (difficulty, rule_type, params, sequence, shown, solution_text, distractors, shuffle_key)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+        return self.conn.total_changes - before
+
+    def ensure(self, difficulty, needed):
+        if self.count(difficulty) < needed: self.fill(difficulty, max(BANK_FILL_DEFAULT, needed))
+        available = self.count(difficulty)
+        if available < needed:
+            raise ValueError(f"Itembank enthält nur {available} Aufgaben für '{difficulty}', angefordert: {needed}.")
+
+    def select(self, difficulty, count, rng=random):
+        """Stellt ein Set mit ausgewogenem Regelmix zusammen und erhöht den Ausgabezähler. -> Aufgaben-Dicts"""
+        rule_types = [r[0] for r in self.conn.execute("SELECT DISTINCT rule_type FROM items WHERE difficulty = ?", (difficulty,))]
+        rng.shuffle(rule_types)
+        candidates = [self.conn.execute("""SELECT id, rule_type, sequence, solution_text, distractors FROM items
+                                          WHERE difficulty = ? AND rule_type = ?
+                                          ORDER BY times_issued, shuffle_key LIMIT ?""", (difficulty, rule, count)).fetchall()
+                      for rule in rule_types]
+        chosen = []
+        while len(chosen) < count and any(candidates):
+            for rows in candidates:
+                if rows and len(chosen) < count: chosen.append(rows.pop(0))
+        rng.shuffle(chosen)
+        with self.conn:
+            self.conn.executemany("UPDATE items SET times_issued = times_issued + 1 WHERE id = ?", [(row[0],) for row in chosen])
+        items = []
+        for i, (_, rule_type, sequence, solution_text, distractors) in enumerate(chosen):
+            seq = NumberSequence()
+            seq.sequence, seq.rule_type, seq.solution_text = json.loads(sequence), rule_type, solution_text
+            items.append(assemble_item(i + 1, seq, json.loads(distractors), rng))
+        return items
+
+# ==============================================================================
+# 6. AUSFÜHRUNGSPUNKT
+# ==============================================================================
+
+def job_seed(base_seed, difficulty, index):
+    """Deterministischer Seed je (Schwierigkeit, Laufnummer), unabhängig von Reihenfolge und Worker-Zahl."""
+    return random.Random(f"{base_seed}-{difficulty}-{index}").getrandbits(32)
+
+def run_pdf_job(job):
+    """Ein PDF-Auftrag (auch als Prozess-Pool-Aufgabe) -> Ergebnis mit Laufzeit."""
+    random.seed(job["seed"])
+    start = time.perf_counter()
+    ok = generate_number_sequence_pdf(filename=job["path"], num_sequences=job["num_sequences"], difficulty=job["difficulty"], items=job["items"])
+    return {"difficulty": job["difficulty"], "index": job["index"], "path": job["path"], "ok": ok,
+            "seconds": time.perf_counter() - start, "pid": os.getpid()}
+
 def main():
     print("Starte die Generierung der Zahlenfolgen-Übungen...")
 
@@ -362,6 +1045,10 @@ def main():
     parser.add_argument("--batch", type=int, default=1, help="Anzahl PDFs pro Schwierigkeitsgrad (Standard: 1)")
     parser.add_argument("--output-dir", type=str, default="output", help="Ausgabeverzeichnis relativ zum Skript (Standard: output)")
     parser.add_argument("--base-name", type=str, default="MedAT_Uebung", help="Basisname der PDF-Dateien (Standard: MedAT_Uebung)")
+    parser.add_argument("--bank", type=str, default=None, help="SQLite-Itembank relativ zum Skript; Sets werden daraus zusammengestellt (wird bei Bedarf befüllt)")
+    parser.add_argument("--bank-fill", type=int, default=0, help="Vorab so viele zusätzliche Kandidaten je Schwierigkeitsgrad in die Itembank erzeugen (Standard: 0)")
+    parser.add_argument("--workers", type=int, default=1, help="Anzahl paralleler Prozesse für die PDF-Erstellung (Standard: 1)")
+    parser.add_argument("--seed", type=int, default=None, help="Basis-Seed; jeder PDF-Auftrag erhält daraus einen festen Seed (Standard: zufällig)")
     args = parser.parse_args()
 
     # Ausgabeverzeichnis sicherstellen (relativ zum Skriptpfad)
@@ -375,6 +1062,22 @@ def main():
 
     difficulties = ["Einfach", "Mittel", "Schwer"] if args.difficulty == "all" else [args.difficulty]
 
+    # Vorab prüfen, ob der Parameterraum für die angeforderte Anzahl reicht
+    for diff in difficulties:
+        capacity = SequenceFactory.capacity(diff)
+        if args.num_sequences > capacity:
+            parser.error(f"'{diff}' bietet nur {capacity} verschiedene Folgen, angefordert: {args.num_sequences}.")
+
+    bank = ItemBank(os.path.join(base_dir, args.bank)) if args.bank else None
+    if bank:
+        for diff in difficulties:
+            if args.bank_fill: print(f"Itembank '{diff}': {bank.fill(diff, args.bank_fill)} neue Aufgaben.")
+            bank.ensure(diff, args.num_sequences)
+
+    base_seed = args.seed if args.seed is not None else random.randrange(2**31)
+    print(f"Basis-Seed: {base_seed}")
+
+    jobs = []
     for diff in difficulties:
         for i in range(1, args.batch + 1):
             # Dateinamen: kompatibel zu früherem Verhalten, aber mit optionaler Nummer, wenn batch>1
@@ -383,7 +1086,26 @@ def main():
             else:
                 filename = f"{args.base_name}_{diff}_{i}.pdf"
             full_path = os.path.join(output_dir, filename)
-            generate_number_sequence_pdf(filename=full_path, num_sequences=args.num_sequences, difficulty=diff)
+            # Die Itembank wird nur im Hauptprozess abgefragt; Worker erhalten fertige Aufgaben
+            seed = job_seed(base_seed, diff, i)
+            items = bank.select(diff, args.num_sequences, random.Random(seed)) if bank else None
+            jobs.append({"difficulty": diff, "index": i, "path": full_path, "num_sequences": args.num_sequences,
+                         "seed": seed, "items": items})
+
+    if bank: bank.close()
+
+    start = time.perf_counter()
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            results = list(executor.map(run_pdf_job, jobs))
+    else:
+        results = [run_pdf_job(job) for job in jobs]
+    wall = time.perf_counter() - start
+
+    print("\nZusammenfassung:")
+    for r in results:
+        print(f"  {r['difficulty']:<8} #{r['index']:<4} {r['seconds']:7.2f} s  {'OK' if r['ok'] else 'FEHLER'}  {os.path.basename(r['path'])}")
+    print(f"  {len(results)} PDFs in {wall:.2f} s (Summe der Aufträge: {sum(r['seconds'] for r in results):.2f} s, Worker: {max(1, args.workers)})")
 
     print("\nAlle PDF-Dateien wurden generiert.")
 